@@ -1,21 +1,25 @@
-from flask import Flask, jsonify, request, Response, render_template
+from flask import Flask, g, jsonify, request, Response, render_template, send_file
+import math
 import os
 import requests
 from flask_cors import CORS
 import re
-from feast_finder import Feast_Finder, Recipe, check_recipe_fields
-from typing import Union, Tuple, Optional, List
+from feast_finder import (DiskCache, Feast_Finder, Histogram, PriceBreakdown, QuotaExceeded, QuotaScheduler, Recipe,
+                          RecipePool, RequestProfiler, RequestTimer, SearchCache, TTLCache, UpstreamClient,
+                          check_recipe_fields, iter_json_array, iter_ndjson, summarize_costs)
+from feast_finder.pricebreakdown import NO_PRICE_TABLE
+from feast_finder.metrics import add_upstream_time, cache_metrics, current_timer, render_metric
+from typing import Any, Callable, Hashable, Union, Tuple, Optional, List
 import random
+import atexit
+import contextvars
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 from dotenv import load_dotenv, find_dotenv 
 load_dotenv(find_dotenv())                  
 
-try: 
-    from BeautifulSoup import BeautifulSoup
-except ImportError:
-    from bs4 import BeautifulSoup
-
 
 RECIPES_FILE  = os.path.join(os.path.dirname(__file__), "myfavrecipes.json")
 
@@ -29,12 +33,118 @@ app = Flask(
 CORS(app)
 
 
+# upper bound and default for the page size of ranked favorites searches
+MAX_SEARCH_LIMIT = 100
+DEFAULT_SEARCH_LIMIT = 20
+# upper bound and default for the page size of the favorites listing
+MAX_FAVORITES_LIMIT = 1000
+DEFAULT_FAVORITES_LIMIT = 100
+
 # Spoonacular API key
 API_KEY = os.environ.get('API_KEY')
-SPOONACULAR_API = "https://api.spoonacular.com" # fixed path
-
-app.feast_finder = Feast_Finder(str(RECIPES_FILE))
+# base URL of the Spoonacular API, e.g. the local stand-in of spoonacular_stub.py for offline runs and benchmarks
+SPOONACULAR_API = os.environ.get('SPOONACULAR_API', "https://api.spoonacular.com").rstrip('/')
+
+# (connect, read) timeouts in seconds of the upstream call behind every proxy route
+UPSTREAM_TIMEOUTS = {
+    'meals': (3.05, 10),
+    'recipe': (3.05, 10),
+    'random': (3.05, 10),
+    'price_breakdown_widget': (3.05, 20),  # <- rendering the image takes a while
+    'price_breakdown': (3.05, 15),
+    'recipe_info': (3.05, 10),
+    'recipe_info_bulk': (3.05, 15),
+    'costs': (3.05, 15),
+}
+# priority class in the quota scheduler of the upstream call behind every proxy route
+UPSTREAM_PRIORITIES = {
+    'meals': 'search',
+    'recipe': 'interactive',
+    'random': 'background',  # <- refills of the random recipe pool
+    'price_breakdown_widget': 'interactive',
+    'price_breakdown': 'interactive',
+    'recipe_info': 'interactive',
+    'recipe_info_bulk': 'background',  # <- the front end prefetches search results with it
+    'costs': 'background',  # <- costing a long list must not starve the interactive routes
+}
+# sustained calls per second and burst size the API key allows, shared by all routes of this process
+UPSTREAM_RATE = float(os.environ.get('UPSTREAM_RATE', 10))
+UPSTREAM_BURST = float(os.environ.get('UPSTREAM_BURST', 20))
+# kept-alive connections to Spoonacular, shared by all workers of this process
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 20))
+# size and lifetime in seconds of the cache of recipe information shared by /api/recipe and /api/recipe/info
+RECIPE_INFO_CACHE_SIZE = int(os.environ.get('RECIPE_INFO_CACHE_SIZE', 1024))
+RECIPE_INFO_CACHE_TTL = float(os.environ.get('RECIPE_INFO_CACHE_TTL', 3600))
+# size and lifetime in seconds of the cache of extracted price breakdowns shared by /api/price_breakdown and /api/recipe/card
+PRICE_BREAKDOWN_CACHE_SIZE = int(os.environ.get('PRICE_BREAKDOWN_CACHE_SIZE', 1024))
+PRICE_BREAKDOWN_CACHE_TTL = float(os.environ.get('PRICE_BREAKDOWN_CACHE_TTL', 24 * 60 * 60))
+# how long a widget page without a price table is remembered, in seconds; Spoonacular may add the prices later
+PRICE_BREAKDOWN_MISSING_TTL = float(os.environ.get('PRICE_BREAKDOWN_MISSING_TTL', 10 * 60))
+# size and lifetime in seconds of the cache of /api/meals search results
+SEARCH_CACHE_SIZE = int(os.environ.get('SEARCH_CACHE_SIZE', 256))
+SEARCH_CACHE_TTL = float(os.environ.get('SEARCH_CACHE_TTL', 600))
+# results of a search sent to the client, complexSearch's default page size
+SEARCH_PAGE_SIZE = 10
+# the pool of random recipes is refilled up to RANDOM_POOL_HIGH recipes when fewer than RANDOM_POOL_LOW are left
+RANDOM_POOL_LOW = int(os.environ.get('RANDOM_POOL_LOW', 5))
+RANDOM_POOL_HIGH = int(os.environ.get('RANDOM_POOL_HIGH', 20))
+# upper bound for the number of IDs of a batch recipe information request
+MAX_BATCH_IDS = 100
+# upper bound for the number of recipes of a cost analysis, and for the cheapest and most expensive ingredients it lists
+MAX_COST_IDS = 1000
+MAX_COST_TOP = 50
+# threads fetching the price breakdowns of cost analyses, kept apart from the fanout pool of the interactive routes
+COSTS_WORKERS = int(os.environ.get('COSTS_WORKERS', 4))
+# directory and size limit in bytes of the disk cache of price breakdown widget images
+WIDGET_CACHE_DIR = os.environ.get('WIDGET_CACHE_DIR',
+                                  os.path.join(os.path.dirname(__file__), "cache", "price_breakdown_widgets"))
+WIDGET_CACHE_MAX_BYTES = int(os.environ.get('WIDGET_CACHE_MAX_BYTES', 256 * 2 ** 20))
+# how long browsers may reuse a widget image without revalidating, in seconds
+WIDGET_MAX_AGE = 24 * 60 * 60
+
+# opt-in profiling: the share of requests run under cProfile (0 is off),
+# and the duration in seconds from which their profile is kept
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_THRESHOLD = float(os.environ.get('PROFILE_THRESHOLD', 0.5))
+# where the profiles of slow requests are written, and how many of them are kept
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(__file__), "cache", "profiles"))
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 100))
+
+# storage backend of the favorites: "json" (default), "sqlite" or "lazy"
+FAVORITES_STORAGE = os.environ.get('FAVORITES_STORAGE', 'json')
+# when favorites changes reach the disk: "write" (default), "batch" or "interval"
+FAVORITES_DURABILITY = os.environ.get('FAVORITES_DURABILITY', 'write')
+
+app.feast_finder = Feast_Finder(str(RECIPES_FILE), storage=FAVORITES_STORAGE, durability=FAVORITES_DURABILITY)
 app.feast_finder.load_recipes()
+atexit.register(lambda: app.feast_finder.close())
+
+app.quota = QuotaScheduler(UPSTREAM_RATE, UPSTREAM_BURST)
+app.upstream = UpstreamClient(pool_maxsize=UPSTREAM_POOL_SIZE, scheduler=app.quota)
+atexit.register(lambda: app.upstream.close())
+# runs the upstream calls of composite endpoints side by side
+app.fanout = ThreadPoolExecutor(max_workers=UPSTREAM_POOL_SIZE, thread_name_prefix='upstream')
+atexit.register(lambda: app.fanout.shutdown(wait=False))
+app.costs_fanout = ThreadPoolExecutor(max_workers=COSTS_WORKERS, thread_name_prefix='costs')
+atexit.register(lambda: app.costs_fanout.shutdown(wait=False))
+app.recipe_info_cache = TTLCache(RECIPE_INFO_CACHE_SIZE, RECIPE_INFO_CACHE_TTL)
+app.price_breakdown_cache = TTLCache(PRICE_BREAKDOWN_CACHE_SIZE, PRICE_BREAKDOWN_CACHE_TTL)
+app.search_cache = SearchCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+app.widget_cache = DiskCache(WIDGET_CACHE_DIR, WIDGET_CACHE_MAX_BYTES, suffix='.png')
+app.async_upstream = None  # <- the async client of the ASGI entry point, when it runs
+app.profiler = RequestProfiler(PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_THRESHOLD, PROFILE_MAX_FILES)
+app.random_pool = RecipePool(lambda number: fetch_random_recipes(number), RANDOM_POOL_LOW, RANDOM_POOL_HIGH)
+atexit.register(lambda: app.random_pool.stop())
+
+# latency histograms exposed on /metrics; the favorites' persistence timings live on app.feast_finder
+app.request_seconds = Histogram('feastfinder_request_duration_seconds', 'Time to handle a request.',
+                                ('route', 'method', 'status'))
+app.request_upstream_seconds = Histogram('feastfinder_request_upstream_seconds',
+                                         'Time a request spent in Spoonacular calls.', ('route',))
+app.request_local_seconds = Histogram('feastfinder_request_local_seconds',
+                                      'Time a request spent outside Spoonacular calls.', ('route',))
+app.upstream_seconds = Histogram('feastfinder_upstream_call_duration_seconds',
+                                 'Duration of Spoonacular calls, quota waits and retries included.', ('call',))
 
 @app.route('/')
 def index():
@@ -50,18 +160,207 @@ def health_check():
 
     return 'OK', 200
 
+
+@app.before_request
+def start_request_timer() -> None:
+    """
+    Request hook that starts timing the request; the Spoonacular calls made for it add to its upstream time.
+    A sampled request is also profiled when profiling is turned on (PROFILE_SAMPLE_RATE).
+    """
+
+    current_timer.set(RequestTimer())
+    profile = app.profiler.start()
+    if profile is not None:
+        g.profile = profile
+
+
+@app.after_request
+def record_request_timer(response: Response) -> Response:
+    """
+    Request hook that records the duration of the request, and its upstream and local time, by route.
+    Args:
+        response (Response): The response; for a streamed body, the time until it starts.
+    Returns:
+        Response: The same response.
+    """
+
+    timer = current_timer.get()
+    if timer is None:
+        return response
+    current_timer.set(None)
+    elapsed = timer.elapsed()
+    # the rule, not the path, keeps the series few
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    app.request_seconds.observe(elapsed, route, request.method, str(response.status_code))
+    app.request_upstream_seconds.observe(timer.upstream(), route)
+    app.request_local_seconds.observe(timer.local(elapsed), route)
+
+    profile = g.pop('profile', None)
+    if profile is not None:
+        app.profiler.finish(profile, elapsed, {
+            'route': route, 'method': request.method, 'path': request.path, 'status': response.status_code,
+            'upstream': round(timer.upstream(), 6), 'favorites': len(app.feast_finder.get_favorite_recipes()),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        })
+    return response
+
+
+@app.teardown_request
+def stop_request_profile(error: Optional[BaseException]) -> None:
+    """
+    Request hook that stops the profiler of a request that ended before record_request_timer ran.
+    Args:
+        error (Optional[BaseException]): The unhandled error, if any.
+    """
+
+    profile = g.pop('profile', None)
+    if profile is not None:
+        app.profiler.discard(profile)
+
+
+@app.route('/metrics')
+def get_metrics() -> Response:
+    """
+    Endpoint for Prometheus: the latency histograms, the favorites' persistence timings and the counters
+    of the upstream clients (the async one too under ASGI), the quota scheduler and the caches, in the
+    text exposition format.
+    Returns:
+        Response: The metrics as plain text.
+    """
+
+    upstream = app.upstream.stats()
+    clients = {'threaded': upstream}
+    if app.async_upstream is not None:
+        clients['async'] = app.async_upstream.stats()
+    quota = app.quota.stats()['priorities']
+    profiler = app.profiler.stats()
+    lines = [
+        *app.request_seconds.render(),
+        *app.request_upstream_seconds.render(),
+        *app.request_local_seconds.render(),
+        *app.upstream_seconds.render(),
+        *app.feast_finder.persistence_seconds.render(),
+        *render_metric('feastfinder_upstream_calls_total', 'counter', 'Spoonacular calls by client and outcome.',
+                       (({'client': client, 'outcome': outcome}, stats[outcome]) for client, stats in clients.items()
+                        for outcome in ('requests', 'retries', 'errors'))),
+        *render_metric('feastfinder_upstream_connections_in_use', 'gauge', 'Pooled Spoonacular connections in use.',
+                       [({'client': 'threaded'}, sum(pool['in_use'] for pool in upstream['pools']))]
+                       + ([({'client': 'async'}, clients['async']['in_use'])] if 'async' in clients else [])),
+        *render_metric('feastfinder_quota_calls_total', 'counter', 'Calls the quota scheduler granted, queued or rejected.',
+                       (({'priority': priority, 'outcome': outcome}, count)
+                        for priority, counters in quota.items() for outcome, count in counters.items())),
+        *cache_metrics({'recipe_info': app.recipe_info_cache.stats(), 'price_breakdown': app.price_breakdown_cache.stats(),
+                        'search': app.search_cache.stats(), 'widget': app.widget_cache.stats()}),
+        *render_metric('feastfinder_profiles_total', 'counter', 'Sampled requests by what became of their profile.',
+                       (({'outcome': outcome}, profiler[outcome]) for outcome in ('profiled', 'busy', 'written', 'deleted'))),
+        *render_metric('feastfinder_favorites', 'gauge', 'Number of favorite recipes.',
+                       [({}, len(app.feast_finder.get_favorite_recipes()))]),
+    ]
+    return Response('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.errorhandler(QuotaExceeded)
+def handle_quota_exceeded(error: QuotaExceeded) -> tuple:
+    """
+    Error handler that answers a proxy request with 503 when the Spoonacular quota does not allow its call.
+    Args:
+        error (QuotaExceeded): The error, with the seconds until calls are expected to be allowed again.
+    Returns:
+        tuple: JSON error message, 503 status code and a Retry-After header.
+    """
+
+    return jsonify({'error': f'Spoonacular {error.reason} exhausted, try again later'}), 503, \
+        {'Retry-After': str(max(1, math.ceil(error.retry_after)))}
+
+
+def cached_json_response(key: Hashable, version: int, build: Callable[[], Any]) -> Response:
+    """
+    Helper function to serve a favorites payload from the serialized payload cache.
+    The body is only serialized again after the data behind it changed, and a request
+    whose If-None-Match matches the strong ETag is answered with 304 Not Modified.
+    Args:
+        key (Hashable): Identifies the payload in the cache.
+        version (int): The current version of the data behind the payload.
+        build (Callable[[], Any]): Returns the JSON-serializable payload.
+    Returns:
+        Response: JSON response, or an empty 304 response.
+    """
+
+    etag, body = app.feast_finder.payloads.get(key, version, lambda: (app.json.dumps(build()) + "\n").encode())
+
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True  # <- browsers revalidate instead of refetching
+    return response.make_conditional(request)
+
 @app.route('/feastFinder/recipes/favorites/')
 def get_favorite_recipes():
     """
     Endpoint to retrieve recipes from favorites.
+
+    With `limit` (and the `cursor` of the previous page) it returns one page of
+    recipes ordered by ID plus the cursor of the next page. With `format=ndjson`
+    the recipes are streamed one JSON object per line instead.
     Returns:
         Response: JSON response containing the favorite recipes.
     """
+
+    if request.args.get('format') == 'ndjson':
+        return stream_favorite_recipes()
+    if 'limit' in request.args or 'cursor' in request.args:
+        return get_favorite_recipes_page()
         
     recipes = app.feast_finder.get_favorite_recipes()
 
-    serialized_recipes = {recipe: recipes[recipe].__dict__ for recipe in recipes}
-    return jsonify(serialized_recipes)
+    return cached_json_response(
+        None, app.feast_finder.version,
+        lambda: {recipe: recipes[recipe].to_dict() for recipe in recipes}
+    )
+
+
+def get_favorite_recipes_page() -> Union[Response, tuple]:
+    """
+    Helper function for the paginated mode of the favorites listing.
+    Returns:
+        Union[Response, tuple]: JSON response with one page of recipes and the next cursor, or an error message.
+    """
+
+    limit = request.args.get('limit', DEFAULT_FAVORITES_LIMIT, type=int)
+    if not 1 <= limit <= MAX_FAVORITES_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {MAX_FAVORITES_LIMIT}'}), 400
+
+    try:
+        recipes, next_cursor = app.feast_finder.list_recipes(limit, request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    return jsonify({
+        'recipes': {recipe.recipe_id: recipe.to_dict() for recipe in recipes},
+        'next_cursor': next_cursor
+    })
+
+
+def stream_favorite_recipes() -> Union[Response, tuple]:
+    """
+    Helper function that streams the favorites as newline-delimited JSON, one recipe per line.
+    Returns:
+        Union[Response, tuple]: Streaming NDJSON response, or an error message.
+    """
+
+    try:
+        recipes = app.feast_finder.iter_recipes(request.args.get('cursor'))
+        first = next(recipes, None)  # <- validates the cursor before the response starts
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    def generate():
+        if first is None:
+            return
+        yield first.to_json() + '\n'
+        for recipe in recipes:
+            yield recipe.to_json() + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
 
 @app.route('/feastFinder/recipes/favorites/<recipe_id>')
 def get_favorite_recipe_by_id(recipe_id: str) -> Response:
@@ -73,11 +372,12 @@ def get_favorite_recipe_by_id(recipe_id: str) -> Response:
         Response: JSON response containing information about the requested recipe.
     """
 
+    # read the version first, so a concurrent update cannot file the old body under the new version
+    version = app.feast_finder.recipe_version(recipe_id)
+    recipe = app.feast_finder.get_recipe(recipe_id)
 
-    favorite_recipes = app.feast_finder.get_favorite_recipes()
-
-    if recipe_id in favorite_recipes:
-        return jsonify({recipe_id: favorite_recipes[recipe_id].__dict__})
+    if recipe is not None:
+        return cached_json_response(('recipe', recipe_id), version, lambda: {recipe_id: recipe.to_dict()})
     else:
         return jsonify({"error": "Recipe not found"})
     
@@ -153,12 +453,184 @@ def update_recipe() -> Response:
 
     return jsonify({"error": "Recipe with this title does not exist"}), 404
 
+
+@app.route('/feastFinder/recipes/favorites/import', methods=['POST'])
+def import_recipes() -> Response:
+    """
+    Endpoint to add many recipes to the favorites at once.
+    The body is either a JSON array of recipes or, with Content-Type application/x-ndjson,
+    one recipe per line; it is parsed incrementally and persisted in a single step.
+    Returns:
+        Response: JSON response with the number of imported recipes and the per-item errors.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        items = iter_ndjson(request.stream)
+    else:
+        items = iter_json_array(request.stream)
+
+    imported, errors = app.feast_finder.import_recipes(items)
+
+    status = 200 if imported or not errors else 400
+    return jsonify({"imported": len(imported), "errors": errors}), status
+
+
+@app.route('/feastFinder/recipes/favorites/export')
+def export_recipes() -> Response:
+    """
+    Endpoint to download all favorites, streamed one recipe at a time.
+    Query parameter `format` selects "ndjson" (default) or a JSON array ("json").
+    Returns:
+        Response: Streaming response containing the favorite recipes.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'json'):
+        return jsonify({"error": "format must be ndjson or json"}), 400
+
+    mimetype = 'application/json' if export_format == 'json' else 'application/x-ndjson'
+    return Response(app.feast_finder.export_recipes(export_format), mimetype=mimetype)
+
 ### END OF CRUD OPERATIONS ###
 
+
+def fetch_upstream(url: str, params: dict, route: str, stream: bool = False) -> Optional[requests.Response]:
+    """
+    Helper function that sends a GET request to Spoonacular through the shared client.
+    Args:
+        url (str): The URL.
+        params (dict): The query parameters.
+        route (str): The proxy route, selects the timeouts in UPSTREAM_TIMEOUTS.
+        stream (bool): Whether the body is read lazily; the caller then closes the response.
+    Returns:
+        Optional[requests.Response]: The response, or None if no response arrived in time.
+    Raises:
+        QuotaExceeded: If the Spoonacular quota does not allow the call, answered with 503.
+    """
+
+    started = time.perf_counter()
+    try:
+        return app.upstream.get(url, params=params, timeout=UPSTREAM_TIMEOUTS[route], stream=stream,
+                                priority=UPSTREAM_PRIORITIES[route])
+    except requests.RequestException as e:
+        print(f"Upstream request to {url} failed: {e}")
+        return None
+    finally:
+        elapsed = time.perf_counter() - started
+        app.upstream_seconds.observe(elapsed, route)
+        add_upstream_time(elapsed)
+
+
+def fan_out(function: Callable, *args: Any, executor: Optional[ThreadPoolExecutor] = None) -> Future:
+    """
+    Helper function that runs a function on the fanout pool, in a copy of the request's context
+    so the Spoonacular calls it makes count towards the request's upstream time.
+    Args:
+        function (Callable): The function.
+        *args (Any): Its arguments.
+        executor (Optional[ThreadPoolExecutor]): The pool to run it on, app.fanout if None.
+    Returns:
+        Future: The future of its result.
+    """
+
+    return (executor or app.fanout).submit(contextvars.copy_context().run, function, *args)
+
+
+@app.route('/api/upstream/stats')
+def get_upstream_stats() -> Response:
+    """
+    Endpoint to inspect the upstream connection pool, e.g. to size it under load, the quota and the response caches.
+    Returns:
+        Response: JSON response with the request counters, the state of every host's pool,
+            the quota scheduler and the counters of the response caches.
+    """
+
+    return jsonify({**app.upstream.stats(), 'quota': app.quota.stats(),
+                    'recipe_info_cache': app.recipe_info_cache.stats(), 'search_cache': app.search_cache.stats(),
+                    'price_breakdown_cache': app.price_breakdown_cache.stats(), 'random_pool': app.random_pool.stats(),
+                    'widget_cache': app.widget_cache.stats()})
+
+
+def fetch_recipe_information(meal_id: int, route: str) -> Optional[dict]:
+    """
+    Helper function that gets the Spoonacular information of a recipe through the shared cache.
+    Concurrent misses for the same recipe wait for a single upstream call.
+    Args:
+        meal_id (int): The ID of the recipe.
+        route (str): The proxy route asking, selects the timeouts in UPSTREAM_TIMEOUTS.
+    Returns:
+        Optional[dict]: The recipe information, or None if it could not be fetched.
+    """
+
+    def load() -> Optional[dict]:
+        url = f'{SPOONACULAR_API}/recipes/{meal_id}/information'
+        response = fetch_upstream(url, {'apiKey': API_KEY}, route)
+        if response is None or response.status_code != 200:
+            return None
+        return response.json()
+
+    return app.recipe_info_cache.get(meal_id, load)
+
+
+def fetch_recipe_information_bulk(meal_ids: List[int]) -> dict:
+    """
+    Helper function that gets the Spoonacular information of many recipes through the shared cache.
+    The recipes that are not cached are fetched with a single informationBulk call.
+    Args:
+        meal_ids (List[int]): The IDs of the recipes.
+    Returns:
+        dict: The information of every recipe that could be fetched, keyed by recipe ID.
+    """
+
+    def load_many(missing_ids: List[int]) -> dict:
+        url = f'{SPOONACULAR_API}/recipes/informationBulk'
+        params = {'apiKey': API_KEY, 'ids': ','.join(str(meal_id) for meal_id in missing_ids)}
+        response = fetch_upstream(url, params, 'recipe_info_bulk')
+        if response is None or response.status_code != 200:
+            return {}
+        return {information['id']: information for information in response.json() if 'id' in information}
+
+    return app.recipe_info_cache.get_many(meal_ids, load_many)
+
+
+def search_params(query: Optional[str], min_calories: Optional[int], max_calories: Optional[int]) -> dict:
+    """
+    Helper function that builds the complexSearch parameters of a search.
+    Calorie bounds are only sent when the user gave them, as Spoonacular leaves out recipes without
+    nutrition data once one is set. With a bound the results come with their calories, so the search
+    cache can answer narrower calorie ranges from a search whose results fit in one page.
+    Args:
+        query (Optional[str]): The search words.
+        min_calories (Optional[int]): The lowest calories.
+        max_calories (Optional[int]): The highest calories.
+    Returns:
+        dict: The query parameters, without the API key.
+    """
+
+    params = {'query': query}
+    if min_calories is not None:
+        params['minCalories'] = min_calories
+    if max_calories is not None:
+        params['maxCalories'] = max_calories
+    return params
+
+
+def search_page(found: Tuple[List[dict], int]) -> dict:
+    """
+    Helper function that shapes cached search results like a complexSearch answer.
+    Args:
+        found (Tuple[List[dict], int]): The results and the total number of results.
+    Returns:
+        dict: The first SEARCH_PAGE_SIZE results, with the offset, page size and total.
+    """
+
+    results, total = found
+    return {'results': results[:SEARCH_PAGE_SIZE], 'offset': 0, 'number': SEARCH_PAGE_SIZE, 'totalResults': total}
+
 @app.route('/api/meals')
 def get_meals() -> Union[dict, Response]:
     """
     Endpoint to retrieve meals based on query parameters.
+    Searches go through the search cache: a repeated search, or one that only narrows the
+    calorie range of a cached search, is answered without calling Spoonacular.
     Returns:
         Union[dict, Response]: JSON response containing the meals or an error message.
     """
@@ -167,16 +639,20 @@ def get_meals() -> Union[dict, Response]:
     min_calories = request.args.get('minCalories', type=int)
     max_calories = request.args.get('maxCalories', type=int)
 
-    url = f'{SPOONACULAR_API}/recipes/complexSearch'
-    params = {'apiKey': API_KEY, 'query': query}
-    if min_calories is not None: params['minCalories'] = min_calories
-    if max_calories is not None: params['maxCalories'] = max_calories
-
-    response = requests.get(url, params=params)
-    if response.status_code != 200:
+    def load() -> Optional[Tuple[List[dict], int]]:
+        url = f'{SPOONACULAR_API}/recipes/complexSearch'
+        params = {'apiKey': API_KEY, **search_params(query, min_calories, max_calories)}
+        response = fetch_upstream(url, params, 'meals')
+        if response is None or response.status_code != 200:
+            return None
+        data = response.json()
+        return data['results'], data.get('totalResults', len(data['results']))
+
+    found = app.search_cache.get(SearchCache.key(query, min_calories, max_calories), load)
+    if found is None:
         return jsonify({'error': 'Failed to fetch meals'}), 500
     
-    return response.json()
+    return search_page(found)
 
 @app.route('/api/recipe/<int:meal_id>')
 def get_recipe(meal_id: int) -> Union[dict, Response]:
@@ -188,68 +664,82 @@ def get_recipe(meal_id: int) -> Union[dict, Response]:
         Union[dict, Response]: JSON response containing the recipe or an error message.
     """
 
-    url = f'{SPOONACULAR_API}/recipes/{meal_id}/information'
-    response = requests.get(url, params={'apiKey': API_KEY})
-    if response.status_code != 200:
+    information = fetch_recipe_information(meal_id, 'recipe')
+    if information is None:
         return jsonify({'error': 'Failed to fetch recipe'}), 500
-    return response.json()
+    return information
+
+
+def fetch_random_recipes(number: int) -> Optional[List[dict]]:
+    """
+    Helper function that fetches a batch of random recipes for the random recipe pool.
+    Args:
+        number (int): How many recipes to fetch.
+    Returns:
+        Optional[List[dict]]: The recipes, or None if they could not be fetched.
+    """
+
+    url = f'{SPOONACULAR_API}/recipes/random'
+    response = fetch_upstream(url, {'apiKey': API_KEY, 'number': number}, 'random')
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()['recipes']
 
 @app.route('/api/random')
 def get_random_recipe() -> Union[dict, Response]:
     """
     Endpoint to retrieve a random recipe.
+    Recipes are served from the random recipe pool, which is refilled in batches in the background.
     Returns:
         Union[dict, Response]: JSON response containing the random recipe or an error message.
     """
 
-    url = f'{SPOONACULAR_API}/recipes/random'
-    response = requests.get(url, params={'apiKey': API_KEY})
-    if response.status_code != 200:
+    recipe = app.random_pool.take()
+    if recipe is None:
         return jsonify({'error': 'Failed to fetch random recipe'}), 500
-    return jsonify(response.json()['recipes'][0])
+    return jsonify(recipe)
 
 @app.route('/api/price_breakdown_widget/<int:meal_id>')
 def get_price_breakdown_widget(meal_id: int) -> Union[Response, tuple]:
     """
     Endpoint to retrieve the price breakdown widget for a specific meal.
+    Cached images are sent straight from the disk cache, with an ETag for conditional requests.
+    Other images are streamed from Spoonacular to the client and into the cache at the same time.
     Args:
         meal_id (int): The ID of the meal.
     Returns:
         Union[Response, tuple]: Response object containing the image data or an error message.
     """
 
+    cached = app.widget_cache.lookup(meal_id)
+    if cached is not None:
+        path, digest = cached
+        return send_file(path, mimetype='image/png', etag=digest, conditional=True, max_age=WIDGET_MAX_AGE)
+
     url = f'{SPOONACULAR_API}/recipes/{meal_id}/priceBreakdownWidget.png'
-    response = requests.get(url, params={'apiKey': API_KEY})
-    if response.status_code != 200:
+    response = fetch_upstream(url, {'apiKey': API_KEY}, 'price_breakdown_widget', stream=True)
+    if response is None or response.status_code != 200:
+        if response is not None:
+            response.close()
         return jsonify({'error': 'Failed to fetch price breakdown widget'}), 500
 
-    return Response(response.content, content_type='image/png')
-
-def clean_html_response(html: str) -> Tuple[Optional[List[str]], Optional[List[str]]]:
-    """
-    Helper function to clean HTML response and extract ingredients and prices.
-    Args:
-        input_string (str): The HTML string to be cleaned.
-    Returns:
-        Tuple[Optional[List[str]], Optional[List[str]]]: A tuple containing lists of ingredients and prices, or None if not found.
-    """
-
-    parsed_html = BeautifulSoup(html, "html.parser")
+    def generate():
+        try:
+            yield from app.widget_cache.store_stream(meal_id, response.iter_content(64 * 1024))
+        finally:
+            response.close()
 
-    ingredients_container = parsed_html.find('div', id='spoonacularPriceBreakdownTable') \
-        .find('div', style=lambda value: value and 'float:left;max-width:80%' in value)
-    ingredients = [ingredient.strip() for ingredient in ingredients_container.stripped_strings]
-
-    prices_container = parsed_html.find('div', id='spoonacularPriceBreakdownTable') \
-        .find('div', style=lambda value: value and 'text-align:right;display:inline-block;float:left;padding-left:1em' in value)
-    prices = [price.strip() for price in prices_container.stripped_strings]
-
-    return ingredients, prices
+    headers = {}
+    if 'Content-Length' in response.headers and 'Content-Encoding' not in response.headers:
+        headers['Content-Length'] = response.headers['Content-Length']
+    return Response(generate(), content_type='image/png', headers=headers)
 
 @app.route('/api/price_breakdown/<int:meal_id>')
 def get_price_breakdown(meal_id: int) -> jsonify:
     """
     Fetches the price breakdown widget for a meal from Spoonacular API.
+    Query parameter `format` selects the ingredients and prices as displayed ("table", default)
+    or an object that adds the costs in dollars, their total and the cost per serving ("costs").
 
     Parameters:
         meal_id (int): The ID of the meal for which the price breakdown widget is requested.
@@ -258,14 +748,42 @@ def get_price_breakdown(meal_id: int) -> jsonify:
         jsonify: JSON response containing the price breakdown widget information.
     """
 
-    url = f'{SPOONACULAR_API}/recipes/{meal_id}/priceBreakdownWidget'
-    response = requests.get(url, params={'apiKey': API_KEY})
-    if response.status_code != 200:
+    breakdown_format = request.args.get('format', 'table')
+    if breakdown_format not in ('table', 'costs'):
+        return jsonify({'error': 'format must be table or costs'}), 400
+
+    data = fetch_price_breakdown(meal_id)
+    if data is None:
         return jsonify({'error': 'Failed to fetch price breakdown widget'}), 500
 
-    data = clean_html_response(response.text)
+    data = data.to_dict() if breakdown_format == 'costs' else data.to_table()
     return jsonify(data), 200, {'Content-Type': 'application/json; charset=utf-8'}
 
+
+def fetch_price_breakdown(meal_id: int, route: str = 'price_breakdown') -> Optional[PriceBreakdown]:
+    """
+    Helper function that fetches the price breakdown widget of a meal and parses its table, through the shared cache.
+    Args:
+        meal_id (int): The ID of the meal.
+        route (str): The proxy route asking, selects the timeouts in UPSTREAM_TIMEOUTS.
+    Returns:
+        Optional[PriceBreakdown]: The ingredients, their prices and costs, or None if they could not be fetched.
+            A widget without a price table is remembered for PRICE_BREAKDOWN_MISSING_TTL seconds, failed calls not at all.
+    """
+
+    def load() -> Any:
+        url = f'{SPOONACULAR_API}/recipes/{meal_id}/priceBreakdownWidget'
+        response = fetch_upstream(url, {'apiKey': API_KEY}, route)
+        if response is None or response.status_code != 200:
+            return None
+        price_breakdown = PriceBreakdown.from_html(response.text)
+        if price_breakdown is None:
+            app.price_breakdown_cache.put(meal_id, NO_PRICE_TABLE, ttl=PRICE_BREAKDOWN_MISSING_TTL)
+        return price_breakdown
+
+    price_breakdown = app.price_breakdown_cache.get(meal_id, load)
+    return None if price_breakdown is NO_PRICE_TABLE else price_breakdown
+
 @app.route('/api/recipe/info/<int:meal_id>')
 def get_recipe_info(meal_id: int) -> Union[dict, Response]:
     """
@@ -276,39 +794,207 @@ def get_recipe_info(meal_id: int) -> Union[dict, Response]:
         Union[dict, Response]: JSON response containing the recipe or an error message.
     """
     
-    url = f'{SPOONACULAR_API}/recipes/{meal_id}/information'
-    response = requests.get(url, params={'apiKey': API_KEY})
-    if response.status_code != 200:
+    information = fetch_recipe_information(meal_id, 'recipe_info')
+    if information is None:
         return jsonify({'error': 'Failed to fetch recipe'}), 500
 
-    return response.json()
+    return information
 
 
+@app.route('/api/recipe/card/<int:meal_id>')
+def get_recipe_card(meal_id: int) -> Union[Response, tuple]:
+    """
+    Endpoint to retrieve everything a recipe card shows: the recipe information and its price breakdown.
+    Both are fetched from Spoonacular at the same time, so this takes as long as the slower of the two.
+    Args:
+        meal_id (int): The ID of the recipe.
+    Returns:
+        Union[Response, tuple]: JSON response with "information" and "price_breakdown" (ingredients and
+            prices, or null if they could not be fetched), or an error message.
+    """
+
+    information = fan_out(fetch_recipe_information, meal_id, 'recipe_info')
+    price_breakdown = fan_out(fetch_price_breakdown, meal_id)
+
+    if information.result() is None:
+        return jsonify({'error': 'Failed to fetch recipe'}), 500
+    return jsonify({'information': information.result(),
+                    'price_breakdown': price_breakdown.result() and price_breakdown.result().to_table()})
+
+
+@app.route('/api/recipes/info')
+def get_recipes_info() -> Union[Response, tuple]:
+    """
+    Endpoint to retrieve the information of many recipes at once, e.g. all cards of a results page.
+    Query parameters:
+        ids (str): Comma-separated recipe IDs, at most MAX_BATCH_IDS.
+    Returns:
+        Union[Response, tuple]: JSON response with the information keyed by recipe ID, or an error message.
+            IDs whose information could not be fetched are left out.
+    """
+
+    try:
+        meal_ids = [int(meal_id) for meal_id in request.args.get('ids', '').split(',') if meal_id.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids must be comma-separated recipe IDs'}), 400
+    if not 1 <= len(meal_ids) <= MAX_BATCH_IDS:
+        return jsonify({'error': f'ids must contain between 1 and {MAX_BATCH_IDS} recipe IDs'}), 400
+
+    information = fetch_recipe_information_bulk(meal_ids)
+    if not information:
+        return jsonify({'error': 'Failed to fetch recipes'}), 500
+    return jsonify({str(meal_id): information[meal_id] for meal_id in meal_ids if meal_id in information})
+
+
+@app.route('/api/costs')
+def get_costs() -> Union[Response, tuple]:
+    """
+    Endpoint to total up the costs of many recipes, e.g. a shopping list, from their price breakdowns.
+    Cached breakdowns are used as they are; the others are fetched side by side at background priority
+    on a pool of COSTS_WORKERS threads, so a long list can neither use up the quota of the interactive
+    routes nor hold up their fanout pool.
+    Query parameters:
+        ids (str): Comma-separated recipe IDs, at most MAX_COST_IDS. Without them, the favorites
+            that are Spoonacular recipes are costed.
+        top (int): How many of the cheapest and most expensive ingredients to list, 5 by default.
+    Returns:
+        Union[Response, tuple]: JSON response with the costs per recipe and over all recipes (see
+            summarize_costs), the recipes whose breakdown could not be fetched under "missing",
+            or an error message.
+    """
+
+    top = request.args.get('top', 5, type=int)
+    if not 0 <= top <= MAX_COST_TOP:
+        return jsonify({'error': f'top must be between 0 and {MAX_COST_TOP}'}), 400
+    if 'ids' in request.args:
+        try:
+            meal_ids = [int(meal_id) for meal_id in request.args['ids'].split(',') if meal_id.strip()]
+        except ValueError:
+            return jsonify({'error': 'ids must be comma-separated recipe IDs'}), 400
+    else:
+        # recipes created in Feast Finder have no price breakdown
+        # (keys are usually strings, but an imported file or the SQLite and lazy backends may hold ints)
+        meal_ids = [int(recipe_id) for recipe_id in app.feast_finder.get_favorite_recipes() if str(recipe_id).isdigit()]
+    meal_ids = list(dict.fromkeys(meal_ids))
+    if len(meal_ids) > MAX_COST_IDS:
+        return jsonify({'error': f'at most {MAX_COST_IDS} recipes can be costed at once'}), 400
+
+    breakdowns = fetch_price_breakdowns(meal_ids)
+    summary = summarize_costs(breakdowns, top)
+    summary['missing'] = [meal_id for meal_id in meal_ids if meal_id not in breakdowns]
+    return jsonify(summary)
+
+
+def fetch_price_breakdowns(meal_ids: List[int]) -> dict:
+    """
+    Helper function that gets the price breakdowns of many recipes, fetching the ones that are not cached
+    side by side on the costs pool.
+    Args:
+        meal_ids (List[int]): The IDs of the recipes.
+    Returns:
+        dict: The breakdown of every recipe that could be fetched, keyed by recipe ID, in the order of meal_ids.
+    """
+
+    def fetch(meal_id: int) -> Optional[PriceBreakdown]:
+        try:
+            return fetch_price_breakdown(meal_id, 'costs')
+        except QuotaExceeded:  # <- left out, the caller lists it as missing
+            return None
+
+    cached = app.price_breakdown_cache.peek_many(meal_ids)
+    fetched = {meal_id: fan_out(fetch, meal_id, executor=app.costs_fanout) for meal_id in meal_ids if meal_id not in cached}
+    breakdowns = {meal_id: cached[meal_id] if meal_id in cached else fetched[meal_id].result() for meal_id in meal_ids}
+    return {meal_id: breakdown for meal_id, breakdown in breakdowns.items()
+            if breakdown is not None and breakdown is not NO_PRICE_TABLE}
+
 @app.route('/feastFinder/recipes/favorites/search')
 def search_favorite_recipes() -> jsonify:
     """
     Endpoint to search for recipes in favorites based on query terms.
     The search looks for matches in title, instructions, and ingredients.
+
+    Passing `limit` and/or `cursor` switches to ranked search: the best matches
+    come first (title matches weigh most), query words also match as prefixes or
+    with typos (disable with `prefix=false` / `fuzzy=false`), and the response is
+    one page of results plus the cursor of the next page.
         
     Returns:
         Response: JSON response containing matching recipes
     """
 
+    if 'limit' in request.args or 'cursor' in request.args:
+        return search_favorite_recipes_ranked()
+
     query = request.args.get('query', '').lower()
     if not query:
         return jsonify({})
     
-    favorite_recipes = app.feast_finder.get_favorite_recipes()
-    matching_recipes = {}
-    
-    for recipe_id, recipe in favorite_recipes.items():
-        # search in title, instructions, and ingredients
-        if (query in recipe.title.lower() or 
-            query in recipe.instructions.lower() or 
-            query in recipe.ingredients.lower()):
-            matching_recipes[recipe_id] = recipe.__dict__
+    # search in title, instructions, and ingredients through the inverted index
+    matching_recipes = app.feast_finder.search_recipes(query)
     
-    return jsonify(matching_recipes)
+    return jsonify({recipe_id: recipe.to_dict() for recipe_id, recipe in matching_recipes.items()})
+
+
+def search_favorite_recipes_ranked() -> Union[Response, tuple]:
+    """
+    Helper function for the ranked, paginated mode of the favorites search.
+    Returns:
+        Union[Response, tuple]: JSON response with the results and the next cursor, or an error message.
+    """
+
+    query = request.args.get('query', '')
+    limit = request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int)
+    cursor = request.args.get('cursor') or None
+    prefix = request.args.get('prefix', 'true').lower() != 'false'
+    fuzzy = request.args.get('fuzzy', 'true').lower() != 'false'
+
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {MAX_SEARCH_LIMIT}'}), 400
+
+    try:
+        results, next_cursor = app.feast_finder.rank_recipes(query, limit, cursor, prefix, fuzzy)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    return jsonify({
+        'results': [{'recipe': recipe.to_dict(), 'score': score} for recipe, score in results],
+        'next_cursor': next_cursor
+    })
+
+
+@app.route('/feastFinder/recipes/favorites/cookable')
+def get_cookable_recipes() -> Union[Response, tuple]:
+    """
+    Endpoint to find the favorites that can be cooked with the ingredients on hand.
+    Recipes are ranked by how many of their ingredients are missing (none first, then one, and so on),
+    then by the share of their ingredients that is on hand.
+    Query parameters:
+        have (str): Comma-separated ingredients on hand, e.g. "eggs,flour,milk".
+        max_missing (int): Leave out recipes missing more ingredients.
+        limit (int): The maximum number of results, DEFAULT_SEARCH_LIMIT by default.
+        staples (str): "false" to not count water, salt and pepper as on hand.
+    Returns:
+        Union[Response, tuple]: JSON response with the results, each with the recipe, its missing
+            ingredients and how many ingredients it needs and has, and how many recipes miss how
+            many ingredients ("by_missing"), or an error message.
+    """
+
+    have = [ingredient for ingredient in request.args.get('have', '').split(',') if ingredient.strip()]
+    limit = request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int)
+    max_missing = request.args.get('max_missing', type=int)
+    staples = request.args.get('staples', 'true').lower() != 'false'
+
+    if not 1 <= limit <= MAX_SEARCH_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {MAX_SEARCH_LIMIT}'}), 400
+    if max_missing is not None and max_missing < 0:
+        return jsonify({'error': 'max_missing must not be negative'}), 400
+
+    results, counts = app.feast_finder.cookable_recipes(have, max_missing, limit, staples)
+    return jsonify({
+        'results': [{'recipe': recipe.to_dict(), 'missing': missing, 'ingredients': needed, 'on_hand': on_hand}
+                    for recipe, missing, needed, on_hand in results],
+        'by_missing': counts
+    })
 
 if __name__ == '__main__':
     app.run(debug=True, port = 5002)
@@ -0,0 +1,297 @@
+"""
+ASGI entry point of the back end.
+
+The Spoonacular proxy routes are served by the async handlers below, so a call
+waiting for Spoonacular only holds a coroutine and a single worker process can
+keep hundreds of them in flight. Every other route, including the favorites
+CRUD and the price breakdown widget images (which are mostly sent from the disk
+cache), is passed to the Flask app.
+
+Run with:
+    uvicorn asgi:application --port 5000
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+import asyncio
+import json
+import os
+import math
+import re
+import time
+from asgiref.wsgi import WsgiToAsgi
+import app as backend
+from feast_finder import PriceBreakdown, QuotaExceeded, RequestTimer, SearchCache
+from feast_finder.async_upstream import AsyncUpstreamClient, UpstreamResponse
+from feast_finder.metrics import add_upstream_time, current_timer
+from feast_finder.pricebreakdown import NO_PRICE_TABLE
+
+# connections to Spoonacular kept by the async client; coroutines are cheap, so this can be much larger than threads
+ASYNC_UPSTREAM_POOL_SIZE = int(os.environ.get('ASYNC_UPSTREAM_POOL_SIZE', 200))
+
+# one quota with the Flask routes
+upstream = AsyncUpstreamClient(pool_maxsize=ASYNC_UPSTREAM_POOL_SIZE, scheduler=backend.app.quota)
+backend.app.async_upstream = upstream  # <- its counters are part of /metrics
+flask_application = WsgiToAsgi(backend.app)
+# loads of recipe information in progress, which concurrent requests for the same recipe wait for
+inflight: Dict[int, asyncio.Future] = {}
+
+Handler = Callable[[Dict[str, List[str]], Tuple[str, ...]], Awaitable[Tuple[int, Any]]]
+
+
+async def fetch_upstream(url: str, params: dict, route: str) -> Optional[UpstreamResponse]:
+    """
+    Send a GET request to Spoonacular through the shared async client.
+
+    Parameters:
+        url (str): The URL.
+        params (dict): The query parameters.
+        route (str): The proxy route, selects the timeouts in UPSTREAM_TIMEOUTS.
+
+    Returns:
+        Optional[UpstreamResponse]: The response, or None if no response arrived in time.
+
+    Raises:
+        QuotaExceeded: If the Spoonacular quota does not allow the call, answered with 503.
+    """
+    started = time.perf_counter()
+    try:
+        return await upstream.get(url, params=params, timeout=backend.UPSTREAM_TIMEOUTS[route],
+                                  priority=backend.UPSTREAM_PRIORITIES[route])
+    except QuotaExceeded:
+        raise
+    except Exception as e:
+        print(f"Upstream request to {url} failed: {e}")
+        return None
+    finally:
+        elapsed = time.perf_counter() - started
+        backend.app.upstream_seconds.observe(elapsed, route)
+        add_upstream_time(elapsed)  # <- tasks started with gather share the request's timer
+
+
+async def fetch_recipe_information(meal_id: int, route: str) -> Optional[dict]:
+    """
+    Get the Spoonacular information of a recipe through the cache shared with the Flask routes.
+
+    Parameters:
+        meal_id (int): The ID of the recipe.
+        route (str): The proxy route asking.
+
+    Returns:
+        Optional[dict]: The recipe information, or None if it could not be fetched.
+    """
+    information = backend.app.recipe_info_cache.peek(meal_id)
+    if information is not None:
+        return information
+
+    async def load() -> Optional[dict]:
+        url = f'{backend.SPOONACULAR_API}/recipes/{meal_id}/information'
+        response = await fetch_upstream(url, {'apiKey': backend.API_KEY}, route)
+        if response is None or response.status_code != 200:
+            return None
+        information = response.json()
+        backend.app.recipe_info_cache.put(meal_id, information)
+        return information
+
+    if meal_id not in inflight:
+        inflight[meal_id] = asyncio.ensure_future(load())
+        inflight[meal_id].add_done_callback(lambda _: inflight.pop(meal_id, None))
+    return await asyncio.shield(inflight[meal_id])
+
+
+async def fetch_price_breakdown(meal_id: int) -> Optional[PriceBreakdown]:
+    """
+    Fetch the price breakdown widget of a meal and parse its table, through the cache shared with the Flask routes.
+
+    Parameters:
+        meal_id (int): The ID of the meal.
+
+    Returns:
+        Optional[PriceBreakdown]: The ingredients, their prices and costs, or None.
+    """
+    price_breakdown = backend.app.price_breakdown_cache.peek(meal_id)
+    if price_breakdown is not None:
+        return None if price_breakdown is NO_PRICE_TABLE else price_breakdown
+
+    url = f'{backend.SPOONACULAR_API}/recipes/{meal_id}/priceBreakdownWidget'
+    response = await fetch_upstream(url, {'apiKey': backend.API_KEY}, 'price_breakdown')
+    if response is None or response.status_code != 200:
+        return None
+    price_breakdown = PriceBreakdown.from_html(response.text)
+    if price_breakdown is None:
+        backend.app.price_breakdown_cache.put(meal_id, NO_PRICE_TABLE, ttl=backend.PRICE_BREAKDOWN_MISSING_TTL)
+    else:
+        backend.app.price_breakdown_cache.put(meal_id, price_breakdown)
+    return price_breakdown
+
+
+def query_int(query: Dict[str, List[str]], name: str) -> Optional[int]:
+    # like request.args.get(name, type=int): None if missing or not an integer
+    try:
+        return int(query[name][0])
+    except (KeyError, ValueError):
+        return None
+
+
+async def get_meals(query: Dict[str, List[str]], _: Tuple[str, ...]) -> Tuple[int, Any]:
+    words = query.get('query', [None])[0]
+    min_calories, max_calories = query_int(query, 'minCalories'), query_int(query, 'maxCalories')
+    key = SearchCache.key(words, min_calories, max_calories)
+    found = backend.app.search_cache.lookup(key)
+    if found is None:
+        params = {'apiKey': backend.API_KEY, **backend.search_params(words, min_calories, max_calories)}
+        response = await fetch_upstream(f'{backend.SPOONACULAR_API}/recipes/complexSearch', params, 'meals')
+        if response is None or response.status_code != 200:
+            return 500, {'error': 'Failed to fetch meals'}
+        data = response.json()
+        found = data['results'], data.get('totalResults', len(data['results']))
+        backend.app.search_cache.store(key, *found)
+    return 200, backend.search_page(found)
+
+
+async def get_recipe(_: Dict[str, List[str]], args: Tuple[str, ...]) -> Tuple[int, Any]:
+    information = await fetch_recipe_information(int(args[0]), 'recipe')
+    if information is None:
+        return 500, {'error': 'Failed to fetch recipe'}
+    return 200, information
+
+
+async def get_recipe_info(_: Dict[str, List[str]], args: Tuple[str, ...]) -> Tuple[int, Any]:
+    information = await fetch_recipe_information(int(args[0]), 'recipe_info')
+    if information is None:
+        return 500, {'error': 'Failed to fetch recipe'}
+    return 200, information
+
+
+async def get_random_recipe(_: Dict[str, List[str]], __: Tuple[str, ...]) -> Tuple[int, Any]:
+    recipe = backend.app.random_pool.take(block=False)  # <- an empty pool is refilled in the background meanwhile
+    if recipe is not None:
+        return 200, recipe
+    response = await fetch_upstream(f'{backend.SPOONACULAR_API}/recipes/random', {'apiKey': backend.API_KEY}, 'random')
+    if response is None or response.status_code != 200:
+        return 500, {'error': 'Failed to fetch random recipe'}
+    return 200, response.json()['recipes'][0]
+
+
+async def get_price_breakdown(query: Dict[str, List[str]], args: Tuple[str, ...]) -> Tuple[int, Any]:
+    breakdown_format = query.get('format', ['table'])[0]
+    if breakdown_format not in ('table', 'costs'):
+        return 400, {'error': 'format must be table or costs'}
+    data = await fetch_price_breakdown(int(args[0]))
+    if data is None:
+        return 500, {'error': 'Failed to fetch price breakdown widget'}
+    return 200, data.to_dict() if breakdown_format == 'costs' else data.to_table()
+
+
+async def get_recipe_card(_: Dict[str, List[str]], args: Tuple[str, ...]) -> Tuple[int, Any]:
+    meal_id = int(args[0])
+    information, price_breakdown = await asyncio.gather(fetch_recipe_information(meal_id, 'recipe_info'),
+                                                        fetch_price_breakdown(meal_id))
+    if information is None:
+        return 500, {'error': 'Failed to fetch recipe'}
+    return 200, {'information': information, 'price_breakdown': price_breakdown and price_breakdown.to_table()}
+
+
+async def get_recipes_info(query: Dict[str, List[str]], _: Tuple[str, ...]) -> Tuple[int, Any]:
+    try:
+        meal_ids = [int(meal_id) for meal_id in query.get('ids', [''])[0].split(',') if meal_id.strip()]
+    except ValueError:
+        return 400, {'error': 'ids must be comma-separated recipe IDs'}
+    if not 1 <= len(meal_ids) <= backend.MAX_BATCH_IDS:
+        return 400, {'error': f'ids must contain between 1 and {backend.MAX_BATCH_IDS} recipe IDs'}
+
+    cache = backend.app.recipe_info_cache
+    information = {meal_id: cache.peek(meal_id) for meal_id in dict.fromkeys(meal_ids)}
+    missing = [meal_id for meal_id, value in information.items() if value is None]
+    if missing:
+        url = f'{backend.SPOONACULAR_API}/recipes/informationBulk'
+        params = {'apiKey': backend.API_KEY, 'ids': ','.join(str(meal_id) for meal_id in missing)}
+        response = await fetch_upstream(url, params, 'recipe_info_bulk')
+        if response is not None and response.status_code == 200:
+            for value in response.json():
+                if value.get('id') in information:
+                    information[value['id']] = value
+                    cache.put(value['id'], value)
+
+    found = {str(meal_id): value for meal_id, value in information.items() if value is not None}
+    if not found:
+        return 500, {'error': 'Failed to fetch recipes'}
+    return 200, found
+
+
+# the async proxy routes, with the rule of the Flask route they stand in for as their metrics label;
+# a path that matches none of them goes to the Flask app
+ROUTES: List[Tuple[re.Pattern, str, Handler]] = [
+    (re.compile(r'/api/meals'), '/api/meals', get_meals),
+    (re.compile(r'/api/recipe/(\d+)'), '/api/recipe/<int:meal_id>', get_recipe),
+    (re.compile(r'/api/recipe/info/(\d+)'), '/api/recipe/info/<int:meal_id>', get_recipe_info),
+    (re.compile(r'/api/random'), '/api/random', get_random_recipe),
+    (re.compile(r'/api/price_breakdown/(\d+)'), '/api/price_breakdown/<int:meal_id>', get_price_breakdown),
+    (re.compile(r'/api/recipe/card/(\d+)'), '/api/recipe/card/<int:meal_id>', get_recipe_card),
+    (re.compile(r'/api/recipes/info'), '/api/recipes/info', get_recipes_info),
+]
+
+
+async def send_json(send: Callable, status: int, payload: Any, headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+    body = (json.dumps(payload) + '\n').encode()
+    response_headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    await send({'type': 'http.response.start', 'status': status, 'headers': response_headers + (headers or [])})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def record_request(rule: str, status: int, timer: RequestTimer) -> None:
+    """
+    Record the duration of an async proxy request in the histograms of the Flask routes, under the same labels.
+
+    Parameters:
+        rule (str): The rule of the Flask route the handler stands in for.
+        status (int): The response status.
+        timer (RequestTimer): The timer of the request.
+    """
+    elapsed = timer.elapsed()
+    backend.app.request_seconds.observe(elapsed, rule, 'GET', str(status))
+    backend.app.request_upstream_seconds.observe(timer.upstream(), rule)
+    backend.app.request_local_seconds.observe(timer.local(elapsed), rule)
+
+
+async def lifespan(receive: Callable, send: Callable) -> None:
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await upstream.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope: dict, receive: Callable, send: Callable) -> None:
+    """
+    The ASGI application: async proxy routes, with the Flask app for everything else.
+
+    Parameters:
+        scope (dict): The connection scope.
+        receive (Callable): Receives ASGI events.
+        send (Callable): Sends ASGI events.
+    """
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    if scope['type'] == 'http' and scope['method'] == 'GET':
+        for pattern, rule, handler in ROUTES:
+            match = pattern.fullmatch(scope['path'])
+            if match:
+                query = parse_qs(scope['query_string'].decode('latin-1'))
+                timer = RequestTimer()
+                token = current_timer.set(timer)
+                headers: List[Tuple[bytes, bytes]] = []
+                try:
+                    status, payload = await handler(query, match.groups())
+                except QuotaExceeded as error:  # <- like the Flask error handler
+                    status, payload = 503, {'error': f'Spoonacular {error.reason} exhausted, try again later'}
+                    headers = [(b'retry-after', str(max(1, math.ceil(error.retry_after))).encode())]
+                finally:
+                    current_timer.reset(token)
+                record_request(rule, status, timer)
+                return await send_json(send, status, payload, headers)
+
+    await flask_application(scope, receive, send)
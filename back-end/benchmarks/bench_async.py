@@ -0,0 +1,142 @@
+"""
+Benchmark of sustained proxy requests per second: the threaded Flask app against the
+ASGI entry point with async upstream calls.
+
+Both serve /api/recipe/info/<id> for ever new IDs (so every request is a cache miss)
+from the local Spoonacular stand-in (spoonacular_stub.py) answering after a fixed delay. The threaded server
+has a fixed number of worker threads, like a gthread worker; the ASGI server runs a
+single event loop.
+
+Usage:
+    python benchmarks/bench_async.py [--delay S] [--concurrency N] [--threads N] [--duration S]
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Tuple
+
+import aiohttp
+import uvicorn
+from werkzeug.serving import BaseWSGIServer
+
+# Add the back-end directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import app as backend  # noqa: E402
+import asgi  # noqa: E402
+from feast_finder import QuotaScheduler  # noqa: E402
+from spoonacular_stub import Injection, make_app, serve_in_thread  # noqa: E402
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    WSGI server that handles requests on a fixed number of threads.
+    """
+
+    def __init__(self, host: str, port: int, app, threads: int):
+        super().__init__(host, port, app)
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_threaded(threads: int) -> Tuple[str, Callable[[], None]]:
+    """
+    Serve the Flask app with a fixed number of threads; return its URL and a function that stops it.
+    """
+    port = free_port()
+    server = PooledWSGIServer("127.0.0.1", port, backend.app, threads)
+    server.socket.listen(1024)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}", server.shutdown
+
+
+def start_asgi() -> Tuple[str, Callable[[], None]]:
+    """
+    Serve the ASGI application with uvicorn; return its URL and a function that stops it.
+    """
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(asgi.application, host="127.0.0.1", port=port,
+                                           log_level="warning", access_log=False, backlog=1024))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+
+    return f"http://127.0.0.1:{port}", stop
+
+
+async def load(base_url: str, concurrency: int, duration: float, ids: itertools.count) -> float:
+    """
+    Keep `concurrency` requests in flight for `duration` seconds and return the successful requests per second.
+    """
+    completed = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(session: aiohttp.ClientSession):
+        nonlocal completed
+        while time.perf_counter() < deadline:
+            async with session.get(f"{base_url}/api/recipe/info/{next(ids)}") as response:
+                await response.read()
+                completed += response.status == 200
+
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency), timeout=timeout) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        return completed / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delay", type=float, default=0.1, help="seconds the stub takes to answer")
+    parser.add_argument("--concurrency", type=int, default=200, help="requests kept in flight by the client")
+    parser.add_argument("--threads", type=int, default=16, help="worker threads of the threaded server")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of load per server")
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    backend.SPOONACULAR_API, _ = serve_in_thread(make_app(injection=Injection(latency=args.delay)))
+    backend.app.upstream.adapter.init_poolmanager(4, args.threads)  # <- one pooled connection per thread
+    # measure the proxy path, not the Spoonacular quota
+    backend.app.upstream.scheduler = asgi.upstream.scheduler = QuotaScheduler(rate=1e9, burst=1e9)
+    ids = itertools.count(1)
+
+    print(f"upstream delay {args.delay * 1000:.0f} ms, {args.concurrency} concurrent requests")
+    print(f"{'server':<28} {'requests/s':>12}")
+    for name, start in ((f"threaded ({args.threads} threads)", lambda: start_threaded(args.threads)),
+                        ("asgi (1 event loop)", start_asgi)):
+        base_url, stop = start()
+        throughput = asyncio.run(load(base_url, args.concurrency, args.duration, ids))
+        stop()
+        print(f"{name:<28} {throughput:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark of the cost analytics over cached price breakdowns.
+
+Shopping lists of recorded widget pages (repeated under new recipe IDs) are costed
+with summarize_costs, and end to end through GET /api/costs with every breakdown
+already cached, the way a list is costed again after its recipes were viewed. A
+per-recipe Python loop that computes the same numbers is the baseline.
+
+Usage:
+    python benchmarks/bench_costs.py [--recordings DIR] [--sizes N [N ...]]
+"""
+import argparse
+import heapq
+import json
+import math
+import sys
+import time
+from pathlib import Path
+
+# Add the back-end directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import app as backend  # noqa: E402
+from feast_finder import PriceBreakdown, TTLCache, summarize_costs  # noqa: E402
+
+
+def python_summary(breakdowns: dict, top: int = 5) -> dict:
+    # the same numbers without NumPy, one recipe and ingredient at a time
+    meals, everything = {}, []
+    for meal_id, breakdown in breakdowns.items():
+        priced = [(cost, ingredient) for cost, ingredient in zip(breakdown.costs.tolist(), breakdown.ingredients)
+                  if not math.isnan(cost)]
+        total = sum(cost for cost, _ in priced) if priced else math.nan
+        servings = round(total / breakdown.per_serving) if priced and breakdown.per_serving > 0 else None
+        meals[meal_id] = {'total': round(total, 2), 'per_serving': breakdown.per_serving, 'servings': servings,
+                          'cheapest': min(priced) if priced else None,
+                          'most_expensive': max(priced) if priced else None}
+        everything.extend((cost, meal_id, ingredient) for cost, ingredient in priced)
+    return {'meals': meals, 'cheapest': heapq.nsmallest(top, everything), 'most_expensive': heapq.nlargest(top, everything)}
+
+
+def milliseconds(run, repeat: int = 5) -> float:
+    """
+    Run `run` `repeat` times and return the fastest run in milliseconds.
+    """
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recordings", default=str(Path(__file__).parent.parent / "recordings"),
+                        help="directory with priceBreakdownWidget.json, see spoonacular_stub.py")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="recipes per shopping list")
+    args = parser.parse_args()
+
+    recorded = json.loads((Path(args.recordings) / "priceBreakdownWidget.json").read_text())
+    pages = [answer["body"] for answer in recorded.values() if answer["status"] == 200]
+    client = backend.app.test_client()
+
+    for count in args.sizes:
+        breakdowns = {meal_id: PriceBreakdown.from_html(pages[meal_id % len(pages)]) for meal_id in range(1, count + 1)}
+        backend.app.price_breakdown_cache = TTLCache(max_entries=count)
+        for meal_id, breakdown in breakdowns.items():
+            backend.app.price_breakdown_cache.put(meal_id, breakdown)
+        url = f"/api/costs?ids={','.join(map(str, breakdowns))}"
+        runs = [("Python loop", lambda: python_summary(breakdowns)),
+                ("summarize_costs", lambda: summarize_costs(breakdowns))]
+        if count <= backend.MAX_COST_IDS:
+            assert client.get(url).get_json()["missing"] == []
+            runs.append(("GET /api/costs, all cached", lambda: client.get(url)))
+
+        print(f"{count:,} recipes, milliseconds:")
+        for name, run in runs:
+            print(f"    {name:<34} {milliseconds(run):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
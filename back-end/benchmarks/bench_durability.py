@@ -0,0 +1,54 @@
+"""
+Benchmark of favorites write throughput for every storage backend and durability level.
+
+Usage:
+    python benchmarks/bench_durability.py [--writes N]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the back-end directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from feast_finder import Feast_Finder, Recipe  # noqa: E402
+
+
+def run(storage: str, durability: str, writes: int) -> float:
+    """
+    Add and then update `writes` recipes and return the achieved writes per second.
+
+    The time includes closing the Feast_Finder, so write-behind modes pay for their
+    final flush as well.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        feast_finder = Feast_Finder(str(Path(tmp_dir) / "favrecipes.json"), compact_threshold=10 ** 9,
+                                    storage=storage, durability=durability)
+
+        start = time.perf_counter()
+        for i in range(writes):
+            feast_finder.add_recipe(Recipe(f"Recipe {i}", "Cook it", "Salt, Pepper", "", id=str(i)))
+        for i in range(writes):
+            feast_finder.update_recipe(str(i), "Cook it slowly")
+        feast_finder.close()
+        elapsed = time.perf_counter() - start
+
+    return 2 * writes / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=2000, help="number of recipes to add and update")
+    args = parser.parse_args()
+
+    print(f"{'storage':<8} {'durability':<10} {'writes/s':>12}")
+    for storage in ("json", "sqlite"):
+        for durability in ("write", "batch", "interval"):
+            throughput = run(storage, durability, args.writes)
+            print(f"{storage:<8} {durability:<10} {throughput:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark of the overhead of the request metrics.
+
+GET /health, the cheapest route, is served through the Flask test client with the
+timing hooks and without them, so the difference is what the metrics add to every
+request. A histogram observation on its own and rendering /metrics are timed too.
+
+Usage:
+    python benchmarks/bench_metrics.py [--requests N]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add the back-end directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import app as backend  # noqa: E402
+from feast_finder import Histogram  # noqa: E402
+
+
+def microseconds(run, count: int, repeat: int = 5) -> float:
+    """
+    Run `run` `count` times, `repeat` times over, and return the fastest time per run in microseconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(count):
+            run()
+        best = min(best, time.perf_counter() - start)
+    return best / count * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per timing")
+    args = parser.parse_args()
+
+    app = backend.app
+    client = app.test_client()
+    histogram = Histogram("bench_seconds", "Benchmark.", ("route",))
+
+    timed = microseconds(lambda: client.get("/health"), args.requests)
+    # without the two timing hooks only; CORS has an after_request hook too
+    app.before_request_funcs[None].remove(backend.start_request_timer)
+    app.after_request_funcs[None].remove(backend.record_request_timer)
+    untimed = microseconds(lambda: client.get("/health"), args.requests)
+    app.before_request_funcs[None].append(backend.start_request_timer)
+    app.after_request_funcs[None].append(backend.record_request_timer)
+
+    print("microseconds per call:")
+    print(f"    {'GET /health without metrics':<34} {untimed:>8.1f}")
+    print(f"    {'GET /health with metrics':<34} {timed:>8.1f}")
+    print(f"    {'Histogram.observe':<34} {microseconds(lambda: histogram.observe(0.01, '/health'), 100000):>8.2f}")
+    print(f"    {'GET /metrics':<34} {microseconds(lambda: client.get('/metrics'), 200):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark of the price breakdown extraction on recorded Spoonacular widget pages.
+
+The single-pass extractor is compared with the BeautifulSoup html.parser version
+that /api/price_breakdown used before, and with a lookup in the per-meal cache of
+extracted breakdowns that repeated requests for a meal are now answered from.
+
+Usage:
+    python benchmarks/bench_price_breakdown.py [--recordings DIR] [--rounds N]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add the back-end directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from feast_finder import TTLCache, extract_price_breakdown  # noqa: E402
+from feast_finder.pricebreakdown import INGREDIENTS_STYLE, PRICES_STYLE  # noqa: E402
+
+
+def beautifulsoup_price_breakdown(html: str) -> tuple:
+    # the previous clean_html_response
+    parsed_html = BeautifulSoup(html, "html.parser")
+    ingredients_container = parsed_html.find('div', id='spoonacularPriceBreakdownTable') \
+        .find('div', style=lambda value: value and INGREDIENTS_STYLE in value)
+    prices_container = parsed_html.find('div', id='spoonacularPriceBreakdownTable') \
+        .find('div', style=lambda value: value and PRICES_STYLE in value)
+    return ([ingredient.strip() for ingredient in ingredients_container.stripped_strings],
+            [price.strip() for price in prices_container.stripped_strings])
+
+
+def per_page(extract, pages: list, rounds: int) -> float:
+    """
+    Run `extract` on every page `rounds` times and return the microseconds per page.
+    """
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            extract(page)
+    return (time.perf_counter() - start) / (rounds * len(pages)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recordings", default=str(Path(__file__).parent.parent / "recordings"),
+                        help="directory with priceBreakdownWidget.json, see spoonacular_stub.py")
+    parser.add_argument("--rounds", type=int, default=2000, help="extractions of every page")
+    args = parser.parse_args()
+
+    recorded = json.loads((Path(args.recordings) / "priceBreakdownWidget.json").read_text())
+    pages = {path.split("/")[2]: answer["body"] for path, answer in recorded.items() if answer["status"] == 200}
+    for meal_id, page in pages.items():
+        if extract_price_breakdown(page) != beautifulsoup_price_breakdown(page):
+            sys.exit(f"the extractors disagree on meal {meal_id}")
+
+    cache = TTLCache()
+    for meal_id, page in pages.items():
+        cache.get(meal_id, lambda: extract_price_breakdown(page))
+
+    print(f"{len(pages)} recorded widget pages, {sum(map(len, pages.values())) // len(pages):,} characters on average")
+    timings = [(name, per_page(extract, inputs, args.rounds)) for name, extract, inputs in (
+        ("BeautifulSoup html.parser", beautifulsoup_price_breakdown, list(pages.values())),
+        ("single-pass extractor", extract_price_breakdown, list(pages.values())),
+        ("cached per meal", lambda meal_id: cache.get(meal_id, lambda: None), list(pages)))]
+    print("  microseconds per page:")
+    for name, took in timings:
+        print(f"    {name:<26} {took:>10,.1f}  ({timings[0][1] / took:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark of the memory used per Recipe and of recipe serialization throughput.
+
+The slots-based Recipe is compared with an equivalent plain class that keeps its
+fields in a per-instance __dict__, as Recipe did before.
+
+Usage:
+    python benchmarks/bench_recipes.py [--sizes N [N ...]]
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add the back-end directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from feast_finder import Recipe  # noqa: E402
+from feast_finder.recipe import recipes_to_json  # noqa: E402
+
+
+class DictRecipe:
+    def __init__(self, title: str, instructions: str, ingredients: str, image: str, id: int = None) -> None:
+        self.title = title
+        self.recipe_id = id
+        self.instructions = instructions
+        self.ingredients = ingredients
+        self.image = image
+
+
+def overhead(cls: type, count: int, fields: list) -> float:
+    """
+    Build `count` recipes from existing strings and return the bytes allocated per recipe.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    recipes = [cls(title, "Cook it", "Salt, Pepper", "", id=rid) for rid, title in fields]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # the list holding the recipes is not part of their overhead
+    return (allocated - sys.getsizeof(recipes)) / count
+
+
+def throughput(serialize, count: int) -> float:
+    """
+    Run `serialize` once and return the recipes serialized per second.
+    """
+    start = time.perf_counter()
+    serialize()
+    return count / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10 ** 5, 10 ** 6], help="numbers of recipes")
+    args = parser.parse_args()
+
+    for count in args.sizes:
+        fields = [(str(i), f"Recipe {i}") for i in range(count)]
+        print(f"{count:,} recipes")
+        print(f"  bytes per recipe: __dict__ {overhead(DictRecipe, count, fields):.0f}, "
+              f"__slots__ {overhead(Recipe, count, fields):.0f}")
+
+        old = [DictRecipe(title, "Cook it", "Salt, Pepper", "", id=rid) for rid, title in fields]
+        recipes = [Recipe(title, "Cook it", "Salt, Pepper", "", id=rid) for rid, title in fields]
+        print("  recipes serialized per second:")
+        for name, serialize in (
+                ("json.dumps(__dict__) per recipe", lambda: [json.dumps(r.__dict__) for r in old]),
+                ("to_json() per recipe", lambda: [r.to_json() for r in recipes]),
+                ("json.dump snapshot of __dict__s", lambda: json.dumps({r.recipe_id: r.__dict__ for r in old}, indent=4)),
+                ("recipes_to_json snapshot", lambda: recipes_to_json(recipes))):
+            print(f"    {name:<34} {throughput(serialize, count):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark of favorites startup time and memory for the eager JSON store and the lazy store.
+
+Usage:
+    python benchmarks/bench_startup.py [--recipes N]
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add the back-end directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from feast_finder import Feast_Finder, Recipe  # noqa: E402
+
+
+def run(storage: str, seed_path: str) -> tuple:
+    """
+    Load a copy of the favorites file and read one recipe, returning the seconds
+    and the peak bytes allocated. The lazy store is opened once beforehand, so the
+    measurement is of a restart rather than of the one-time import.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = str(Path(tmp_dir) / "favrecipes.json")
+        shutil.copy(seed_path, file_path)
+        if storage == 'lazy':
+            warmup = Feast_Finder(file_path, storage=storage)
+            warmup.load_recipes()
+            warmup.close()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        feast_finder = Feast_Finder(file_path, storage=storage)
+        feast_finder.load_recipes()
+        feast_finder.get_recipe("0")
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        feast_finder.close()
+
+    return elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=100000, help="number of favorites in the file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        seed_path = str(Path(tmp_dir) / "seed.json")
+        with open(seed_path, "w") as file:
+            json.dump({str(i): Recipe(f"Recipe {i}", "Cook it", "Salt, Pepper", "", id=str(i)).to_dict()
+                       for i in range(args.recipes)}, file)
+
+        print(f"{'storage':<8} {'startup (s)':>12} {'peak memory (MB)':>18}")
+        for storage in ("json", "lazy"):
+            elapsed, peak = run(storage, seed_path)
+            print(f"{storage:<8} {elapsed:>12.3f} {peak / 2 ** 20:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,23 @@
 from .util import check_recipe_fields
-from .feast_finder import Feast_Finder, Recipe
\ No newline at end of file
+from .feast_finder import Feast_Finder, Recipe
+from .storage import Storage, JsonStorage, SqliteStorage
+from .bulk import iter_json_array, iter_ndjson
+from .lazy import LazyStorage
+from .upstream import UpstreamClient
+from .ttlcache import TTLCache
+from .diskcache import DiskCache
+from .quota import QuotaExceeded, QuotaScheduler
+from .searchcache import SearchCache
+from .randompool import RecipePool
+from .pricebreakdown import PriceBreakdown, extract_price_breakdown
+from .costs import summarize_costs
+from .ingredients import IngredientIndex
+from .metrics import Histogram, RequestTimer
+from .profiling import RequestProfiler
+
+__all__ = [
+    'check_recipe_fields', 'Feast_Finder', 'Recipe', 'Storage', 'JsonStorage', 'SqliteStorage', 'iter_json_array',
+    'iter_ndjson', 'LazyStorage', 'UpstreamClient', 'TTLCache', 'DiskCache', 'QuotaExceeded', 'QuotaScheduler',
+    'SearchCache', 'RecipePool', 'PriceBreakdown', 'extract_price_breakdown', 'summarize_costs', 'IngredientIndex',
+    'Histogram', 'RequestTimer', 'RequestProfiler',
+]
@@ -0,0 +1,138 @@
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import json
+import random
+import aiohttp
+from .quota import QUOTA_STATUSES, QuotaScheduler
+from .upstream import DEFAULT_TIMEOUT, RETRY_STATUSES
+
+
+class UpstreamResponse:
+    """
+        Fully read answer of an upstream call.
+
+        Parameters:
+            status_code (int): The HTTP status.
+            headers (Dict[str, str]): The response headers.
+            content (bytes): The body.
+    """
+
+    def __init__(self, status_code: int, headers: Dict[str, str], content: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class AsyncUpstreamClient:
+    """
+        Asyncio counterpart of UpstreamClient for the Spoonacular API.
+
+        Calls share one aiohttp session with a bounded pool of kept-alive
+        connections. A call waiting for Spoonacular only holds a coroutine, not a
+        thread, so one worker process can keep hundreds of calls in flight. Timeouts,
+        retries, backoff and the quota scheduler behave like those of UpstreamClient.
+
+        The session is created on the event loop that makes the first call.
+
+        Parameters:
+            pool_maxsize (int): The maximum number of connections per host.
+            timeout (Tuple[float, float]): The default (connect, read) timeout in seconds.
+            retries (int): How many times a failed call is retried.
+            backoff (float): The base delay in seconds before the first retry.
+            max_backoff (float): The longest delay in seconds before a retry.
+            scheduler (Optional[QuotaScheduler]): The quota scheduler in front of every call, none if None.
+    """
+
+    def __init__(self, pool_maxsize: int = 100, timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+                 retries: int = 2, backoff: float = 0.1, max_backoff: float = 2.0,
+                 scheduler: Optional[QuotaScheduler] = None):
+        self.scheduler = scheduler
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.counters = {'requests': 0, 'retries': 0, 'errors': 0}
+
+    def _session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_maxsize, limit=0)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def get(self, url: str, params: Optional[Dict] = None,
+                  timeout: Optional[Tuple[float, float]] = None, priority: str = 'interactive') -> UpstreamResponse:
+        """
+        Send a GET request, retrying connection errors, timeouts and retryable statuses.
+
+        Parameters:
+            url (str): The URL.
+            params (Optional[Dict]): The query parameters.
+            timeout (Optional[Tuple[float, float]]): The (connect, read) timeout in
+                seconds, the client's default if None.
+            priority (str): The priority class of the call in the quota scheduler.
+
+        Returns:
+            UpstreamResponse: The last response, which may still have a retryable status.
+
+        Raises:
+            aiohttp.ClientError: If the last attempt failed without a response.
+            asyncio.TimeoutError: If the last attempt timed out.
+            QuotaExceeded: If the quota does not allow the call.
+        """
+        connect, read = timeout or self.timeout
+        client_timeout = aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        params = {key: str(value) for key, value in (params or {}).items() if value is not None}
+        for attempt in range(self.retries + 1):
+            if self.scheduler is not None:
+                await asyncio.sleep(self.scheduler.reserve(priority))
+            self.counters['requests' if attempt == 0 else 'retries'] += 1
+            try:
+                async with self._session().get(url, params=params, timeout=client_timeout) as response:
+                    result = UpstreamResponse(response.status, dict(response.headers), await response.read())
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.retries:
+                    self.counters['errors'] += 1
+                    raise
+                await asyncio.sleep(self._delay(attempt))
+                continue
+            if self.scheduler is not None:
+                self.scheduler.observe(result.status_code, result.headers)
+            if result.status_code in RETRY_STATUSES and attempt < self.retries:
+                await asyncio.sleep(self._delay(attempt, result.headers.get('Retry-After')))
+                continue
+            if self.scheduler is not None and result.status_code in QUOTA_STATUSES:
+                raise self.scheduler.exceeded(priority)
+            return result
+
+    def _delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        # "full jitter", as in UpstreamClient
+        if retry_after is not None and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the call counters and the use of the connection pool.
+
+        Returns:
+            Dict[str, Any]: The counters, the pool size and the connections in use.
+        """
+        in_use = 0
+        if self.session is not None and not self.session.closed:
+            connector = self.session.connector
+            in_use = sum(len(connections) for connections in getattr(connector, '_acquired_per_host', {}).values())
+        return {**self.counters, 'pool_maxsize': self.pool_maxsize, 'in_use': in_use}
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
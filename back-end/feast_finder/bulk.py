@@ -0,0 +1,188 @@
+from typing import Any, BinaryIO, Iterable, Iterator, Optional, Tuple
+import codecs
+import json
+
+CHUNK_SIZE = 64 * 1024
+# characters that may continue a number, so a number at the end of a chunk is read on
+NUMBER_CHARACTERS = frozenset('0123456789.eE+-')
+
+
+class InvalidItem:
+    """
+        Placeholder for an item of a bulk import that could not be parsed.
+
+        Parameters:
+            message (str): Why the item is invalid.
+    """
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+def iter_ndjson(stream: BinaryIO) -> Iterator[Any]:
+    """
+    Parse newline-delimited JSON one line at a time, reading the stream in chunks.
+
+    Parameters:
+        stream (BinaryIO): The input stream.
+
+    Returns:
+        Iterator[Any]: The parsed value of every non-empty line, or an InvalidItem
+            for lines that are not valid JSON.
+    """
+    rest = b''
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        lines = (rest + chunk).split(b'\n')
+        rest = lines.pop() if chunk else b''
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except (UnicodeDecodeError, json.JSONDecodeError) as error:
+                yield InvalidItem(f"invalid JSON: {error}")
+        if not chunk:
+            return
+
+
+class _ArrayReader:
+    # the decoded text of a stream, read one chunk at a time, with a read position
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def fill(self) -> None:
+        # drop what was read and append the next chunk
+        chunk = self.stream.read(CHUNK_SIZE)
+        self.eof = not chunk
+        try:
+            text = self.text_decoder.decode(chunk, final=self.eof)
+        except UnicodeDecodeError as error:
+            raise ValueError(f"invalid UTF-8: {error}") from None
+        self.buffer = self.buffer[self.position:] + text
+        self.position = 0
+
+    def peek(self) -> str:
+        # the next character that is not whitespace, '' at the end of the stream
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position:self.position + 1]
+            self.fill()
+
+    def advance(self) -> None:
+        self.position += 1
+
+    def value(self, index: int) -> Any:
+        # the JSON value at the read position, reading on while it may continue in the next chunk
+        found = self.peek()
+        if found in ('', ',', ']'):
+            raise ValueError(f"expected element {index} of the JSON array, found {found or 'the end'}")
+        failed_at = None
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError as error:
+                failed_at = self._check_error(error, index, failed_at)
+            else:
+                if self.eof or end < len(self.buffer) and self.buffer[end] not in NUMBER_CHARACTERS:
+                    self.position = end
+                    return value
+            self.fill()
+
+    def _check_error(self, error: json.JSONDecodeError, index: int, failed_at: Optional[Tuple[int, str]]) -> Tuple[int, str]:
+        # raise if more text cannot fix the error: at the end of the stream, or when it stayed put after a
+        # refill; an unterminated string may just be longer than a chunk
+        where = (error.pos - self.position, error.msg)
+        if self.eof or where == failed_at and not error.msg.startswith('Unterminated string'):
+            raise ValueError(f"invalid JSON in element {index} of the JSON array: {error.msg}") from None
+        return where
+
+
+def iter_json_array(stream: BinaryIO) -> Iterator[Any]:
+    """
+    Parse the elements of a JSON array incrementally, without loading the whole array.
+
+    Parameters:
+        stream (BinaryIO): The input stream.
+
+    Returns:
+        Iterator[Any]: The elements of the array.
+
+    Raises:
+        ValueError: At the first syntax error, e.g. a missing or doubled comma,
+            naming the position of the element where it occurred.
+    """
+    reader = _ArrayReader(stream)
+    if reader.peek() != '[':
+        raise ValueError("expected a JSON array")
+    reader.advance()
+    if reader.peek() == ']':
+        return
+
+    index = 0
+    while True:
+        yield reader.value(index)
+        separator = reader.peek()
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError(f"expected ',' or ']' after element {index} of the JSON array, "
+                             f"found {separator or 'the end'}")
+        reader.advance()
+        index += 1
+
+
+def stop_at_error(items: Iterator[Any]) -> Iterator[Any]:
+    """
+    Pass on the items of a parser, ending with an InvalidItem instead of the ValueError it raises.
+
+    Parameters:
+        items (Iterator[Any]): The parsed items, e.g. of iter_json_array.
+
+    Returns:
+        Iterator[Any]: The same items, and an InvalidItem if parsing failed.
+    """
+    try:
+        yield from items
+    except ValueError as error:
+        yield InvalidItem(str(error))
+
+
+def ndjson_chunks(items: Iterable[dict]) -> Iterator[str]:
+    """
+    Serialize items as newline-delimited JSON, one item per chunk.
+
+    Parameters:
+        items (Iterable[dict]): The items.
+
+    Returns:
+        Iterator[str]: The lines.
+    """
+    for item in items:
+        yield json.dumps(item) + '\n'
+
+
+def json_array_chunks(items: Iterable[dict]) -> Iterator[str]:
+    """
+    Serialize items as a JSON array, one item per chunk.
+
+    Parameters:
+        items (Iterable[dict]): The items.
+
+    Returns:
+        Iterator[str]: The pieces of the array.
+    """
+    separator = '['
+    for item in items:
+        yield separator + json.dumps(item)
+        separator = ',\n'
+    yield '[]' if separator == '[' else ']\n'
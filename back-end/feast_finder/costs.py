@@ -0,0 +1,80 @@
+from typing import Any, Dict, Hashable, List, Mapping, Optional
+import math
+import numpy as np
+from .pricebreakdown import PriceBreakdown
+
+
+def _amounts(values: np.ndarray) -> List[Optional[float]]:
+    # dollars rounded to cents, None where unknown
+    return [None if math.isnan(value) else value for value in np.round(values, 2).tolist()]
+
+
+def summarize_costs(breakdowns: Mapping[Hashable, PriceBreakdown], top: int = 5) -> Dict[str, Any]:
+    """
+    Total up the costs of many recipes, e.g. a shopping list.
+
+    The ingredient costs of all recipes are concatenated into one array, so the
+    totals and the cheapest and most expensive ingredients of every recipe come
+    from a few NumPy operations instead of a Python loop over the ingredients.
+
+    Parameters:
+        breakdowns (Mapping[Hashable, PriceBreakdown]): The price breakdowns by recipe ID.
+        top (int): How many of the cheapest and most expensive ingredients of all recipes to list.
+
+    Returns:
+        Dict[str, Any]: Per recipe ("meals", in the order given) the total, the cost per
+            serving, the number of servings and the cheapest and most expensive ingredient;
+            over all recipes the total, the average cost per serving and the top cheapest
+            and most expensive ingredients. Unknown amounts are None.
+    """
+    meal_ids = list(breakdowns)
+    tables = [breakdowns[meal_id] for meal_id in meal_ids]
+    counts = np.fromiter((len(table.costs) for table in tables), dtype=np.intp, count=len(tables))
+    starts = np.cumsum(counts) - counts
+    costs = np.concatenate([table.costs for table in tables]) if tables else np.empty(0)
+    meal_of_row = np.repeat(np.arange(len(tables)), counts)
+
+    rows = np.flatnonzero(~np.isnan(costs))  # <- ingredients with a price
+    priced = np.bincount(meal_of_row[rows], minlength=len(tables))
+    totals = np.bincount(meal_of_row[rows], weights=costs[rows], minlength=len(tables)).astype(float)
+    totals[priced == 0] = np.nan
+    per_serving = np.fromiter((table.per_serving for table in tables), dtype=float, count=len(tables))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        servings = np.round(totals / per_serving)
+    servings[~(servings > 0)] = np.nan
+
+    # sorted by recipe, then cost: the first row of every recipe is its cheapest, the last its most expensive
+    order = rows[np.lexsort((costs[rows], meal_of_row[rows]))]
+    sorted_meals = meal_of_row[order]
+    first = np.flatnonzero(np.diff(sorted_meals, prepend=-1))
+    last = np.append(first[1:], len(order))[:len(first)] - 1
+    cheapest = np.full(len(tables), -1)
+    cheapest[sorted_meals[first]] = order[first]
+    most_expensive = np.full(len(tables), -1)
+    most_expensive[sorted_meals[last]] = order[last]
+
+    def ingredients(selected: np.ndarray) -> List[Optional[Dict[str, Any]]]:
+        # the recipe, name and cost of the ingredient in every selected row, None for -1
+        found = np.flatnonzero(selected >= 0)
+        rows = selected[found]
+        meals = meal_of_row[rows]
+        listed: List[Optional[Dict[str, Any]]] = [None] * len(selected)
+        for index, meal, offset, cost in zip(found.tolist(), meals.tolist(), (rows - starts[meals]).tolist(),
+                                             _amounts(costs[rows])):
+            listed[index] = {'meal_id': meal_ids[meal], 'ingredient': tables[meal].ingredients[offset], 'cost': cost}
+        return listed
+
+    by_cost = rows[np.argsort(costs[rows], kind='stable')]
+    meals = zip(meal_ids, _amounts(totals), _amounts(per_serving),
+                [None if math.isnan(count) else int(count) for count in servings.tolist()],
+                ingredients(cheapest), ingredients(most_expensive))
+    known_per_serving = per_serving[~np.isnan(per_serving)]
+    return {
+        'meals': {meal_id: {'total': total, 'per_serving': cost, 'servings': count,
+                            'cheapest': low, 'most_expensive': high}
+                  for meal_id, total, cost, count, low, high in meals},
+        'total': _amounts(np.nansum(totals, keepdims=True))[0] if rows.size else None,
+        'average_per_serving': _amounts(known_per_serving.mean(keepdims=True))[0] if known_per_serving.size else None,
+        'cheapest': ingredients(by_cost[:top]),
+        'most_expensive': ingredients(by_cost[::-1][:top]),
+    }
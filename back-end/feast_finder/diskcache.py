@@ -0,0 +1,146 @@
+from typing import Dict, Hashable, Iterable, Iterator, Optional, Tuple
+import hashlib
+import os
+import threading
+import uuid
+
+
+class DiskCache:
+    """
+        Content-addressed cache of upstream files, e.g. images, bounded by total size.
+
+        Every file is stored once under the digest of its content, so identical
+        files share a blob and the digest doubles as a strong ETag; a small key
+        file maps each cache key to its digest. When the blobs grow beyond
+        max_bytes the least recently used ones are deleted.
+
+        Parameters:
+            directory (str): The directory of the cache, created if missing.
+            max_bytes (int): The maximum total size of the cached files.
+            suffix (str): The file name extension of the blobs.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 2 ** 20, suffix: str = ''):
+        self.directory = directory
+        self.blob_dir = os.path.join(directory, 'blobs')
+        self.key_dir = os.path.join(directory, 'keys')
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.key_dir, exist_ok=True)
+        self.size = 0
+        for entry in os.scandir(self.blob_dir):
+            if entry.name.endswith('.tmp'):
+                os.remove(entry.path)  # <- left behind by an interrupted download
+            elif entry.is_file():
+                self.size += entry.stat().st_size
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+
+    def _key_path(self, key: Hashable) -> str:
+        return os.path.join(self.key_dir, hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest())
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest + self.suffix)
+
+    def lookup(self, key: Hashable) -> Optional[Tuple[str, str]]:
+        """
+        Find the cached file of a key and mark it as recently used.
+
+        Parameters:
+            key (Hashable): Identifies the file, e.g. a meal ID.
+
+        Returns:
+            Optional[Tuple[str, str]]: The path and the content digest of the file,
+                or None if it is not cached.
+        """
+        key_path = self._key_path(key)
+        try:
+            with open(key_path) as file:
+                digest = file.read().strip()
+        except FileNotFoundError:
+            self._count('misses')
+            return None
+        path = self._blob_path(digest)
+        try:
+            os.utime(path)  # <- eviction goes by modification time
+        except FileNotFoundError:
+            # the blob was evicted
+            with self._lock:
+                if os.path.exists(key_path):
+                    os.remove(key_path)
+            self._count('misses')
+            return None
+        self._count('hits')
+        return path, digest
+
+    def store_stream(self, key: Hashable, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Pass the chunks of a file through while writing them to the cache.
+
+        The file is only added to the cache once every chunk went through; if the
+        consumer stops early or the chunks fail, the partial copy is deleted.
+
+        Parameters:
+            key (Hashable): Identifies the file, e.g. a meal ID.
+            chunks (Iterable[bytes]): The content of the file.
+
+        Returns:
+            Iterator[bytes]: The same chunks.
+        """
+        tmp_path = os.path.join(self.blob_dir, f".{uuid.uuid4().hex}.tmp")
+        hasher = hashlib.blake2b(digest_size=16)
+        complete = False
+        try:
+            with open(tmp_path, 'wb') as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    hasher.update(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                self._commit(key, tmp_path, hasher.hexdigest())
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _commit(self, key: Hashable, tmp_path: str, digest: str) -> None:
+        path = self._blob_path(digest)
+        with self._lock:
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                os.utime(path)
+            else:
+                self.size += os.path.getsize(tmp_path)
+                os.replace(tmp_path, path)
+            key_tmp_path = f"{self._key_path(key)}.tmp"
+            with open(key_tmp_path, 'w') as file:
+                file.write(digest)
+            os.replace(key_tmp_path, self._key_path(key))
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # delete the least recently used blobs until the cache fits; their key files are dropped on lookup
+        blobs = [entry for entry in os.scandir(self.blob_dir) if entry.is_file() and not entry.name.endswith('.tmp')]
+        blobs.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in blobs:
+            if self.size <= self.max_bytes:
+                break
+            self.size -= entry.stat().st_size
+            os.remove(entry.path)
+            self.counters['evictions'] += 1
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the hit, miss and eviction counters.
+
+        Returns:
+            Dict[str, int]: The counters and the total size of the cached files in bytes.
+        """
+        with self._lock:
+            return {**self.counters, 'bytes': self.size}
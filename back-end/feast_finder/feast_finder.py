@@ -1,27 +1,17 @@
-from typing import Dict, List, Tuple
-import json
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+import itertools
 import random
-
-class Recipe:
-    def __init__(self, title: str, instructions: str, ingredients: str, image: str, id: int = None) -> None:
-        """
-        Initialize a Recipe object.
-
-        Parameters:
-            title (str): The title of the recipe.
-            id (int): The ID of the recipe.
-            instructions (str): The instructions for making the recipe.
-            ingredients (str): The ingredients required for the recipe.
-            image (str): The URL of the image representing the recipe.
-        """
-        self.title = title
-        self.recipe_id = id
-        self.instructions = instructions
-        self.ingredients = ingredients
-        self.image = image
-
-    def __str__(self):
-        return f"[{self.recipe_id}] Recipe {self.title}"
+import threading
+import uuid
+from .recipe import Recipe, process_raw_json
+from .bulk import InvalidItem, json_array_chunks, ndjson_chunks, stop_at_error
+from .flusher import DURABILITY_LEVELS, Flusher
+from .ingredients import STAPLES, IngredientIndex
+from .metrics import Histogram
+from .payloads import PayloadCache
+from .search import InvertedIndex
+from .storage import Storage, make_storage
+from .util import check_recipe_fields, decode_cursor, encode_cursor
 
 
 class Feast_Finder:
@@ -30,49 +20,142 @@ class Feast_Finder:
 
         Parameters:
             file_path (str): The file path to save the recipes.
+            compact_threshold (int): Number of logged operations after which the
+                log is folded back into the snapshot (JSON storage only).
+            storage (Union[str, Storage]): The storage backend, either "json",
+                "sqlite", "lazy" or a ready-made Storage instance.
+            durability (str): When mutations reach the disk. "write" flushes before
+                every mutation returns; "batch" and "interval" acknowledge after the
+                in-memory update and let a background thread flush (see Flusher).
+            max_delay (float): Longest time in seconds a write stays unflushed.
+            max_pending (int): Number of unflushed writes that forces a flush.
     """
 
-    def __init__(self, file_path: str):
-        self.favorite_recipes = {}
+    def __init__(self, file_path: str, compact_threshold: int = 1000, storage: Union[str, Storage] = 'json',
+                 durability: str = 'write', max_delay: float = 0.05, max_pending: int = 100):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability level: {durability}")
         self.storage_path = file_path
+        # how long loading, writing and flushing the favorites take, by operation
+        self.persistence_seconds = Histogram('feastfinder_persistence_duration_seconds',
+                                             'Time spent in the favorites storage backend.', ('operation',))
+        if isinstance(storage, Storage):
+            self.storage = storage
+        else:
+            self.storage = make_storage(storage, file_path, compact_threshold)
+        # the search and ingredient indexes are built on their first use, so loading stays cheap
+        self.index = InvertedIndex()
+        self._index_ready = False
+        self.ingredient_matrix = IngredientIndex()
+        self._ingredients_ready = False
+        self._index_lock = threading.Lock()
+        # bumped on every change; recipe_versions keeps the version of each recipe's last change
+        self.version = 0
+        self._versions = itertools.count(1)
+        self.recipe_versions: Dict[str, int] = {}
+        self.payloads = PayloadCache()
+        self.durability = durability
+        self.flusher = None
+        if durability != 'write':
+            self.flusher = Flusher(self.flush, durability, max_delay, max_pending)
+
+    @property
+    def favorite_recipes(self) -> Mapping[str, Recipe]:
+        return self.storage.recipes()
 
     def load_recipes(self) -> None:
         """
-        Load recipes from a JSON file.
+        Load recipes from the storage backend.
 
         Returns:
             Dict[str, Any]: Dictionary containing loaded recipes.
         """
-        try:
-            with open(self.storage_path) as file:
-                raw_json = json.load(file)
-                if raw_json:
-                    recipes = self.process_raw_json(raw_json)
-                    self.favorite_recipes = recipes
-
-        except FileNotFoundError:
-            print("There was an error while reading the file")
+        with self.persistence_seconds.time('load'):
+            self.storage.load()
+        with self._index_lock:
+            self.index = InvertedIndex()
+            self._index_ready = False
+            self.ingredient_matrix = IngredientIndex()
+            self._ingredients_ready = False
+        self.version = next(self._versions)
+        self.recipe_versions.clear()
+        self.payloads.clear()
 
     def process_raw_json(self, raw_json) -> Dict[str, Recipe]:
-        recipes = {}
-        for rid, data in raw_json.items(): # rid == recipe_id
-            recipes[rid] = Recipe(
-                data.get('title') or data.get('recipe_title') or '', # real title
-                data['instructions'],
-                data['ingredients'],
-                data.get('image', ''),
-                id=rid
-            )
-        return recipes
-
-    def get_favorite_recipes(self) -> Dict[str, Recipe]:
+        return process_raw_json(raw_json)
+
+    def get_favorite_recipes(self) -> Mapping[str, Recipe]:
         """
         Get all recipes.
 
         Returns:
-            Dict[str, Any]: Dictionary containing all recipes.
+            Mapping[str, Recipe]: Mapping containing all recipes.
+        """
+        return self.storage.recipes()
+
+    def get_recipe(self, recipe_id: str) -> Union[Recipe, None]:
         """
-        return self.favorite_recipes
+        Get a single recipe.
+
+        Parameters:
+            recipe_id (str): The ID of the recipe.
+
+        Returns:
+            Union[Recipe, None]: The recipe, or None if it does not exist.
+        """
+        return self.storage.get(recipe_id)
+
+    def list_recipes(self, limit: int, cursor: Optional[str] = None) -> Tuple[List[Recipe], Optional[str]]:
+        """
+        Get one page of the favorites, ordered by recipe ID.
+
+        Parameters:
+            limit (int): The maximum number of recipes.
+            cursor (Optional[str]): The next_cursor of the previous page.
+
+        Returns:
+            Tuple[List[Recipe], Optional[str]]: The recipes and the cursor of the
+                next page, or None if this is the last one.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        after = self._cursor_id(cursor)
+        recipes = self.storage.page(after, limit + 1)
+        next_cursor = encode_cursor([recipes[limit - 1].recipe_id]) if len(recipes) > limit else None
+        return recipes[:limit], next_cursor
+
+    def iter_recipes(self, cursor: Optional[str] = None, page_size: int = 500) -> Iterator[Recipe]:
+        """
+        Iterate over the favorites ordered by recipe ID, fetching one page at a time.
+
+        Parameters:
+            cursor (Optional[str]): A next_cursor to start after.
+            page_size (int): The number of recipes fetched from the storage at once.
+
+        Returns:
+            Iterator[Recipe]: The recipes.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        after = self._cursor_id(cursor)
+        while True:
+            recipes = self.storage.page(after, page_size)
+            yield from recipes
+            if len(recipes) < page_size:
+                return
+            after = recipes[-1].recipe_id
+
+    @staticmethod
+    def _cursor_id(cursor: Optional[str]) -> Optional[str]:
+        # last recipe ID of the previous page, taken from a listing cursor
+        if not cursor:
+            return None
+        key = decode_cursor(cursor)
+        if len(key) != 1:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return str(key[0])
 
     def add_recipe(self, recipe: Recipe) -> bool:
         """
@@ -84,10 +167,12 @@ class Feast_Finder:
         Returns:
             bool: True if the recipe was successfully added, False otherwise.
         """
-        if recipe.recipe_id in self.favorite_recipes:
+        if self.storage.contains(recipe.recipe_id):
             return False
-        self.favorite_recipes[recipe.recipe_id] = recipe
-        self.save_recipe()
+        with self.persistence_seconds.time('add'):
+            self.storage.add(recipe)
+        self._index_recipe(recipe.recipe_id, recipe)
+        self.written(recipe.recipe_id)
         return True
 
     def update_recipe(self, recipe_id: str, new_instructions: str) -> bool:
@@ -101,10 +186,11 @@ class Feast_Finder:
         Returns:
             bool: True if the recipe was successfully updated, False otherwise.
         """
-        if recipe_id in self.favorite_recipes:
-            recipe = self.favorite_recipes[recipe_id]
-            recipe.instructions = new_instructions
-            self.save_recipe()
+        with self.persistence_seconds.time('update'):
+            updated = self.storage.update_instructions(recipe_id, new_instructions)
+        if updated:
+            self._index_recipe(recipe_id, self.storage.get(recipe_id))
+            self.written(recipe_id)
             return True
         return False
 
@@ -118,27 +204,245 @@ class Feast_Finder:
         Returns:
             bool: True if the recipe was successfully deleted, False otherwise.
         """
-        if recipe_id in self.favorite_recipes:
-            del self.favorite_recipes[recipe_id]
-            self.save_recipe()
+        with self.persistence_seconds.time('delete'):
+            deleted = self.storage.delete(recipe_id)
+        if deleted:
+            self._index_recipe(recipe_id, None)
+            self.written(recipe_id)
             return True
         return False
 
+    def search_index(self) -> InvertedIndex:
+        """
+        Get the search index, building it from the storage on first use.
+
+        Returns:
+            InvertedIndex: The up-to-date search index.
+        """
+        with self._index_lock:
+            if not self._index_ready:
+                # build from a copy: writers change the storage without this lock, and the changes that
+                # miss the copy are applied by _index_recipe once the index is ready
+                self.index.build(list(self.storage.recipes().values()))
+                self._index_ready = True
+        return self.index
+
+    def ingredient_index(self) -> IngredientIndex:
+        """
+        Get the ingredient index, building it from the storage on first use.
+
+        Returns:
+            IngredientIndex: The up-to-date ingredient index.
+        """
+        with self._index_lock:
+            if not self._ingredients_ready:
+                # from a copy, like search_index
+                self.ingredient_matrix.build(list(self.storage.recipes().values()))
+                self._ingredients_ready = True
+        return self.ingredient_matrix
+
+    def _index_recipe(self, recipe_id: str, recipe: Optional[Recipe]) -> None:
+        # keep the built indexes in sync with a changed (or deleted, when None) recipe
+        with self._index_lock:
+            for index, ready in ((self.index, self._index_ready), (self.ingredient_matrix, self._ingredients_ready)):
+                if not ready:
+                    continue
+                if recipe is None:
+                    index.remove(recipe_id)
+                else:
+                    index.add(recipe)
+
+    def search_recipes(self, query: str) -> Dict[str, Recipe]:
+        """
+        Search the favorites for recipes whose title, instructions or ingredients contain the query.
+
+        Parameters:
+            query (str): The search query; matching is case-insensitive.
+
+        Returns:
+            Dict[str, Recipe]: The matching recipes keyed by recipe ID.
+        """
+        matches = {}
+        for recipe_id in self.search_index().search(query, self.storage.get):
+            recipe = self.storage.get(recipe_id)
+            if recipe is not None:
+                matches[recipe_id] = recipe
+        return matches
+
+    def rank_recipes(self, query: str, limit: int = 20, cursor: Optional[str] = None,
+                     prefix: bool = True, fuzzy: bool = True) -> Tuple[List[Tuple[Recipe, float]], Optional[str]]:
+        """
+        Search the favorites with relevance ranking, prefix and typo-tolerant matching.
+
+        Parameters:
+            query (str): The search query.
+            limit (int): The maximum number of results.
+            cursor (Optional[str]): The next_cursor of the previous page.
+            prefix (bool): Whether query terms also match words they are a prefix of.
+            fuzzy (bool): Whether query terms also match words with typos.
+
+        Returns:
+            Tuple[List[Tuple[Recipe, float]], Optional[str]]: The recipes and their
+                scores, best first, and the cursor of the next page if there is one.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        ranked, next_cursor = self.search_index().rank(query, limit, cursor, prefix, fuzzy)
+        results = []
+        for recipe_id, score in ranked:
+            recipe = self.storage.get(recipe_id)
+            if recipe is not None:
+                results.append((recipe, score))
+        return results, next_cursor
+
+    def cookable_recipes(self, have: Iterable[str], max_missing: Optional[int] = None, limit: Optional[int] = None,
+                         staples: bool = True) -> Tuple[List[Tuple[Recipe, List[str], int, int]], Dict[int, int]]:
+        """
+        Rank the favorites by how many of their ingredients are on hand ("what can I cook").
+
+        Parameters:
+            have (Iterable[str]): The ingredients on hand, e.g. ["eggs", "flour"].
+            max_missing (Optional[int]): Leave out recipes missing more ingredients.
+            limit (Optional[int]): The maximum number of results.
+            staples (bool): Whether water, salt and pepper count as on hand.
+
+        Returns:
+            Tuple[List[Tuple[Recipe, List[str], int, int]], Dict[int, int]]: The recipes,
+                fewest missing ingredients first, each with its missing ingredients and how
+                many ingredients it needs and has; and how many recipes miss how many.
+        """
+        have = list(have) + (list(STAPLES) if staples else [])
+        matches, counts = self.ingredient_index().match(have, max_missing, limit)
+        results = []
+        for recipe_id, missing, needed, on_hand in matches:
+            recipe = self.storage.get(recipe_id)
+            if recipe is not None:
+                results.append((recipe, missing, needed, on_hand))
+        return results, counts
+
+    def import_recipes(self, items: Iterable[Any]) -> Tuple[List[str], List[Dict]]:
+        """
+        Add many recipes at once, persisting the whole batch in a single step.
+
+        Every item is validated like a single created recipe and gets an ID from
+        get_id. Invalid items are skipped and reported, the rest is imported. If
+        the items raise ValueError (a malformed JSON array), the error is reported
+        at the position it was found and the items before it are still imported.
+
+        Parameters:
+            items (Iterable[Any]): Recipe JSON objects with title, instructions,
+                ingredients and optionally image and recipe_id.
+
+        Returns:
+            Tuple[List[str], List[Dict]]: The IDs of the imported recipes, and one
+                {"index": ..., "error": [...]} entry per rejected item.
+        """
+        imported: List[str] = []
+        errors: List[Dict] = []
+
+        for position, item in enumerate(stop_at_error(iter(items))):
+            if isinstance(item, InvalidItem):
+                errors.append({'index': position, 'error': [item.message]})
+                continue
+            if not isinstance(item, dict):
+                errors.append({'index': position, 'error': ["item must be a JSON object"]})
+                continue
+            check, msgs = check_recipe_fields(item)
+            if not check:
+                errors.append({'index': position, 'error': msgs})
+                continue
+
+            recipe_id = self.get_id(item.get('recipe_id', None))
+            recipe = Recipe(item['title'], item['instructions'], item['ingredients'], item.get('image', None), id=recipe_id)
+            self.storage.add(recipe)
+            self._index_recipe(recipe_id, recipe)
+            self.changed(recipe_id)
+            imported.append(recipe_id)
+
+        if imported:
+            self.flush()
+        return imported, errors
+
+    def export_recipes(self, format: str = 'ndjson') -> Iterator[str]:
+        """
+        Serialize all favorites incrementally, ordered by recipe ID.
+
+        Parameters:
+            format (str): "ndjson" for one recipe per line, or "json" for a JSON array.
+
+        Returns:
+            Iterator[str]: The serialized output, one recipe per chunk.
+        """
+        recipes = (recipe.to_dict() for recipe in self.iter_recipes())
+        if format == 'json':
+            return json_array_chunks(recipes)
+        return ndjson_chunks(recipes)
+
+    def recipe_version(self, recipe_id: str) -> int:
+        """
+        Get the version of the last change to a recipe.
+
+        Parameters:
+            recipe_id (str): The ID of the recipe.
+
+        Returns:
+            int: The version, 0 if the recipe was not changed since loading.
+        """
+        return self.recipe_versions.get(recipe_id, 0)
+
+    def changed(self, recipe_id: str) -> None:
+        """
+        Bump the version of the favorites and of the changed recipe.
+
+        Parameters:
+            recipe_id (str): The ID of the changed recipe.
+        """
+        self.version = next(self._versions)
+        self.recipe_versions[recipe_id] = self.version
+
+    def written(self, recipe_id: str) -> None:
+        """
+        Bump the versions and persist a mutation according to the durability level.
+
+        Parameters:
+            recipe_id (str): The ID of the changed recipe.
+        """
+        self.changed(recipe_id)
+        if self.flusher is None:
+            self.flush()
+        else:
+            self.flusher.notify()
+
+    def flush(self) -> None:
+        """Force all acknowledged mutations to the disk."""
+        with self.persistence_seconds.time('flush'):
+            self.storage.flush()
+
     def save_recipe(self) -> None:
-        """Save recipes to a JSON file."""
-        with open(self.storage_path, 'w') as file:
-            serialized_recipes = {
-                rid: self.favorite_recipes[rid].__dict__
-                for rid in self.favorite_recipes
-            }
-            json.dump(serialized_recipes, file, indent=4)
+        """Write a complete, compacted copy of the recipes to the storage backend."""
+        with self.persistence_seconds.time('save'):
+            self.storage.save()
+
+    def compact(self) -> None:
+        """Fold the operation log back into the JSON snapshot."""
+        self.save_recipe()
+
+    def close(self) -> None:
+        """Flush pending mutations and release the files and connections of the storage backend."""
+        if self.flusher is not None:
+            self.flusher.stop()
+            self.flusher = None
+        self.storage.close()
 
     def exists_recipe_with_id(self, id: str) -> bool:
-        return True if id in self.favorite_recipes else False
+        return self.storage.contains(id)
 
     def get_id(self, id: str) -> str:
         if id is None or self.exists_recipe_with_id(id):
-            print(f"########: {id}")
-            new_id = f"_{random.randint(0, 120000)}" # added _ so that we don't accidentally assign an existing id
-            return new_id
+            for _ in range(10):
+                new_id = f"_{random.randint(0, 120000)}"  # added _ so that we don't accidentally assign an existing id
+                if not self.exists_recipe_with_id(new_id):
+                    return new_id
+            return f"_{uuid.uuid4().hex}"  # the short random IDs are getting crowded
         return id
@@ -0,0 +1,84 @@
+from typing import Callable, Optional
+import threading
+import time
+
+DURABILITY_LEVELS = ('write', 'batch', 'interval')
+
+
+class Flusher:
+    """
+        Background thread that coalesces bursts of favorites writes into one flush.
+
+        Parameters:
+            flush (Callable[[], None]): Persists everything written so far.
+            durability (str): "batch" flushes at most max_delay seconds after the
+                first unflushed write, "interval" flushes every max_delay seconds.
+            max_delay (float): The longest time in seconds a write stays unflushed.
+            max_pending (int): Number of unflushed writes that triggers an
+                immediate flush in either mode.
+    """
+
+    def __init__(self, flush: Callable[[], None], durability: str = 'batch',
+                 max_delay: float = 0.05, max_pending: int = 100):
+        if durability not in ('batch', 'interval'):
+            raise ValueError(f"Flusher does not support durability level: {durability}")
+        self.flush = flush
+        self.durability = durability
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.pending = 0
+        self.flushes = 0
+        self._first_pending_at: Optional[float] = None
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='favorites-flusher', daemon=True)
+        self._thread.start()
+
+    def notify(self) -> None:
+        """Record one unflushed write."""
+        with self._condition:
+            self.pending += 1
+            if self._first_pending_at is None:
+                # the thread waits without a timeout while nothing is pending; wake it to start the max_delay clock
+                self._first_pending_at = time.monotonic()
+                self._condition.notify()
+            elif self.pending >= self.max_pending:
+                self._condition.notify()
+
+    def stop(self) -> None:
+        """Flush whatever is still pending and stop the thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _timeout(self, next_tick: float) -> Optional[float]:
+        # seconds until the next flush is due, or None to wait for a write
+        if self.durability == 'interval':
+            return next_tick - time.monotonic()
+        if self._first_pending_at is None:
+            return None
+        return self._first_pending_at + self.max_delay - time.monotonic()
+
+    def _run(self) -> None:
+        next_tick = time.monotonic() + self.max_delay
+        while True:
+            with self._condition:
+                while not self._stopped and self.pending < self.max_pending:
+                    timeout = self._timeout(next_tick)
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                pending, stopped = self.pending, self._stopped
+                self.pending = 0
+                self._first_pending_at = None
+            next_tick = time.monotonic() + self.max_delay
+
+            if pending or stopped:
+                try:
+                    self.flush()
+                    self.flushes += 1
+                except Exception as error:
+                    print(f"There was an error while flushing the favorites: {error}")
+            if stopped:
+                return
@@ -0,0 +1,234 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import re
+import threading
+import numpy as np
+from .recipe import Recipe
+
+# a word of an ingredient line; numbers, fractions and punctuation are left out
+WORD_PATTERN = re.compile(r'[a-z]+')
+# where the name of an ingredient ends: notes after a comma, dash or semicolon, and alternatives
+NAME_END = re.compile(r',|;| -+ | or |\bto taste\b')
+PARENTHESES = re.compile(r'\([^)]*\)')
+# words that say how much, how big or how prepared an ingredient is, not what it is
+UNITS = {
+    'bunch', 'can', 'clove', 'cup', 'dash', 'fl', 'g', 'gallon', 'gram', 'handful', 'head', 'jar', 'kg', 'kilogram',
+    'l', 'lb', 'liter', 'litre', 'm', 'milliliter', 'ml', 'ounce', 'oz', 'package', 'pinch', 'pint', 'pkg', 'pound',
+    'packet', 'quart', 'qt', 'slice', 'sprig', 'stalk', 'stick', 't', 'tablespoon', 'tb', 'tbs', 'tbsp', 'teaspoon',
+    'tsp',
+}
+DESCRIPTORS = {
+    'a', 'about', 'and', 'at', 'beaten', 'boneless', 'chilled', 'chopped', 'coarsely', 'cold', 'crushed', 'cubed',
+    'cut', 'diced', 'divided', 'drained', 'dried', 'extra', 'finely', 'for', 'fresh', 'freshly', 'frozen', 'grated',
+    'ground', 'halved', 'into', 'jumbo', 'large', 'light', 'lightly', 'medium', 'melted', 'minced', 'of', 'optional',
+    'packed', 'peeled', 'piece', 'pitted', 'plus', 'rinsed', 'roasted', 'room', 'shredded', 'skinless', 'sliced',
+    'small', 'softened', 'some', 'taste', 'temperature', 'the', 'thinly', 'to', 'trimmed', 'unsalted', 'virgin',
+    'warm', 'whole',
+}
+# ingredients that are taken to be on hand unless the caller says otherwise
+STAPLES = ('water', 'salt', 'pepper')
+# number of set bits of every byte value, to count the bits of a packed row
+POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+
+def singular(word: str) -> str:
+    # "eggs" -> "egg", "tomatoes" -> "tomato", "berries" -> "berry"; short words and "-ss" are kept
+    if len(word) <= 3 or word.endswith('ss') or not word.endswith('s'):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('oes', 'ches', 'shes', 'xes')):
+        return word[:-2]
+    return word[:-1]
+
+
+def normalize_ingredient(line: str) -> Optional[str]:
+    """
+    Reduce an ingredient line to the name of the ingredient.
+
+    Quantities, units, sizes, preparations and notes are dropped and the
+    remaining words made singular, so "2 mediums onions -- chopped" and
+    "1 large onion, diced" both become "onion".
+
+    Parameters:
+        line (str): One ingredient line, e.g. "1 (15 oz.) black beans, drained".
+
+    Returns:
+        Optional[str]: The name, e.g. "black bean", or None if nothing is left.
+    """
+    text = PARENTHESES.sub(' ', line.lower())
+    text = NAME_END.split(text, maxsplit=1)[0]
+    words = [singular(word) for word in WORD_PATTERN.findall(text)]
+    name = ' '.join(word for word in words if word not in UNITS and word not in DESCRIPTORS)
+    return name or None
+
+
+def parse_ingredients(text: str) -> Set[str]:
+    """
+    Get the distinct ingredient names of a recipe's ingredients text.
+
+    Parameters:
+        text (str): One ingredient per line, or comma-separated on a single line.
+
+    Returns:
+        Set[str]: The names, see normalize_ingredient.
+    """
+    lines = text.splitlines()
+    if len(lines) == 1:
+        lines = lines[0].split(',')
+    return {name for name in map(normalize_ingredient, lines) if name}
+
+
+class IngredientIndex:
+    """
+        Recipe x ingredient bit matrix over the favorites, for "what can I cook" queries.
+
+        Every distinct ingredient name gets a column of an interned vocabulary and
+        every recipe a row, whose bits mark the ingredients it needs. A query sets
+        the bits of the ingredients on hand in a mask; the ingredients a recipe is
+        missing are the bits of its row outside the mask, so the missing count of
+        all recipes comes from one AND-NOT and popcount over the matrix. Rows and
+        columns are allocated with spare capacity, so adding, updating and removing
+        a recipe only rewrites its row. Columns of ingredients that no recipe needs
+        anymore stay allocated until the next build.
+
+        An ingredient on hand matches every ingredient whose name contains all its
+        words, so "butter" covers "unsalted butter" and "peanut butter".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.vocabulary: Dict[str, int] = {}
+        self.names: List[str] = []
+        # word -> columns of the ingredient names that contain it
+        self.word_columns: Dict[str, Set[int]] = {}
+        self.rows: Dict[str, int] = {}
+        self.bits = np.zeros((16, 8), dtype=np.uint8)
+        self.row_ids = np.full(16, None, dtype=object)
+        self.sizes = np.full(16, -1, dtype=np.int32)  # <- ingredients per row, -1 for free rows
+        self.free_rows = list(range(15, -1, -1))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def build(self, recipes: Iterable[Recipe]) -> None:
+        """
+        Replace the index contents with the given recipes.
+
+        Parameters:
+            recipes (Iterable[Recipe]): All recipes to index.
+        """
+        with self._lock:
+            self._reset()
+        for recipe in recipes:
+            self.add(recipe)
+
+    def add(self, recipe: Recipe) -> None:
+        """
+        Index the ingredients of a recipe, replacing what was indexed for its ID before.
+
+        Parameters:
+            recipe (Recipe): The recipe to index.
+        """
+        names = parse_ingredients(recipe.ingredients)
+        with self._lock:
+            columns = [self._column(name) for name in names]
+            row = self.rows.get(recipe.recipe_id)
+            if row is None:
+                row = self._row(recipe.recipe_id)
+            self.bits[row] = 0
+            for column in columns:
+                self.bits[row, column >> 3] |= 1 << (column & 7)
+            self.sizes[row] = len(columns)
+
+    def remove(self, recipe_id: str) -> None:
+        """
+        Remove a recipe from the index.
+
+        Parameters:
+            recipe_id (str): The ID of the recipe.
+        """
+        with self._lock:
+            row = self.rows.pop(recipe_id, None)
+            if row is not None:
+                self.bits[row] = 0
+                self.sizes[row] = -1
+                self.row_ids[row] = None
+                self.free_rows.append(row)
+
+    def _column(self, name: str) -> int:
+        # the column of an ingredient name, interned on first use
+        column = self.vocabulary.get(name)
+        if column is None:
+            column = self.vocabulary[name] = len(self.names)
+            self.names.append(name)
+            for word in name.split():
+                self.word_columns.setdefault(word, set()).add(column)
+            if column >> 3 >= self.bits.shape[1]:
+                self.bits = np.pad(self.bits, ((0, 0), (0, self.bits.shape[1])))
+        return column
+
+    def _row(self, recipe_id: str) -> int:
+        # a free row for a new recipe, doubling the rows if there is none
+        if not self.free_rows:
+            capacity = len(self.sizes)
+            self.bits = np.pad(self.bits, ((0, capacity), (0, 0)))
+            self.row_ids = np.append(self.row_ids, np.full(capacity, None, dtype=object))
+            self.sizes = np.pad(self.sizes, (0, capacity), constant_values=-1)
+            self.free_rows = list(range(2 * capacity - 1, capacity - 1, -1))
+        row = self.free_rows.pop()
+        self.rows[recipe_id] = row
+        self.row_ids[row] = recipe_id
+        return row
+
+    def match(self, have: Iterable[str], max_missing: Optional[int] = None,
+              limit: Optional[int] = None) -> Tuple[List[Tuple[str, List[str], int, int]], Dict[int, int]]:
+        """
+        Rank the recipes by how few ingredients are missing, given the ingredients on hand.
+        Recipes that have none of their ingredients on hand, including recipes without
+        ingredients, are left out.
+
+        Parameters:
+            have (Iterable[str]): The ingredients on hand, free text like "2 eggs".
+            max_missing (Optional[int]): Leave out recipes missing more ingredients.
+            limit (Optional[int]): The maximum number of results.
+
+        Returns:
+            Tuple[List[Tuple[str, List[str], int, int]], Dict[int, int]]: Per recipe, best
+                first, the ID, the missing ingredients and how many ingredients it needs
+                and has; fewest missing first, then the highest share on hand, then ID.
+                And how many recipes miss how many ingredients (within max_missing).
+        """
+        wanted = [name.split() for name in map(normalize_ingredient, have) if name]
+        with self._lock:
+            mask = np.zeros(self.bits.shape[1], dtype=np.uint8)
+            for words in wanted:
+                columns = set.intersection(*(self.word_columns.get(word, set()) for word in words))
+                for column in columns:
+                    mask[column >> 3] |= 1 << (column & 7)
+
+            live = np.flatnonzero(self.sizes >= 0)
+            missing = POPCOUNT[self.bits[live] & ~mask].sum(axis=1, dtype=np.int32)
+            sizes = self.sizes[live]
+            # recipes without any ingredient on hand are no match, however few they need; this
+            # also drops recipes without ingredients, which would otherwise miss nothing and rank first
+            keep = missing < sizes
+            if max_missing is not None:
+                keep &= missing <= max_missing
+            live, missing, sizes = live[keep], missing[keep], sizes[keep]
+            counts = np.bincount(missing)
+            ids = self.row_ids[live]
+            # fewest missing, then the largest share on hand, then by ID
+            share = np.divide(sizes - missing, sizes, out=np.zeros(len(sizes)), where=sizes > 0)
+            order = np.lexsort((ids, -share, missing))
+            if limit is not None:
+                order = order[:limit]
+
+            results = []
+            for position in order.tolist():
+                row_missing = np.unpackbits(self.bits[live[position]] & ~mask, bitorder='little')
+                names = sorted(self.names[column] for column in np.flatnonzero(row_missing).tolist())
+                results.append((ids[position], names, int(sizes[position]), int(sizes[position] - missing[position])))
+        return results, {count: int(number) for count, number in enumerate(counts.tolist()) if number}
@@ -0,0 +1,494 @@
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import uuid
+from .recipe import Recipe, process_raw_json
+from .storage import Storage, read_json_favorites
+
+# header: magic, format version, entry count, generation, data bytes covered by the index
+INDEX_HEADER = struct.Struct('<4sIQ16sQ')
+# entry: key offset and length in the key blob, record offset and length in the data file
+INDEX_ENTRY = struct.Struct('<QIQI')
+INDEX_MAGIC = b'FFIX'
+INDEX_VERSION = 1
+
+
+class OffsetIndex:
+    """
+        Read-only, memory-mapped index from recipe ID to the position of its record.
+
+        The file holds a header, a table of fixed-size entries sorted by recipe ID and
+        a blob with the IDs themselves, so a lookup is a binary search over the
+        mapped file and opening it costs the same for ten recipes or ten million.
+
+        Parameters:
+            file_path (str): The file path of the index.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.count = 0
+        self.generation = b''
+        self.data_end = 0
+        self._mm: Optional[mmap.mmap] = None
+
+    def open(self) -> bool:
+        """
+        Map the index file.
+
+        Returns:
+            bool: True if a valid index was found, False otherwise.
+        """
+        self.close()
+        try:
+            with open(self.file_path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size < INDEX_HEADER.size:
+                    return False
+                self._mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return False
+        magic, version, self.count, self.generation, self.data_end = INDEX_HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            return False
+        return True
+
+    @staticmethod
+    def write(file_path: str, generation: bytes, data_end: int, entries: List[Tuple[bytes, int, int]]) -> None:
+        """
+        Write an index file for entries sorted by key.
+
+        Parameters:
+            file_path (str): The file path of the index.
+            generation (bytes): Identifies the data file the index belongs to.
+            data_end (int): The number of data file bytes the index covers.
+            entries (List[Tuple[bytes, int, int]]): The UTF-8 encoded recipe IDs with
+                the offset and length of their records, sorted by ID.
+        """
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(entries), generation, data_end))
+            key_offset = 0
+            for key, offset, length in entries:
+                file.write(INDEX_ENTRY.pack(key_offset, len(key), offset, length))
+                key_offset += len(key)
+            for key, _, _ in entries:
+                file.write(key)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, file_path)
+
+    def _entry(self, position: int) -> Tuple[bytes, int, int]:
+        key_offset, key_length, offset, length = INDEX_ENTRY.unpack_from(
+            self._mm, INDEX_HEADER.size + position * INDEX_ENTRY.size)
+        start = INDEX_HEADER.size + self.count * INDEX_ENTRY.size + key_offset
+        return self._mm[start:start + key_length], offset, length
+
+    def bisect(self, key: bytes) -> int:
+        """
+        Get the position of the first entry whose ID is not smaller than the key.
+
+        Parameters:
+            key (bytes): The UTF-8 encoded recipe ID.
+
+        Returns:
+            int: The position, between 0 and count.
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, key: bytes) -> Optional[Tuple[int, int]]:
+        """
+        Look up the record of a recipe.
+
+        Parameters:
+            key (bytes): The UTF-8 encoded recipe ID.
+
+        Returns:
+            Optional[Tuple[int, int]]: The offset and length of the record, or None.
+        """
+        position = self.bisect(key)
+        if position < self.count:
+            entry_key, offset, length = self._entry(position)
+            if entry_key == key:
+                return offset, length
+        return None
+
+    def entries(self, start: int = 0) -> Iterator[Tuple[str, int, int]]:
+        """
+        Iterate over the entries in ID order.
+
+        Parameters:
+            start (int): The position of the first entry.
+
+        Returns:
+            Iterator[Tuple[str, int, int]]: The recipe IDs with their record offset and length.
+        """
+        for position in range(start, self.count):
+            key, offset, length = self._entry(position)
+            yield key.decode('utf-8'), offset, length
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self.count = 0
+
+
+class LazyRecipes(Mapping):
+    """
+        Read-only mapping view over a LazyStorage.
+
+        Parameters:
+            storage (LazyStorage): The store to read from.
+    """
+
+    def __init__(self, storage: 'LazyStorage'):
+        self.storage = storage
+
+    def __getitem__(self, recipe_id: str) -> Recipe:
+        recipe = self.storage.get(recipe_id)
+        if recipe is None:
+            raise KeyError(recipe_id)
+        return recipe
+
+    def __contains__(self, recipe_id: object) -> bool:
+        return self.storage.contains(recipe_id)
+
+    def __len__(self) -> int:
+        return len(self.storage)
+
+    def __iter__(self) -> Iterator[str]:
+        for recipe in self.storage.scan():
+            yield recipe.recipe_id
+
+    def items(self) -> Iterator[Tuple[str, Recipe]]:
+        for recipe in self.storage.scan():
+            yield recipe.recipe_id, recipe
+
+    def values(self) -> Iterator[Recipe]:
+        return self.storage.scan()
+
+
+class LazyStorage(Storage):
+    """
+        Keep the recipes in a memory-mapped, append-only data file with an on-disk offset index.
+
+        Loading maps the index and reads only the records appended since the last
+        compaction; a Recipe is built from its record the first time it is
+        accessed and kept in a bounded LRU cache. Changes are appended to the data
+        file as full records or tombstones and folded into a fresh, sorted data
+        file and index by save().
+
+        Parameters:
+            file_path (str): The file path of the JSON favorites file. The data file
+                and index live next to it, and the JSON file and its log are imported on first use.
+            compact_threshold (int): Number of records appended since the last
+                compaction after which flush() compacts.
+            cache_size (int): The maximum number of materialized recipes kept in memory.
+    """
+
+    PAGE_SIZE = 500
+
+    def __init__(self, file_path: str, compact_threshold: int = 1000, cache_size: int = 4096):
+        base = os.path.splitext(file_path)[0]
+        self.seed_path = file_path
+        self.data_path = f"{base}.data"
+        self.index = OffsetIndex(f"{base}.idx")
+        self.compact_threshold = compact_threshold
+        self.cache_size = cache_size
+        self.count = 0
+        # changes since the index was written: recipe ID -> (offset, length), or None when deleted
+        self.overlay: Dict[str, Optional[Tuple[int, int]]] = {}
+        self.overlay_ids: List[str] = []
+        self.cache: OrderedDict = OrderedDict()
+        self._fd: Optional[int] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._end = 0
+        self._appended = 0
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return self.count
+
+    def load(self) -> None:
+        with self._lock:
+            self.close()
+            if not os.path.exists(self.data_path):
+                self._write_compacted(self._seed_records())
+            self._open()
+
+    def _ensure_loaded(self) -> None:
+        # the files are opened on first use, like the connection of SqliteStorage
+        if self._fd is None:
+            self.load()
+
+    def _seed_records(self) -> Iterator[Tuple[str, bytes]]:
+        # records of the JSON favorites file and its log, used once to create the data file
+        records = [(str(rid), self._encode(recipe)) for rid, recipe in read_json_favorites(self.seed_path).items()]
+        return iter(sorted(records, key=lambda record: record[0].encode('utf-8')))
+
+    def _open(self) -> None:
+        self._fd = os.open(self.data_path, os.O_RDWR | os.O_APPEND)
+        size = os.fstat(self._fd).st_size
+        if size:
+            self._mm = mmap.mmap(self._fd, size, access=mmap.ACCESS_READ)
+        self._end = size
+
+        try:
+            generation = bytes.fromhex(self._read_line(0)[0].decode())
+        except (UnicodeDecodeError, ValueError):
+            generation = b''
+        if not self.index.open() or self.index.generation != generation or self.index.data_end > size:
+            # the index does not belong to this data file, e.g. after a crash during compaction
+            records = self._live_records()
+            self.close()
+            self._write_compacted(records)
+            self._open()
+            return
+
+        self.count = self.index.count
+        self.overlay = {}
+        self._appended = 0
+        offset = self.index.data_end
+        while offset < size:
+            line, next_offset = self._read_line(offset)
+            try:
+                record = json.loads(line) if next_offset is not None else None
+            except json.JSONDecodeError:
+                record = None
+            if record is None:
+                # a record that was only partially written before the process died
+                os.ftruncate(self._fd, offset)
+                self._end = offset
+                break
+            rid = str(record['recipe_id'])
+            was_live = self._locate(rid) is not None
+            is_live = not record.get('deleted')
+            self.overlay[rid] = (offset, len(line)) if is_live else None
+            self.count += is_live - was_live
+            self._appended += 1
+            offset = next_offset
+        self.overlay_ids = sorted(self.overlay, key=lambda rid: rid.encode('utf-8'))
+
+    def _read_line(self, offset: int) -> Tuple[bytes, Optional[int]]:
+        # the line that starts at offset, and the offset of the next one (None if it is not terminated)
+        end = self._mm.find(b'\n', offset, self._end) if self._mm is not None else -1
+        if end < 0:
+            return self._read(offset, self._end - offset), None
+        return self._read(offset, end - offset), end + 1
+
+    def _read(self, offset: int, length: int) -> bytes:
+        if self._mm is not None and offset + length <= len(self._mm):
+            return self._mm[offset:offset + length]
+        return os.pread(self._fd, length, offset)
+
+    def _live_records(self) -> Iterator[Tuple[str, bytes]]:
+        # every live record of the data file sorted by ID, found by scanning it from the start
+        live: Dict[str, bytes] = {}
+        offset = self._read_line(0)[1]
+        while offset is not None and offset < self._end:
+            line, offset = self._read_line(offset)
+            if offset is None:
+                break
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            if record.get('deleted'):
+                live.pop(str(record['recipe_id']), None)
+            else:
+                live[str(record['recipe_id'])] = line
+        return iter(sorted(live.items(), key=lambda record: record[0].encode('utf-8')))
+
+    def _write_compacted(self, records: Iterator[Tuple[str, bytes]]) -> None:
+        # write a data file with one record per recipe, in the given (sorted) order, and its index
+        generation = uuid.uuid4().bytes
+        entries = []
+        tmp_path = f"{self.data_path}.tmp"
+        with open(tmp_path, 'wb') as file:
+            header = generation.hex().encode() + b'\n'
+            file.write(header)
+            offset = len(header)
+            for rid, line in records:
+                file.write(line + b'\n')
+                entries.append((rid.encode('utf-8'), offset, len(line)))
+                offset += len(line) + 1
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.data_path)
+        OffsetIndex.write(self.index.file_path, generation, offset, entries)
+
+    @staticmethod
+    def _encode(recipe: Recipe) -> bytes:
+        return recipe.to_json().encode('utf-8')
+
+    def _locate(self, recipe_id: str) -> Optional[Tuple[int, int]]:
+        if recipe_id in self.overlay:
+            return self.overlay[recipe_id]
+        return self.index.find(recipe_id.encode('utf-8'))
+
+    def _materialize(self, recipe_id: str, location: Tuple[int, int]) -> Recipe:
+        recipe = self.cache.get(recipe_id)
+        if recipe is not None:
+            self.cache.move_to_end(recipe_id)
+            return recipe
+        data = json.loads(self._read(*location))
+        recipe = process_raw_json({recipe_id: data})[recipe_id]
+        self._cache(recipe)
+        return recipe
+
+    def _cache(self, recipe: Recipe) -> None:
+        self.cache[str(recipe.recipe_id)] = recipe
+        self.cache.move_to_end(str(recipe.recipe_id))
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def recipes(self) -> Mapping:
+        return LazyRecipes(self)
+
+    def get(self, recipe_id: str) -> Optional[Recipe]:
+        with self._lock:
+            self._ensure_loaded()
+            location = self._locate(str(recipe_id))
+            return self._materialize(str(recipe_id), location) if location else None
+
+    def contains(self, recipe_id: str) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            return self._locate(str(recipe_id)) is not None
+
+    def _ids_after(self, after: Optional[str]) -> Iterator[Tuple[str, Optional[Tuple[int, int]]]]:
+        # merge the sorted index with the sorted overlay, skipping deleted recipes
+        key = None if after is None else after.encode('utf-8')
+        base = self.index.entries(0 if key is None else self.index.bisect(key + b'\0'))
+        overlay_start = 0 if after is None else bisect.bisect_right(self.overlay_ids, key, key=lambda rid: rid.encode('utf-8'))
+        overlay = iter(self.overlay_ids[overlay_start:])
+
+        next_base = next(base, None)
+        next_overlay = next(overlay, None)
+        while next_base is not None or next_overlay is not None:
+            if next_overlay is None or (next_base is not None and next_base[0].encode('utf-8') < next_overlay.encode('utf-8')):
+                rid, offset, length = next_base
+                if rid not in self.overlay:
+                    yield rid, (offset, length)
+                next_base = next(base, None)
+            else:
+                if next_base is not None and next_base[0] == next_overlay:
+                    next_base = next(base, None)
+                if self.overlay[next_overlay] is not None:
+                    yield next_overlay, self.overlay[next_overlay]
+                next_overlay = next(overlay, None)
+
+    def page(self, after: Optional[str], limit: int) -> List[Recipe]:
+        with self._lock:
+            self._ensure_loaded()
+            recipes = []
+            for rid, location in self._ids_after(None if after is None else str(after)):
+                if len(recipes) >= limit:
+                    break
+                recipes.append(self._materialize(rid, location))
+            return recipes
+
+    def scan(self) -> Iterator[Recipe]:
+        """
+        Iterate over all recipes in ID order, one page at a time.
+
+        Returns:
+            Iterator[Recipe]: The stored recipes.
+        """
+        after = None
+        while True:
+            recipes = self.page(after, self.PAGE_SIZE)
+            yield from recipes
+            if len(recipes) < self.PAGE_SIZE:
+                return
+            after = recipes[-1].recipe_id
+
+    def _append(self, recipe_id: str, line: bytes) -> Tuple[int, int]:
+        offset = self._end
+        os.write(self._fd, line + b'\n')
+        self._end += len(line) + 1
+        if recipe_id not in self.overlay:
+            bisect.insort(self.overlay_ids, recipe_id, key=lambda rid: rid.encode('utf-8'))
+        self._appended += 1
+        self._dirty = True
+        return offset, len(line)
+
+    def add(self, recipe: Recipe) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            rid = str(recipe.recipe_id)
+            self.overlay[rid] = self._append(rid, self._encode(recipe))
+            self.count += 1
+            self._cache(recipe)
+
+    def update_instructions(self, recipe_id: str, new_instructions: str) -> bool:
+        with self._lock:
+            recipe = self.get(recipe_id)
+            if recipe is None:
+                return False
+            recipe.instructions = new_instructions
+            rid = str(recipe_id)
+            self.overlay[rid] = self._append(rid, self._encode(recipe))
+            return True
+
+    def delete(self, recipe_id: str) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            rid = str(recipe_id)
+            if self._locate(rid) is None:
+                return False
+            self._append(rid, json.dumps({'recipe_id': recipe_id, 'deleted': True}).encode('utf-8'))
+            self.overlay[rid] = None
+            self.count -= 1
+            self.cache.pop(rid, None)
+            return True
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._appended >= self.compact_threshold:
+                self.save()
+            elif self._dirty and self._fd is not None:
+                os.fsync(self._fd)
+                self._dirty = False
+
+    def save(self) -> None:
+        """Rewrite the data file with only the live records, sorted by ID, and index it."""
+        with self._lock:
+            self._ensure_loaded()
+            # the old data file stays mapped (and readable) until it is closed
+            self._write_compacted((rid, self._read(*location)) for rid, location in self._ids_after(None))
+            self.close()
+            self._open()
+
+    def close(self) -> None:
+        with self._lock:
+            self.index.close()
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+            if self._fd is not None:
+                if self._dirty:
+                    os.fsync(self._fd)
+                    self._dirty = False
+                os.close(self._fd)
+                self._fd = None
+            self.overlay = {}
+            self.overlay_ids = []
+            self.cache.clear()
@@ -0,0 +1,207 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+import math
+import threading
+import time
+
+# upper bounds in seconds of the latency buckets, from a cached lookup to a slow Spoonacular call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# counters of the caches' stats() that are answered from the cache, and that are not
+HIT_COUNTERS = ('hits', 'subsumed')
+MISS_COUNTERS = ('misses', 'coalesced')
+
+
+def _number(value: float) -> str:
+    # a sample value in the text format, which spells infinity and NaN its own way
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    # {name="value",...} with backslashes, quotes and newlines escaped, empty without labels
+    if not names:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+def render_metric(name: str, kind: str, documentation: str,
+                  samples: Iterable[Tuple[Mapping[str, str], float]]) -> List[str]:
+    """
+    Format a counter or gauge in the Prometheus text exposition format.
+
+    Parameters:
+        name (str): The metric name, e.g. "feastfinder_cache_hits_total".
+        kind (str): "counter" or "gauge".
+        documentation (str): The HELP text.
+        samples (Iterable[Tuple[Mapping[str, str], float]]): The labels and value of every series.
+
+    Returns:
+        List[str]: The lines, HELP and TYPE first.
+    """
+    lines = [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+    for labels, value in samples:
+        lines.append(f'{name}{_labels(list(labels), list(labels.values()))} {_number(value)}')
+    return lines
+
+
+class Histogram:
+    """
+        Latency histogram with one series per combination of label values.
+
+        An observation only bisects the bucket bounds and bumps two numbers under
+        a lock, so timing a request costs about a microsecond. Bucket counts are
+        kept per bucket and made cumulative when the histogram is rendered.
+
+        Parameters:
+            name (str): The metric name, e.g. "feastfinder_request_duration_seconds".
+            documentation (str): The HELP text.
+            labelnames (Sequence[str]): The names of the labels, in the order observe takes their values.
+            buckets (Sequence[float]): The upper bounds of the buckets in seconds.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket with +Inf last, sum of the observations]
+        self.series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *labels: str) -> None:
+        """
+        Record one observation.
+
+        Parameters:
+            seconds (float): The observed duration.
+            labels (str): The label values, one per label name.
+        """
+        bucket = bisect_left(self.buckets, seconds)  # <- "le" bounds are inclusive
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bucket] += 1
+            series[1] += seconds
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """Observe the duration of a with block, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def snapshot(self, *labels: str) -> Optional[Tuple[List[int], float]]:
+        """
+        Get the cumulative bucket counts and the sum of one series.
+
+        Parameters:
+            labels (str): The label values of the series.
+
+        Returns:
+            Optional[Tuple[List[int], float]]: The count of observations up to every bucket
+                bound, +Inf last, and their sum; None if nothing was observed.
+        """
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                return None
+            counts, total = list(series[0]), series[1]
+        running = 0
+        for position, count in enumerate(counts):
+            running += count
+            counts[position] = running
+        return counts, total
+
+    def render(self) -> List[str]:
+        """
+        Format the histogram in the Prometheus text exposition format.
+
+        Returns:
+            List[str]: The lines, HELP and TYPE first and the series sorted by label values.
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            keys = sorted(self.series)
+        bounds = [_number(bound) for bound in self.buckets] + ['+Inf']
+        for labels in keys:
+            counts, total = self.snapshot(*labels)
+            for bound, count in zip(bounds, counts):
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames + ("le",), labels + (bound,))} {count}')
+            series_labels = _labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{series_labels} {_number(total)}')
+            lines.append(f'{self.name}_count{series_labels} {counts[-1]}')
+        return lines
+
+
+class RequestTimer:
+    """
+        Wall time of one request, split into the time spent waiting for Spoonacular and the rest.
+
+        The timer of the current request is kept in a context variable, so the
+        upstream client code can add to it without the request being passed
+        down. Calls fanned out to other threads add to it too when they run in a
+        copy of the request's context. Their times are summed, so with parallel
+        calls the upstream time can exceed the wall time; the local time is
+        then 0.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.upstream_calls: List[float] = []  # <- appended to from several threads, summed at the end
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def upstream(self) -> float:
+        return sum(self.upstream_calls)
+
+    def local(self, elapsed: float) -> float:
+        return max(0.0, elapsed - self.upstream())
+
+
+current_timer: ContextVar[Optional[RequestTimer]] = ContextVar('current_timer', default=None)
+
+
+def add_upstream_time(seconds: float) -> None:
+    """
+    Add the duration of a Spoonacular call to the timer of the current request, if there is one.
+
+    Parameters:
+        seconds (float): The duration of the call.
+    """
+    timer = current_timer.get()
+    if timer is not None:
+        timer.upstream_calls.append(seconds)
+
+
+def cache_metrics(caches: Mapping[str, Mapping[str, float]]) -> List[str]:
+    """
+    Format the counters of the caches as hit and miss counters and a hit ratio gauge.
+
+    Parameters:
+        caches (Mapping[str, Mapping[str, float]]): The stats() of every cache by cache name.
+
+    Returns:
+        List[str]: The lines of the three metrics.
+    """
+    hits = {name: sum(stats.get(counter, 0) for counter in HIT_COUNTERS) for name, stats in caches.items()}
+    misses = {name: sum(stats.get(counter, 0) for counter in MISS_COUNTERS) for name, stats in caches.items()}
+    return [
+        *render_metric('feastfinder_cache_hits_total', 'counter', 'Lookups answered from the cache.',
+                       (({'cache': name}, count) for name, count in hits.items())),
+        *render_metric('feastfinder_cache_misses_total', 'counter', 'Lookups that had to load the value.',
+                       (({'cache': name}, count) for name, count in misses.items())),
+        *render_metric('feastfinder_cache_hit_ratio', 'gauge', 'Share of the lookups answered from the cache.',
+                       (({'cache': name}, hits[name] / (hits[name] + misses[name]) if hits[name] + misses[name] else 0.0)
+                        for name in caches)),
+    ]
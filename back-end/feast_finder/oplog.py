@@ -0,0 +1,128 @@
+from typing import Dict, Iterator, List
+import json
+import os
+
+
+class OpLog:
+    """
+        Append-only operation log that sits next to the JSON snapshot.
+
+        Every mutation of the favorites is written as one JSON record per line,
+        so recording a change costs O(1) instead of rewriting the whole file.
+        Appended records are buffered until flush() serializes and writes them in
+        one go; a compaction in between drops them without serializing them at all.
+
+        Parameters:
+            file_path (str): The file path of the log.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.count = 0
+        self.pending: List[Dict] = []
+        self._file = None
+
+    def append(self, record: Dict) -> None:
+        """
+        Append a single operation record to the log buffer.
+
+        Parameters:
+            record (Dict): The operation, e.g. {"op": "delete", "recipe_id": "42"}.
+        """
+        self.pending.append(record)
+        self.count += 1
+
+    def flush(self, fsync: bool = True) -> None:
+        """
+        Write all buffered records to the log file with a single write.
+
+        Parameters:
+            fsync (bool): Whether to also force the records to the disk.
+        """
+        if not self.pending:
+            return
+        if self._file is None:
+            self._file = open(self.file_path, 'a', encoding='utf-8')
+        self._file.write(''.join(json.dumps(record) + '\n' for record in self.pending))
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+        self.pending.clear()
+
+    def replay(self) -> Iterator[Dict]:
+        """
+        Read back all complete records in the order they were written.
+
+        A trailing line that was only partially written (e.g. the process died
+        mid-append) is ignored and cut off the file, so the next flush appends
+        its records on a line of their own.
+
+        Returns:
+            Iterator[Dict]: The logged operation records.
+        """
+        self.count = 0
+        good_bytes = 0  # <- where the last complete record ends
+        try:
+            with open(self.file_path, 'rb') as file:
+                for line in file:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    good_bytes += len(line)
+                    self.count += 1
+                    yield record
+        except FileNotFoundError:
+            return
+        if os.path.getsize(self.file_path) > good_bytes:
+            self.close()
+            with open(self.file_path, 'r+b') as file:
+                file.truncate(good_bytes)
+
+    def truncate(self) -> None:
+        """Drop every record, typically right after a new snapshot was written."""
+        self.close()
+        with open(self.file_path, 'w', encoding='utf-8'):
+            pass
+        self.pending.clear()
+        self.count = 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def write_snapshot(file_path: str, serialized_recipes: str) -> None:
+    """
+    Atomically replace the JSON snapshot with the given recipes.
+
+    Parameters:
+        file_path (str): The file path of the snapshot.
+        serialized_recipes (str): The JSON text of the recipes keyed by recipe ID.
+    """
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'w') as file:
+        file.write(serialized_recipes)
+        file.flush()
+        os.fsync(file.fileno())  # <- the log is emptied next, so the snapshot must be on disk first
+    os.replace(tmp_path, file_path)
+    fsync_directory(os.path.dirname(os.path.abspath(file_path)))
+
+
+def fsync_directory(directory: str) -> None:
+    """
+    Make a rename in a directory durable.
+
+    Parameters:
+        directory (str): The directory.
+    """
+    if not hasattr(os, 'O_DIRECTORY'):  # <- Windows cannot open a directory to fsync it
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,53 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple
+import hashlib
+import threading
+
+
+class PayloadCache:
+    """
+        Serialized response bodies of the favorites, rebuilt only when their data changed.
+
+        Every entry remembers the version of the data it was built from; a lookup
+        with a newer version rebuilds it. The least recently used entries are
+        dropped once more than max_entries are cached.
+
+        Parameters:
+            max_entries (int): The maximum number of cached bodies.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int, build: Callable[[], bytes]) -> Tuple[str, bytes]:
+        """
+        Get the cached body for a key, building it if it is missing or outdated.
+
+        Parameters:
+            key (Hashable): Identifies the payload, e.g. a recipe ID.
+            version (int): The current version of the data behind the payload.
+            build (Callable[[], bytes]): Serializes the payload.
+
+        Returns:
+            Tuple[str, bytes]: A strong ETag of the body and the body itself.
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(key)
+                return entry[1], entry[2]
+
+        body = build()
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        with self._lock:
+            self.entries[key] = (version, etag, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return etag, body
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
@@ -0,0 +1,193 @@
+from html import unescape
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import math
+import re
+import numpy as np
+
+# style markers of the two columns of the price breakdown table
+INGREDIENTS_STYLE = 'float:left;max-width:80%'
+PRICES_STYLE = 'text-align:right;display:inline-block;float:left;padding-left:1em'
+
+# the opening tag of the table, wherever its id attribute is
+_TABLE = re.compile(r'<div\b[^>]*?\bid\s*=\s*["\']?spoonacularPriceBreakdownTable\b[^>]*>', re.IGNORECASE)
+# one tag, comment, declaration or run of text; the contents of scripts and styles are skipped whole
+_TOKEN = re.compile(r'<(/?)([a-zA-Z][^\s/>]*)([^>]*)>'
+                    r'|<!--.*?-->|<[!?][^>]*>'
+                    r'|([^<]+)', re.DOTALL)
+_RAW_TEXT_END = {'script': re.compile(r'</script\s*>', re.IGNORECASE),
+                 'style': re.compile(r'</style\s*>', re.IGNORECASE)}
+_STYLE = re.compile(r'\bstyle\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.IGNORECASE)
+# the line below the table, and rows of the table that sum up others instead of being an ingredient
+_PER_SERVING = re.compile(r'Cost per Serving:\s*([^<]*)', re.IGNORECASE)
+_TOTAL_ROW = re.compile(r'\btotal\b', re.IGNORECASE)
+# cached for a while in place of the breakdown of a widget page without a price table, so it is not fetched again
+NO_PRICE_TABLE = object()
+
+
+def _style(attributes: str) -> Optional[str]:
+    # the value of the style attribute of a tag, however it is quoted
+    style = _STYLE.search(attributes)
+    return style and next(value for value in style.groups() if value is not None)
+
+
+class _TableScan:
+    # one pass over the tags of the price table, collecting the text of its two columns
+
+    def __init__(self, html: str, position: int):
+        self.html = html
+        self.position = position
+        self.ingredients: Optional[List[str]] = None
+        self.prices: Optional[List[str]] = None
+        self.column: Optional[List[str]] = None  # <- the column whose div the scan is in
+        self.column_depth = 0
+        self.depth = 1  # <- open divs, counting the table itself
+
+    def run(self) -> None:
+        while self.depth:
+            token = _TOKEN.search(self.html, self.position)
+            if token is None:
+                return  # <- the table is never closed
+            self.position = token.end()
+            closing, tag, attributes, text = token.groups()
+            if text is not None:
+                self.text(text)
+            elif tag is None:
+                continue  # <- comment or declaration
+            elif tag.lower() == 'div' and closing:
+                if self.close_div():
+                    return  # <- the rest of the table is not needed
+            elif tag.lower() == 'div':
+                self.open_div(attributes)
+            elif not closing and tag.lower() in _RAW_TEXT_END:
+                end = _RAW_TEXT_END[tag.lower()].search(self.html, self.position)
+                self.position = end.end() if end else len(self.html)
+
+    def text(self, text: str) -> None:
+        if self.column is not None:
+            text = unescape(text).strip()
+            if text:
+                self.column.append(text)
+
+    def open_div(self, attributes: str) -> None:
+        if attributes.endswith('/'):
+            return
+        self.depth += 1
+        if self.column is not None:
+            return
+        style = _style(attributes)
+        if style and self.ingredients is None and INGREDIENTS_STYLE in style:
+            self.column = self.ingredients = []
+        elif style and self.prices is None and PRICES_STYLE in style:
+            self.column = self.prices = []
+        else:
+            return
+        self.column_depth = self.depth
+
+    def close_div(self) -> bool:
+        # whether both columns are complete
+        self.depth -= 1
+        if self.depth >= self.column_depth:
+            return False
+        self.column, self.column_depth = None, 0
+        return self.ingredients is not None and self.prices is not None
+
+
+def extract_price_breakdown(html: str) -> Optional[Tuple[List[str], List[str]]]:
+    """
+    Extract the ingredients and prices of a Spoonacular price breakdown widget in a single pass.
+
+    Only the table is scanned, tag by tag, without building a document tree: the
+    text of the first div with the ingredients style goes into the ingredients and
+    the text of the first div with the prices style into the prices, stripped and
+    unescaped like BeautifulSoup's stripped_strings.
+
+    Parameters:
+        html (str): The widget HTML.
+
+    Returns:
+        Optional[Tuple[List[str], List[str]]]: The ingredients and their prices, or None if the
+            widget has no price table.
+    """
+    table = _TABLE.search(html)
+    if table is None:
+        return None
+    scan = _TableScan(html, table.end())
+    scan.run()
+    if scan.ingredients is None or scan.prices is None:
+        return None
+    return scan.ingredients, scan.prices
+
+
+def parse_cost(price: str) -> float:
+    """
+    Read a displayed price, e.g. "$1,234.50".
+
+    Parameters:
+        price (str): The price as the widget shows it.
+
+    Returns:
+        float: The price in dollars, or NaN if it is not a number.
+    """
+    try:
+        return float(price.strip().lstrip('$').replace(',', ''))
+    except ValueError:
+        return math.nan
+
+
+class PriceBreakdown(NamedTuple):
+    """
+        The price table of a recipe, as displayed and as numbers.
+
+        costs holds the price of every ingredient in dollars, aligned with
+        ingredients; it is NaN where the price could not be read, is missing, or
+        the row is a total rather than an ingredient, so NaN-aware sums add up
+        the ingredients only. Prices are for the whole recipe; per_serving is the
+        cost per serving the widget shows below the table.
+    """
+    ingredients: List[str]
+    prices: List[str]
+    costs: np.ndarray
+    per_serving: float
+
+    @classmethod
+    def from_html(cls, html: str) -> Optional['PriceBreakdown']:
+        """
+        Extract and parse the price table of a Spoonacular price breakdown widget.
+
+        Parameters:
+            html (str): The widget HTML.
+
+        Returns:
+            Optional[PriceBreakdown]: The breakdown, or None if the widget has no price table.
+        """
+        table = extract_price_breakdown(html)
+        if table is None:
+            return None
+        ingredients, prices = table
+        costs = np.full(len(ingredients), np.nan)
+        for row, (ingredient, price) in enumerate(zip(ingredients, prices)):
+            if not _TOTAL_ROW.search(ingredient):
+                costs[row] = parse_cost(price)
+        per_serving = _PER_SERVING.search(html)
+        return cls(ingredients, prices, costs, parse_cost(per_serving.group(1)) if per_serving else math.nan)
+
+    @property
+    def total(self) -> float:
+        """The cost of all ingredients in dollars, NaN if none has a price."""
+        return float(np.nansum(self.costs)) if not np.isnan(self.costs).all() else math.nan
+
+    def to_table(self) -> List[List[str]]:
+        """The ingredients and prices as displayed, the default answer of /api/price_breakdown."""
+        return [self.ingredients, self.prices]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the breakdown to a JSON-serializable dictionary, with null for unknown numbers.
+
+        Returns:
+            Dict[str, Any]: The ingredients, prices, costs, total and cost per serving.
+        """
+        return {'ingredients': self.ingredients, 'prices': self.prices,
+                'costs': [None if math.isnan(cost) else cost for cost in self.costs.tolist()],
+                'total': None if math.isnan(self.total) else round(self.total, 2),
+                'per_serving': None if math.isnan(self.per_serving) else self.per_serving}
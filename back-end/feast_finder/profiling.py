@@ -0,0 +1,157 @@
+from typing import Any, Callable, Dict, List, Optional
+import cProfile
+import json
+import os
+import random
+import re
+import threading
+import time
+
+# characters of a route rule that do not belong in a file name
+UNSAFE_FILE_CHARACTERS = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+class RequestProfiler:
+    """
+        Opt-in profiling of a sample of requests, keeping the profiles of slow ones.
+
+        A sampled request runs under cProfile; if it takes at least threshold
+        seconds its profile is written to the directory as a pstats file (open it
+        with `python -m pstats` or snakeviz), next to a JSON file with its tags,
+        e.g. the route and the time spent in Spoonacular calls. Only the newest
+        max_profiles profiles are kept. One request is profiled at a time, as a
+        thread can only run one profiler; a sampled request that arrives while
+        another one is profiled runs unprofiled. Before Python 3.12 only the
+        request's own thread is profiled, and calls fanned out to other threads
+        show up as waiting on futures; from 3.12 on cProfile records every thread
+        of the process, so a profile also holds the fanned out calls and whatever
+        other requests ran at the same time.
+
+        Parameters:
+            directory (str): Where the profiles are written, created when the first one is.
+            sample_rate (float): The share of requests to profile, 0 turns profiling off and 1 profiles all.
+            threshold (float): The duration in seconds from which a profile is kept.
+            max_profiles (int): The number of profiles kept; the oldest are deleted first.
+            sample (Callable[[], float]): Draws a number in [0, 1) per request.
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 0.0, threshold: float = 0.5, max_profiles: int = 100,
+                 sample: Callable[[], float] = random.random):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.max_profiles = max_profiles
+        self.sample = sample
+        self.counters = {'profiled': 0, 'busy': 0, 'written': 0, 'deleted': 0}
+        self._busy = threading.Lock()  # <- held while a request is profiled
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """
+        Start profiling the current request if it is sampled.
+
+        Returns:
+            Optional[cProfile.Profile]: The running profiler, to pass to finish or discard,
+                or None if the request is not profiled.
+        """
+        if not self.enabled or self.sample() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            self._count('busy')
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # <- another profiler, e.g. a debugger's, is already active
+            self._busy.release()
+            self._count('busy')
+            return None
+        self._count('profiled')
+        return profile
+
+    def discard(self, profile: cProfile.Profile) -> None:
+        """
+        Stop a profiler without keeping its profile.
+
+        Parameters:
+            profile (cProfile.Profile): The profiler returned by start.
+        """
+        profile.disable()
+        self._busy.release()
+
+    def finish(self, profile: cProfile.Profile, elapsed: float, tags: Dict[str, Any]) -> Optional[str]:
+        """
+        Stop a profiler and keep its profile if the request was slow.
+
+        Parameters:
+            profile (cProfile.Profile): The profiler returned by start.
+            elapsed (float): The duration of the request in seconds.
+            tags (Dict[str, Any]): What to store with the profile, e.g. the route.
+
+        Returns:
+            Optional[str]: The path of the pstats file, or None if the request was not slow.
+        """
+        self.discard(profile)
+        if elapsed < self.threshold:
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        route = UNSAFE_FILE_CHARACTERS.sub('_', str(tags.get('route', 'request'))).strip('_') or 'root'
+        now = time.time_ns()
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now // 10 ** 9))
+        name = f"{stamp}-{now % 10 ** 9:09d}-{route}-{round(elapsed * 1000)}ms"
+        path = os.path.join(self.directory, name + '.prof')
+        try:
+            profile.dump_stats(path)
+            with open(os.path.join(self.directory, name + '.json'), 'w') as file:
+                json.dump({**tags, 'elapsed': round(elapsed, 6), 'profile': name + '.prof'}, file, indent=4)
+        except OSError as error:
+            print(f"There was an error while writing the profile {path}: {error}")
+            return None
+        self._count('written')
+        self._rotate()
+        return path
+
+    def profiles(self) -> List[str]:
+        """
+        List the kept profiles, oldest first.
+
+        Returns:
+            List[str]: The paths of the pstats files.
+        """
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith('.prof'))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.directory, name) for name in names]  # <- names start with the time
+
+    def _rotate(self) -> None:
+        # delete the oldest profiles and their tags beyond max_profiles
+        with self._lock:
+            profiles = self.profiles()
+            for path in profiles[:max(0, len(profiles) - self.max_profiles)]:
+                for stale in (path, path[:-len('.prof')] + '.json'):
+                    try:
+                        os.remove(stale)
+                    except FileNotFoundError:
+                        pass
+                self.counters['deleted'] += 1
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the profiling settings and counters.
+
+        Returns:
+            Dict[str, Any]: The sample rate, threshold and counters; busy counts sampled
+                requests that ran unprofiled because another request was profiled.
+        """
+        with self._lock:
+            return {'sample_rate': self.sample_rate, 'threshold': self.threshold, **self.counters}
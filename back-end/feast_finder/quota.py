@@ -0,0 +1,190 @@
+from typing import Callable, Dict, Mapping, Optional, Tuple
+import math
+import threading
+import time
+
+# how each priority class shares the budget with the classes above it: the tokens of the bucket it
+# leaves to them, the longest it queues for a token in seconds, and the share of the daily quota it leaves to them
+PRIORITIES = {
+    'interactive': {'reserve': 0, 'max_wait': 5.0, 'quota_reserve': 0.0},   # <- detail views a user waits for
+    'search': {'reserve': 2, 'max_wait': 2.0, 'quota_reserve': 0.02},
+    'background': {'reserve': 5, 'max_wait': 1.0, 'quota_reserve': 0.1},   # <- prefetches
+}
+# upstream answers that mean the quota is used up: payment required (daily points) and too many requests
+QUOTA_STATUSES = frozenset((402, 429))
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class QuotaExceeded(Exception):
+    """
+        Raised instead of calling the upstream API when its quota does not allow the call.
+
+        Parameters:
+            retry_after (float): Seconds until a call is expected to be allowed again.
+            reason (str): Which budget ran out, "rate limit" or "daily quota".
+    """
+
+    def __init__(self, retry_after: float, reason: str = 'rate limit'):
+        super().__init__(f"upstream {reason} exhausted, retry after {retry_after:.1f} s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class QuotaScheduler:
+    """
+        Token bucket in front of every upstream call made with one API key.
+
+        The bucket holds up to burst tokens and refills at rate tokens per second;
+        every call takes one. A caller that finds the bucket empty books the next
+        token and waits until it is due, unless that takes longer than its priority
+        class may wait: then it fails fast with QuotaExceeded. Lower classes leave
+        some tokens to the classes above them, so a burst of searches or prefetches
+        cannot starve the detail views.
+
+        The daily quota is tracked from the X-API-Quota-* headers of the answers.
+        Once it is used up, or Spoonacular answers 402, calls fail until it resets
+        at midnight UTC; a 429 empties the bucket for its Retry-After.
+
+        reserve only books and returns the wait, so the threaded and the asyncio
+        client can share one scheduler.
+
+        Parameters:
+            rate (float): Tokens added per second, the sustained calls per second.
+            burst (float): The size of the bucket, the calls that may be made at once.
+            priorities (Dict[str, Dict[str, float]]): The priority classes, like PRIORITIES.
+            clock (Callable[[], float]): The time source of the bucket, monotonic seconds.
+            wall_clock (Callable[[], float]): The time source of the daily reset, Unix seconds.
+    """
+
+    def __init__(self, rate: float = 10.0, burst: float = 20.0, priorities: Dict[str, Dict[str, float]] = PRIORITIES,
+                 clock: Callable[[], float] = time.monotonic, wall_clock: Callable[[], float] = time.time):
+        self.rate = rate
+        self.burst = burst
+        self.priorities = priorities
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.tokens = float(burst)  # <- negative while calls are booked ahead
+        self.updated = clock()
+        # daily quota points reported by the last answer, until the next reset
+        self.quota_used: Optional[float] = None
+        self.quota_left: Optional[float] = None
+        self.quota_reset = 0.0
+        self.exhausted_until = 0.0
+        self.counters = {name: {'granted': 0, 'queued': 0, 'rejected': 0} for name in priorities}
+        self._lock = threading.Lock()
+
+    def reserve(self, priority: str = 'interactive') -> float:
+        """
+        Book a token for one upstream call.
+
+        Parameters:
+            priority (str): The priority class of the call.
+
+        Returns:
+            float: How many seconds the caller has to wait before making the call.
+
+        Raises:
+            QuotaExceeded: If the daily quota is used up or the call would have to wait
+                longer than its class allows; no token is booked then.
+        """
+        with self._lock:
+            counters = self.counters[priority]
+            wait, reason = self._wait(priority)
+            if reason == 'daily quota' or wait > self.priorities[priority]['max_wait']:
+                counters['rejected'] += 1
+                raise QuotaExceeded(wait, reason)
+            self.tokens -= 1
+            counters['granted'] += 1
+            if wait > 0:
+                counters['queued'] += 1
+            return wait
+
+    def exceeded(self, priority: str = 'interactive') -> QuotaExceeded:
+        """
+        Get the error for a call that the upstream API rejected for its quota, see observe.
+
+        Parameters:
+            priority (str): The priority class of the call.
+
+        Returns:
+            QuotaExceeded: The error, with how long a call of the class would have to wait now.
+        """
+        with self._lock:
+            return QuotaExceeded(*self._wait(priority))
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """
+        Update the quota from an upstream answer.
+
+        Parameters:
+            status_code (int): The HTTP status of the answer.
+            headers (Mapping[str, str]): Its headers, with the X-API-Quota-Used and
+                X-API-Quota-Left points of Spoonacular.
+        """
+        headers = {key.lower(): value for key, value in headers.items()}
+        used = _points(headers.get('x-api-quota-used'))
+        left = _points(headers.get('x-api-quota-left'))
+        with self._lock:
+            now = self.wall_clock()
+            if left is not None:
+                self.quota_used, self.quota_left, self.quota_reset = used or 0.0, left, next_reset(now)
+                if left <= 0:
+                    self.exhausted_until = self.quota_reset
+            if status_code == 402:
+                self.exhausted_until = next_reset(now)
+            elif status_code == 429:
+                retry_after = headers.get('retry-after', '')
+                seconds = float(retry_after) if retry_after.isdigit() else 1.0
+                self._refill()
+                self.tokens = min(self.tokens, -self.rate * seconds)
+
+    def _wait(self, priority: str) -> Tuple[float, str]:
+        # seconds until a call of the class is allowed, and which budget it waits for
+        settings = self.priorities[priority]
+        now = self.wall_clock()
+        if now < self.exhausted_until:
+            return self.exhausted_until - now, 'daily quota'
+        if now >= self.quota_reset:
+            self.quota_used = self.quota_left = None
+        elif self.quota_left is not None and self.quota_left < settings['quota_reserve'] * (self.quota_used + self.quota_left):
+            return self.quota_reset - now, 'daily quota'
+        self._refill()
+        return max(0.0, (1 + settings['reserve'] - self.tokens) / self.rate), 'rate limit'
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get the state of the bucket and the daily quota, and the counters of every priority class.
+
+        Returns:
+            Dict[str, object]: The rate, burst and tokens left (negative when calls are
+                booked ahead), the daily quota points, the seconds until it resets if it
+                is used up, and per class how many calls were granted, queued and rejected.
+        """
+        with self._lock:
+            self._refill()
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'tokens': round(self.tokens, 2),
+                'quota_used': self.quota_used,
+                'quota_left': self.quota_left,
+                'exhausted_for': max(0.0, round(self.exhausted_until - self.wall_clock(), 1)),
+                'priorities': {name: dict(counters) for name, counters in self.counters.items()},
+            }
+
+
+def next_reset(now: float) -> float:
+    # Spoonacular resets the daily quota at midnight UTC, which Unix time days end on
+    return (math.floor(now / SECONDS_PER_DAY) + 1) * SECONDS_PER_DAY
+
+
+def _points(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
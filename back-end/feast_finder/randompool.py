@@ -0,0 +1,128 @@
+from collections import deque
+from typing import Callable, Dict, List, Optional
+import threading
+
+
+class RecipePool:
+    """
+        Pool of prefetched random recipes, refilled by a background thread.
+
+        take serves a recipe from memory. Whenever fewer than low recipes are
+        left, the thread fetches a batch that fills the pool back up to high with
+        a single upstream call. Only a caller that finds the pool empty waits for
+        the refill. After a refill that failed, or still left fewer than low
+        recipes, the thread waits for the next take before trying again, so an
+        unavailable upstream is not called in a loop.
+
+        The thread is started by the first take, so creating a pool calls nothing.
+
+        Parameters:
+            fetch (Callable[[int], Optional[List[dict]]]): Fetches up to the given
+                number of random recipes, None if that failed.
+            low (int): The number of recipes below which the pool is refilled.
+            high (int): The number of recipes the pool is refilled to.
+            max_wait (float): The longest time in seconds a caller waits for a refill
+                of an empty pool.
+    """
+
+    def __init__(self, fetch: Callable[[int], Optional[List[dict]]], low: int = 5, high: int = 20,
+                 max_wait: float = 15.0):
+        if not 0 < low <= high:
+            raise ValueError(f"RecipePool needs 0 < low <= high, got low={low}, high={high}")
+        self.fetch = fetch
+        self.low = low
+        self.high = high
+        self.max_wait = max_wait
+        self.recipes: deque = deque()
+        self.counters = {'served': 0, 'waited': 0, 'refills': 0, 'failed_refills': 0, 'fetched': 0}
+        # refills attempted so far, and the error of the last one if it failed
+        self._attempts = 0
+        self._error: Optional[BaseException] = None
+        self._requested = True
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def take(self, block: bool = True) -> Optional[dict]:
+        """
+        Take a recipe from the pool.
+
+        Parameters:
+            block (bool): Whether to wait for a refill if the pool is empty.
+
+        Returns:
+            Optional[dict]: The recipe, or None if the pool is empty and could not be refilled
+                (or block is False).
+
+        Raises:
+            Exception: Whatever the refill this caller waited for raised, e.g. QuotaExceeded.
+        """
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='random-recipe-pool', daemon=True)
+                self._thread.start()
+            self._requested = True
+            if not self.recipes and block:
+                self.counters['waited'] += 1
+                attempts = self._attempts
+                self._condition.notify_all()
+                self._condition.wait_for(lambda: self.recipes or self._attempts > attempts or self._stopped,
+                                         self.max_wait)
+                if not self.recipes and self._attempts > attempts and self._error is not None:
+                    raise self._error
+            recipe = self.recipes.popleft() if self.recipes else None
+            if recipe is not None:
+                self.counters['served'] += 1
+            if len(self.recipes) < self.low:
+                self._condition.notify_all()
+            return recipe
+
+    def stop(self) -> None:
+        """Stop the refill thread."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._stopped or (self._requested and len(self.recipes) < self.low))
+                if self._stopped:
+                    return
+                number = self.high - len(self.recipes)
+
+            error, recipes = None, None
+            try:
+                recipes = self.fetch(number)
+            except Exception as fetch_error:
+                error = fetch_error
+                print(f"There was an error while refilling the random recipe pool: {fetch_error}")
+
+            with self._condition:
+                self._attempts += 1
+                self._error = error
+                if recipes:
+                    # a batch may repeat recipes that are still in the pool
+                    pooled = {recipe.get('id') for recipe in self.recipes}
+                    fresh = [recipe for recipe in recipes if recipe.get('id') not in pooled]
+                    self.recipes.extend(fresh[:self.high - len(self.recipes)])
+                    self.counters['refills'] += 1
+                    self.counters['fetched'] += len(recipes)
+                else:
+                    self.counters['failed_refills'] += 1
+                if len(self.recipes) < self.low:
+                    self._requested = False  # <- wait for the next take before trying again
+                self._condition.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the size of the pool and its counters.
+
+        Returns:
+            Dict[str, int]: The recipes in the pool, the watermarks, how many recipes were
+                served and how many takes had to wait for a refill, and the refill counters.
+        """
+        with self._condition:
+            return {**self.counters, 'size': len(self.recipes), 'low': self.low, 'high': self.high}
@@ -0,0 +1,107 @@
+from json.encoder import encode_basestring_ascii
+from typing import Any, Dict, Iterable
+import json
+
+# the serialized fields, in the order they are written
+FIELDS = ('title', 'recipe_id', 'instructions', 'ingredients', 'image')
+# a recipe as json.dumps writes its dict, filled in with the encoded fields
+RECORD_TEMPLATE = '{"title": %s, "recipe_id": %s, "instructions": %s, "ingredients": %s, "image": %s}'
+
+
+def encode_value(value: Any) -> str:
+    """
+    Encode a single field value exactly like json.dumps does.
+
+    Parameters:
+        value (Any): The value, usually a string.
+
+    Returns:
+        str: The JSON text of the value.
+    """
+    if type(value) is str:
+        return encode_basestring_ascii(value)
+    return json.dumps(value)
+
+
+class Recipe:
+    # no per-instance __dict__: a recipe only takes the space of its five references
+    __slots__ = FIELDS
+
+    def __init__(self, title: str, instructions: str, ingredients: str, image: str, id: int = None) -> None:
+        """
+        Initialize a Recipe object.
+
+        Parameters:
+            title (str): The title of the recipe.
+            id (int): The ID of the recipe.
+            instructions (str): The instructions for making the recipe.
+            ingredients (str): The ingredients required for the recipe.
+            image (str): The URL of the image representing the recipe.
+        """
+        self.title = title
+        self.recipe_id = id
+        self.instructions = instructions
+        self.ingredients = ingredients
+        self.image = image
+
+    def __str__(self):
+        return f"[{self.recipe_id}] Recipe {self.title}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the recipe as a JSON-serializable dictionary.
+
+        Returns:
+            Dict[str, Any]: The fields of the recipe keyed by their JSON names.
+        """
+        return {'title': self.title, 'recipe_id': self.recipe_id, 'instructions': self.instructions,
+                'ingredients': self.ingredients, 'image': self.image}
+
+    def to_json(self) -> str:
+        """
+        Serialize the recipe without building an intermediate dictionary.
+
+        Returns:
+            str: The same text as json.dumps(recipe.to_dict()).
+        """
+        return RECORD_TEMPLATE % (encode_value(self.title), encode_value(self.recipe_id),
+                                  encode_value(self.instructions), encode_value(self.ingredients),
+                                  encode_value(self.image))
+
+
+def recipes_to_json(recipes: Iterable[Recipe]) -> str:
+    """
+    Serialize many recipes as one JSON object keyed by recipe ID, one recipe per line.
+
+    Parameters:
+        recipes (Iterable[Recipe]): The recipes.
+
+    Returns:
+        str: The JSON text, equal in content to json.dumps of the to_dict() of every recipe.
+    """
+    lines = [f"    {encode_value(str(recipe.recipe_id))}: {recipe.to_json()}" for recipe in recipes]
+    if not lines:
+        return '{}'
+    return '{\n' + ',\n'.join(lines) + '\n}'
+
+
+def process_raw_json(raw_json: Dict) -> Dict[str, Recipe]:
+    """
+    Build Recipe objects from serialized recipes keyed by recipe ID.
+
+    Parameters:
+        raw_json (Dict): The serialized recipes.
+
+    Returns:
+        Dict[str, Recipe]: The recipes keyed by recipe ID.
+    """
+    recipes = {}
+    for rid, data in raw_json.items():  # rid == recipe_id
+        recipes[rid] = Recipe(
+            data.get('title') or data.get('recipe_title') or '',  # real title
+            data['instructions'],
+            data['ingredients'],
+            data.get('image', ''),
+            id=rid
+        )
+    return recipes
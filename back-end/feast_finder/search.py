@@ -0,0 +1,287 @@
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import re
+import threading
+from .recipe import Recipe
+from .util import decode_cursor, encode_cursor
+
+# a token is a maximal run of letters and digits of the lower-cased text
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+# length of the character n-grams that index the token vocabulary
+GRAM_SIZE = 3
+
+# bit flags of the fields a token occurs in, and how much a match in each field counts
+TITLE, INGREDIENTS, INSTRUCTIONS = 4, 2, 1
+FIELD_WEIGHTS = {TITLE: 3.0, INGREDIENTS: 2.0, INSTRUCTIONS: 1.0}
+
+# how much a query term counts when it matches a token exactly, as a prefix or with typos
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.7
+FUZZY_WEIGHT = 0.5
+# lowest n-gram (Dice) similarity for a token to count as a typo of a query term
+FUZZY_THRESHOLD = 0.5
+
+
+def tokenize(text: str) -> Set[str]:
+    """
+    Split lower-cased text into its distinct tokens.
+
+    Parameters:
+        text (str): The lower-cased text.
+
+    Returns:
+        Set[str]: The tokens of the text.
+    """
+    return set(TOKEN_PATTERN.findall(text))
+
+
+def grams(token: str) -> Set[str]:
+    """
+    Get the character n-grams of a token.
+
+    Parameters:
+        token (str): The token.
+
+    Returns:
+        Set[str]: The distinct n-grams, empty if the token is shorter than GRAM_SIZE.
+    """
+    return {token[i:i + GRAM_SIZE] for i in range(len(token) - GRAM_SIZE + 1)}
+
+
+def recipe_matches(recipe: Recipe, query: str) -> bool:
+    """
+    Check whether a lower-cased query occurs in the title, instructions or ingredients.
+
+    Parameters:
+        recipe (Recipe): The recipe to check.
+        query (str): The lower-cased query.
+
+    Returns:
+        bool: True if the query is a substring of one of the fields, False otherwise.
+    """
+    return (query in recipe.title.lower() or
+            query in recipe.instructions.lower() or
+            query in recipe.ingredients.lower())
+
+
+def field_score(fields: int) -> float:
+    """
+    Get the weight of a token that occurs in the given fields.
+
+    Parameters:
+        fields (int): Bit flags of the fields (TITLE, INGREDIENTS, INSTRUCTIONS).
+
+    Returns:
+        float: The sum of the weights of the fields.
+    """
+    return sum(weight for field, weight in FIELD_WEIGHTS.items() if fields & field)
+
+
+class InvertedIndex:
+    """
+        Token-level inverted index over the title, instructions and ingredients of the favorites.
+
+        It answers the same case-insensitive substring queries as a linear scan: a
+        query made of letters and digits only occurs in a field exactly when it is
+        part of one of the field's tokens, so its result is read off the postings.
+        Any other query uses the postings of its tokens to narrow down candidates,
+        which are then checked against the recipes themselves. The tokens that
+        contain a query token are found through an n-gram index of the vocabulary.
+    """
+
+    def __init__(self):
+        # token -> {recipe ID -> bit flags of the fields the token occurs in}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.recipe_tokens: Dict[str, Set[str]] = {}
+        self.gram_tokens: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.recipe_tokens)
+
+    def build(self, recipes: Iterable[Recipe]) -> None:
+        """
+        Replace the index contents with the given recipes.
+
+        Parameters:
+            recipes (Iterable[Recipe]): All recipes to index.
+        """
+        with self._lock:
+            self.postings = {}
+            self.recipe_tokens = {}
+            self.gram_tokens = {}
+        for recipe in recipes:
+            self.add(recipe)
+
+    def add(self, recipe: Recipe) -> None:
+        """
+        Index a recipe, replacing what was indexed for its ID before.
+
+        Parameters:
+            recipe (Recipe): The recipe to index.
+        """
+        token_fields: Dict[str, int] = {}
+        for field, text in ((TITLE, recipe.title), (INSTRUCTIONS, recipe.instructions),
+                            (INGREDIENTS, recipe.ingredients)):
+            for token in tokenize(text.lower()):
+                token_fields[token] = token_fields.get(token, 0) | field
+        with self._lock:
+            self._remove(recipe.recipe_id)
+            self.recipe_tokens[recipe.recipe_id] = set(token_fields)
+            for token, fields in token_fields.items():
+                if token not in self.postings:
+                    self.postings[token] = {}
+                    for gram in grams(token):
+                        self.gram_tokens.setdefault(gram, set()).add(token)
+                self.postings[token][recipe.recipe_id] = fields
+
+    def remove(self, recipe_id: str) -> None:
+        """
+        Remove a recipe from the index.
+
+        Parameters:
+            recipe_id (str): The ID of the recipe.
+        """
+        with self._lock:
+            self._remove(recipe_id)
+
+    def _remove(self, recipe_id: str) -> None:
+        for token in self.recipe_tokens.pop(recipe_id, ()):
+            ids = self.postings[token]
+            ids.pop(recipe_id, None)
+            if not ids:
+                del self.postings[token]
+                for gram in grams(token):
+                    gram_tokens = self.gram_tokens[gram]
+                    gram_tokens.discard(token)
+                    if not gram_tokens:
+                        del self.gram_tokens[gram]
+
+    def _tokens_containing(self, part: str) -> Iterable[str]:
+        # tokens of the vocabulary that contain `part`
+        part_grams = grams(part)
+        if not part_grams:
+            return [token for token in self.postings if part in token]
+        candidates = None
+        for gram in part_grams:
+            tokens = self.gram_tokens.get(gram)
+            if not tokens:
+                return []
+            candidates = tokens if candidates is None or len(tokens) < len(candidates) else candidates
+        return [token for token in candidates if part in token]
+
+    def _containing(self, part: str) -> Set[str]:
+        # IDs of the recipes with a token that contains `part`
+        ids = set()
+        for token in self._tokens_containing(part):
+            ids.update(self.postings[token])
+        return ids
+
+    def _term_matches(self, term: str, prefix: bool, fuzzy: bool) -> Dict[str, float]:
+        # tokens of the vocabulary that match a query term, with the weight of the match
+        matches = {}
+        if prefix:
+            for token in self._tokens_containing(term):
+                if token.startswith(term):
+                    matches[token] = PREFIX_WEIGHT
+        if term in self.postings:
+            matches[term] = EXACT_WEIGHT
+        term_grams = grams(term)
+        if fuzzy and term_grams:
+            shared = Counter()
+            for gram in term_grams:
+                shared.update(self.gram_tokens.get(gram, ()))
+            for token, count in shared.items():
+                similarity = 2 * count / (len(term_grams) + len(grams(token)))
+                if similarity >= FUZZY_THRESHOLD and token not in matches:
+                    matches[token] = FUZZY_WEIGHT * similarity
+        return matches
+
+    def rank(self, query: str, limit: int, cursor: Optional[str] = None,
+             prefix: bool = True, fuzzy: bool = True) -> Tuple[List[Tuple[str, float]], Optional[str]]:
+        """
+        Find the recipes that best match the terms of a query, best first.
+
+        Every query term adds the score of its best match in a recipe: the match
+        weight (exact, prefix or fuzzy) times the weight of the fields it occurs in,
+        so title matches rank above ingredient and instruction matches. Only the
+        requested page is selected, with a bounded heap instead of a full sort.
+
+        Parameters:
+            query (str): The search query; matching is case-insensitive.
+            limit (int): The maximum number of results.
+            cursor (Optional[str]): The next_cursor of the previous page.
+            prefix (bool): Whether query terms also match tokens they are a prefix of.
+            fuzzy (bool): Whether query terms also match tokens with similar n-grams.
+
+        Returns:
+            Tuple[List[Tuple[str, float]], Optional[str]]: The IDs and scores of the
+                results, and the cursor of the next page or None if this is the last one.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        after = None
+        if cursor:
+            try:
+                neg_score, recipe_id = decode_cursor(cursor)
+                after = (float(neg_score), str(recipe_id))
+            except (TypeError, ValueError) as error:
+                raise ValueError(f"Invalid cursor: {cursor}") from error
+        scores: Dict[str, float] = {}
+
+        with self._lock:
+            for term in set(TOKEN_PATTERN.findall(query.lower())):
+                best: Dict[str, float] = {}
+                for token, weight in self._term_matches(term, prefix, fuzzy).items():
+                    for recipe_id, fields in self.postings[token].items():
+                        score = weight * field_score(fields)
+                        if score > best.get(recipe_id, 0.0):
+                            best[recipe_id] = score
+                for recipe_id, score in best.items():
+                    scores[recipe_id] = scores.get(recipe_id, 0.0) + score
+
+        entries = ((-round(score, 6), recipe_id) for recipe_id, score in scores.items())
+        if after is not None:
+            entries = (entry for entry in entries if entry > after)
+        top = heapq.nsmallest(limit + 1, entries)
+
+        next_cursor = encode_cursor(list(top[limit - 1])) if len(top) > limit else None
+        return [(recipe_id, -neg_score) for neg_score, recipe_id in top[:limit]], next_cursor
+
+    def search(self, query: str, get_recipe: Callable[[str], Optional[Recipe]]) -> List[str]:
+        """
+        Find the recipes whose title, instructions or ingredients contain the query.
+
+        Parameters:
+            query (str): The search query; matching is case-insensitive.
+            get_recipe (Callable[[str], Optional[Recipe]]): Looks up a recipe by ID,
+                used to verify candidates of queries that span several tokens.
+
+        Returns:
+            List[str]: The IDs of the matching recipes.
+        """
+        query = query.lower()
+        parts = TOKEN_PATTERN.findall(query)
+
+        with self._lock:
+            if not parts:
+                candidates = set(self.recipe_tokens)
+            else:
+                candidates = None
+                for part in sorted(set(parts), key=len, reverse=True):
+                    ids = self._containing(part)
+                    candidates = ids if candidates is None else candidates & ids
+                    if not candidates:
+                        return []
+
+        if TOKEN_PATTERN.fullmatch(query):
+            return list(candidates)
+
+        matches = []
+        for recipe_id in candidates:
+            recipe = get_recipe(recipe_id)
+            if recipe is not None and recipe_matches(recipe, query):
+                matches.append(recipe_id)
+        return matches
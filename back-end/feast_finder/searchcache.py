@@ -0,0 +1,181 @@
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import math
+import threading
+import time
+
+# a cached search: normalized query, lowest and highest calories
+SearchKey = Tuple[str, float, float]
+
+
+def normalize_query(query: Optional[str]) -> str:
+    # searches that only differ in case or spacing share an entry
+    return ' '.join((query or '').lower().split())
+
+
+def calories(result: dict) -> Optional[float]:
+    """
+    Get the calories of a search result, which Spoonacular adds to the results of searches with a calorie filter.
+
+    Parameters:
+        result (dict): A result of complexSearch.
+
+    Returns:
+        Optional[float]: The calories, or None if the result has none.
+    """
+    for nutrient in result.get('nutrition', {}).get('nutrients', []):
+        if nutrient.get('name') == 'Calories':
+            return nutrient.get('amount')
+    return None
+
+
+class SearchCache:
+    """
+        Cache of recipe search results that also answers narrower calorie ranges.
+
+        Results are cached per normalized query and calorie range. A search whose
+        range lies within a cached range of the same query is answered by filtering
+        the cached results on their calories, without an upstream call; only entries
+        that hold every result of their range (not just the first page) and know the
+        calories of each can answer narrower ranges. Entries expire ttl seconds after
+        they were loaded, and the least recently used ones are evicted once more than
+        max_entries are cached.
+
+        Parameters:
+            max_entries (int): The maximum number of cached searches.
+            ttl (float): How many seconds a search result stays fresh.
+            clock (Callable[[], float]): The time source, monotonic seconds.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        # (query, min, max) -> (expiry time, results, total results, complete)
+        self.entries: OrderedDict = OrderedDict()
+        # query -> calorie ranges of its complete entries
+        self.ranges: Dict[str, Set[Tuple[float, float]]] = {}
+        self.counters = {'hits': 0, 'subsumed': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: Optional[str], min_calories: Optional[float], max_calories: Optional[float]) -> SearchKey:
+        """
+        Normalize a search; missing calorie bounds mean unbounded. Searches without
+        a lower bound are kept apart from those from 0, as Spoonacular leaves out
+        recipes without calories once any bound is set.
+
+        Parameters:
+            query (Optional[str]): The search words.
+            min_calories (Optional[float]): The lowest calories.
+            max_calories (Optional[float]): The highest calories.
+
+        Returns:
+            SearchKey: The normalized query and calorie range.
+        """
+        return (normalize_query(query), -math.inf if min_calories is None else float(min_calories),
+                math.inf if max_calories is None else float(max_calories))
+
+    def lookup(self, key: SearchKey) -> Optional[Tuple[List[dict], int]]:
+        """
+        Get the cached results of a search, filtered from a wider cached range if needed.
+
+        Parameters:
+            key (SearchKey): The normalized search, see key.
+
+        Returns:
+            Optional[Tuple[List[dict], int]]: The results and the total number of results
+                of the search, or None if it is not cached (counted as a miss).
+        """
+        query, low, high = key
+        with self._lock:
+            now = self.clock()
+            entry = self._fresh(key, now)
+            if entry is not None:
+                self.counters['hits'] += 1
+                return entry[1], entry[2]
+
+            for wider in sorted(self.ranges.get(query, ()), key=lambda bounds: bounds[1] - bounds[0]):
+                if wider[0] <= low and high <= wider[1]:
+                    entry = self._fresh((query,) + wider, now)
+                    if entry is not None:
+                        self.counters['subsumed'] += 1
+                        results = [result for result in entry[1] if low <= calories(result) <= high]
+                        return results, len(results)
+
+            self.counters['misses'] += 1
+            return None
+
+    def store(self, key: SearchKey, results: List[dict], total: int) -> None:
+        """
+        Cache the results of a search.
+
+        Parameters:
+            key (SearchKey): The normalized search, see key.
+            results (List[dict]): The results that were fetched.
+            total (int): How many results the search has in all.
+        """
+        complete = total <= len(results) and all(calories(result) is not None for result in results)
+        with self._lock:
+            self._remove(key)
+            self.entries[key] = (self.clock() + self.ttl, results, total, complete)
+            if complete:
+                self.ranges.setdefault(key[0], set()).add(key[1:])
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+                self.counters['evictions'] += 1
+
+    def get(self, key: SearchKey, load: Callable[[], Optional[Tuple[List[dict], int]]]) -> Optional[Tuple[List[dict], int]]:
+        """
+        Get the results of a search from the cache, loading and caching them if they are not.
+
+        Parameters:
+            key (SearchKey): The normalized search, see key.
+            load (Callable[[], Optional[Tuple[List[dict], int]]]): Fetches the results and
+                the total; a result of None (a failed fetch) is not cached.
+
+        Returns:
+            Optional[Tuple[List[dict], int]]: The results and the total, or None if the load failed.
+        """
+        found = self.lookup(key)
+        if found is None:
+            found = load()
+            if found is not None:
+                self.store(key, *found)
+        return found
+
+    def _fresh(self, key: SearchKey, now: float) -> Optional[tuple]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            self._remove(key)
+            self.counters['expirations'] += 1
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def _remove(self, key: SearchKey) -> None:
+        if self.entries.pop(key, None) is not None:
+            ranges = self.ranges.get(key[0], set())
+            ranges.discard(key[1:])
+            if not ranges:
+                self.ranges.pop(key[0], None)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Get the hit, miss and eviction counters.
+
+        Returns:
+            Dict[str, float]: The counters, the number of cached searches and the hit rate.
+                Subsumed lookups are hits answered by filtering a wider calorie range.
+        """
+        with self._lock:
+            lookups = self.counters['hits'] + self.counters['subsumed'] + self.counters['misses']
+            hit_rate = (self.counters['hits'] + self.counters['subsumed']) / lookups if lookups else 0.0
+            return {**self.counters, 'size': len(self.entries), 'hit_rate': round(hit_rate, 3)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+            self.ranges.clear()
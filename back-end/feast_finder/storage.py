@@ -0,0 +1,458 @@
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+import bisect
+import json
+import os
+import sqlite3
+import threading
+from .oplog import OpLog, write_snapshot
+from .recipe import Recipe, process_raw_json, recipes_to_json
+
+
+class Storage(ABC):
+    """
+        Interface of the stores that keep the favorite recipes of a Feast_Finder.
+    """
+
+    @abstractmethod
+    def load(self) -> None:
+        """Load the persisted recipes."""
+
+    @abstractmethod
+    def recipes(self) -> Mapping:
+        """
+        Get a read-only mapping of all recipes.
+
+        Returns:
+            Mapping[str, Recipe]: The recipes keyed by recipe ID.
+        """
+
+    @abstractmethod
+    def get(self, recipe_id: str) -> Optional[Recipe]:
+        """
+        Get a single recipe.
+
+        Parameters:
+            recipe_id (str): The ID of the recipe.
+
+        Returns:
+            Optional[Recipe]: The recipe, or None if it does not exist.
+        """
+
+    @abstractmethod
+    def contains(self, recipe_id: str) -> bool:
+        """
+        Check whether a recipe with the given ID exists.
+
+        Parameters:
+            recipe_id (str): The ID of the recipe.
+
+        Returns:
+            bool: True if the recipe exists, False otherwise.
+        """
+
+    @abstractmethod
+    def page(self, after: Optional[str], limit: int) -> List[Recipe]:
+        """
+        Get the recipes that follow a recipe ID, ordered by recipe ID.
+
+        Because pages are addressed by the last ID seen rather than by an offset,
+        adding or deleting recipes never shifts the pages that follow.
+
+        Parameters:
+            after (Optional[str]): The last recipe ID of the previous page, or None
+                to start at the beginning.
+            limit (int): The maximum number of recipes.
+
+        Returns:
+            List[Recipe]: The recipes of the page.
+        """
+
+    @abstractmethod
+    def add(self, recipe: Recipe) -> None:
+        """
+        Store a new recipe. The caller makes sure the ID is not taken yet.
+
+        Parameters:
+            recipe (Recipe): The recipe to store.
+        """
+
+    @abstractmethod
+    def update_instructions(self, recipe_id: str, new_instructions: str) -> bool:
+        """
+        Replace the instructions of a recipe.
+
+        Parameters:
+            recipe_id (str): The ID of the recipe.
+            new_instructions (str): The new instructions.
+
+        Returns:
+            bool: True if the recipe was updated, False if it does not exist.
+        """
+
+    @abstractmethod
+    def delete(self, recipe_id: str) -> bool:
+        """
+        Delete a recipe.
+
+        Parameters:
+            recipe_id (str): The ID of the recipe.
+
+        Returns:
+            bool: True if the recipe was deleted, False if it does not exist.
+        """
+
+    @abstractmethod
+    def save(self) -> None:
+        """Write a complete, compacted copy of the recipes."""
+
+    @abstractmethod
+    def flush(self) -> None:
+        """
+        Make all mutations so far durable.
+
+        Mutations only change the in-memory state or an open transaction until the
+        next flush, which lets callers group many of them into one disk write.
+        """
+
+    def close(self) -> None:
+        """Release files and connections held by the store."""
+
+
+class JsonStorage(Storage):
+    """
+        Keep the recipes in a dict, persisted as a JSON snapshot plus an operation log.
+
+        Parameters:
+            file_path (str): The file path of the JSON snapshot.
+            compact_threshold (int): Number of logged operations after which the
+                log is folded back into the snapshot.
+    """
+
+    def __init__(self, file_path: str, compact_threshold: int = 1000):
+        self.file_path = file_path
+        self.compact_threshold = compact_threshold
+        self.favorite_recipes: Dict[str, Recipe] = {}
+        self.sorted_ids: List[str] = []
+        self.oplog = OpLog(f"{file_path}.log")
+        self._lock = threading.RLock()
+
+    def load(self) -> None:
+        try:
+            with open(self.file_path) as file:
+                raw_json = json.load(file)
+                if raw_json:
+                    self.favorite_recipes = process_raw_json(raw_json)
+
+        except FileNotFoundError:
+            print("There was an error while reading the file")
+
+        for record in self.oplog.replay():
+            self.apply_operation(record)
+        self.sorted_ids = sorted(self.favorite_recipes, key=str)
+
+    def apply_operation(self, record: Dict) -> None:
+        """
+        Apply a single logged operation to the in-memory recipes.
+
+        Operations are applied with "last write wins" semantics, so replaying a log
+        over a snapshot that already contains its effects is harmless.
+
+        Parameters:
+            record (Dict): The operation record written by the log.
+        """
+        rid = record['recipe_id']
+        if record['op'] == 'add':
+            self.favorite_recipes.update(process_raw_json({rid: record['recipe']}))
+        elif record['op'] == 'update':
+            if rid in self.favorite_recipes:
+                self.favorite_recipes[rid].instructions = record['instructions']
+        elif record['op'] == 'delete':
+            self.favorite_recipes.pop(rid, None)
+
+    def recipes(self) -> Mapping:
+        return self.favorite_recipes
+
+    def get(self, recipe_id: str) -> Optional[Recipe]:
+        return self.favorite_recipes.get(recipe_id)
+
+    def contains(self, recipe_id: str) -> bool:
+        return recipe_id in self.favorite_recipes
+
+    def page(self, after: Optional[str], limit: int) -> List[Recipe]:
+        with self._lock:
+            start = 0 if after is None else bisect.bisect_right(self.sorted_ids, str(after), key=str)
+            return [self.favorite_recipes[rid] for rid in self.sorted_ids[start:start + limit]]
+
+    def add(self, recipe: Recipe) -> None:
+        with self._lock:
+            self.favorite_recipes[recipe.recipe_id] = recipe
+            bisect.insort(self.sorted_ids, recipe.recipe_id, key=str)
+            self.oplog.append({'op': 'add', 'recipe_id': recipe.recipe_id, 'recipe': recipe.to_dict()})
+
+    def update_instructions(self, recipe_id: str, new_instructions: str) -> bool:
+        with self._lock:
+            if recipe_id not in self.favorite_recipes:
+                return False
+            self.favorite_recipes[recipe_id].instructions = new_instructions
+            self.oplog.append({'op': 'update', 'recipe_id': recipe_id, 'instructions': new_instructions})
+            return True
+
+    def delete(self, recipe_id: str) -> bool:
+        with self._lock:
+            if recipe_id not in self.favorite_recipes:
+                return False
+            del self.favorite_recipes[recipe_id]
+            del self.sorted_ids[bisect.bisect_left(self.sorted_ids, str(recipe_id), key=str)]
+            self.oplog.append({'op': 'delete', 'recipe_id': recipe_id})
+            return True
+
+    def flush(self) -> None:
+        """Write the buffered log records and compact once the log grows too long."""
+        with self._lock:
+            if self.oplog.count >= self.compact_threshold:
+                self.save()
+            else:
+                self.oplog.flush()
+
+    def save(self) -> None:
+        """Save recipes to a JSON snapshot and clear the operation log it now contains."""
+        with self._lock:
+            write_snapshot(self.file_path, recipes_to_json(self.favorite_recipes.values()))
+            self.oplog.truncate()
+
+    def close(self) -> None:
+        with self._lock:
+            self.oplog.flush()
+            self.oplog.close()
+
+
+class SqliteRecipes(Mapping):
+    """
+        Read-only mapping view over the recipes table of a SqliteStorage.
+
+        Nothing is cached: lookups are primary-key queries and iteration pages
+        through the table, so memory use does not grow with the collection.
+
+        Parameters:
+            storage (SqliteStorage): The store to read from.
+    """
+
+    def __init__(self, storage: 'SqliteStorage'):
+        self.storage = storage
+
+    def __getitem__(self, recipe_id: str) -> Recipe:
+        recipe = self.storage.get(recipe_id)
+        if recipe is None:
+            raise KeyError(recipe_id)
+        return recipe
+
+    def __contains__(self, recipe_id: object) -> bool:
+        return self.storage.contains(recipe_id)
+
+    def __len__(self) -> int:
+        return self.storage.count()
+
+    def __iter__(self) -> Iterator[str]:
+        for recipe in self.storage.scan():
+            yield recipe.recipe_id
+
+    def items(self) -> Iterator[Tuple[str, Recipe]]:
+        for recipe in self.storage.scan():
+            yield recipe.recipe_id, recipe
+
+    def values(self) -> Iterator[Recipe]:
+        return self.storage.scan()
+
+
+def read_json_favorites(file_path: str) -> Dict[str, Recipe]:
+    """
+    Read the favorites of the JSON backend, its snapshot plus the operations still in its log,
+    e.g. to seed another backend with them.
+
+    Parameters:
+        file_path (str): The file path of the JSON snapshot.
+
+    Returns:
+        Dict[str, Recipe]: The recipes by ID, empty if there are none or the snapshot is unreadable.
+    """
+    if not os.path.exists(file_path) and not os.path.exists(f"{file_path}.log"):
+        return {}
+    storage = JsonStorage(file_path)
+    try:
+        storage.load()
+    except json.JSONDecodeError:
+        return {}
+    finally:
+        storage.close()
+    return storage.favorite_recipes
+
+
+class SqliteStorage(Storage):
+    """
+        Keep the recipes in an SQLite database with one indexed row per recipe.
+
+        Mutations run inside an open transaction that flush() commits, so a burst
+        of writes can share a single commit.
+
+        Parameters:
+            db_path (str): The file path of the SQLite database.
+            seed_path (Optional[str]): A JSON favorites file imported, with its operation
+                log, when the database is still empty, so existing favorites carry over.
+    """
+
+    COLUMNS = "recipe_id, title, instructions, ingredients, image"
+    PAGE_SIZE = 500
+
+    def __init__(self, db_path: str, seed_path: Optional[str] = None):
+        self.db_path = db_path
+        self.seed_path = seed_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=FULL")
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS recipes ("
+                    " recipe_id TEXT PRIMARY KEY,"
+                    " title TEXT NOT NULL,"
+                    " instructions TEXT NOT NULL,"
+                    " ingredients TEXT NOT NULL,"
+                    " image TEXT)"
+                )
+        return self._conn
+
+    def load(self) -> None:
+        with self._lock:
+            if self.count() or not self.seed_path:
+                return
+            recipes = read_json_favorites(self.seed_path)
+            if not recipes:
+                return
+            with self.conn:
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO recipes ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                    (self._row(recipe) for recipe in recipes.values())
+                )
+
+    @staticmethod
+    def _row(recipe: Recipe) -> Tuple:
+        return (recipe.recipe_id, recipe.title, recipe.instructions, recipe.ingredients, recipe.image)
+
+    @staticmethod
+    def _recipe(row: Tuple) -> Recipe:
+        rid, title, instructions, ingredients, image = row
+        return Recipe(title, instructions, ingredients, image, id=rid)
+
+    def recipes(self) -> Mapping:
+        return SqliteRecipes(self)
+
+    def get(self, recipe_id: str) -> Optional[Recipe]:
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {self.COLUMNS} FROM recipes WHERE recipe_id = ?", (recipe_id,)
+            ).fetchone()
+        return self._recipe(row) if row else None
+
+    def contains(self, recipe_id: str) -> bool:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT 1 FROM recipes WHERE recipe_id = ?", (recipe_id,)
+            ).fetchone() is not None
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+
+    def scan(self) -> Iterator[Recipe]:
+        """
+        Iterate over all recipes in insertion order, one page at a time.
+
+        Returns:
+            Iterator[Recipe]: The stored recipes.
+        """
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT rowid, {self.COLUMNS} FROM recipes WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, self.PAGE_SIZE)
+                ).fetchall()
+            for row in rows:
+                yield self._recipe(row[1:])
+            if len(rows) < self.PAGE_SIZE:
+                return
+            last_rowid = rows[-1][0]
+
+    def page(self, after: Optional[str], limit: int) -> List[Recipe]:
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {self.COLUMNS} FROM recipes WHERE recipe_id > ? ORDER BY recipe_id LIMIT ?",
+                ('' if after is None else str(after), limit)
+            ).fetchall()
+        return [self._recipe(row) for row in rows]
+
+    def add(self, recipe: Recipe) -> None:
+        with self._lock:
+            self.conn.execute(
+                f"INSERT INTO recipes ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?)", self._row(recipe)
+            )
+
+    def update_instructions(self, recipe_id: str, new_instructions: str) -> bool:
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE recipes SET instructions = ? WHERE recipe_id = ?", (new_instructions, recipe_id)
+            )
+        return cursor.rowcount > 0
+
+    def delete(self, recipe_id: str) -> bool:
+        with self._lock:
+            cursor = self.conn.execute("DELETE FROM recipes WHERE recipe_id = ?", (recipe_id,))
+        return cursor.rowcount > 0
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+
+    def save(self) -> None:
+        with self._lock:
+            self.conn.commit()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+def make_storage(kind: str, file_path: str, compact_threshold: int = 1000) -> Storage:
+    """
+    Create the store for a favorites file.
+
+    Parameters:
+        kind (str): Either "json", "sqlite" or "lazy".
+        file_path (str): The file path of the JSON favorites file. The SQLite and
+            lazy stores live next to it and import it on first use.
+        compact_threshold (int): Compaction threshold of the JSON operation log and
+            of the lazy store's data file.
+
+    Returns:
+        Storage: The new store.
+    """
+    if kind == 'json':
+        return JsonStorage(file_path, compact_threshold)
+    if kind == 'sqlite':
+        return SqliteStorage(f"{os.path.splitext(file_path)[0]}.sqlite3", seed_path=file_path)
+    if kind == 'lazy':
+        from .lazy import LazyStorage  # lazy.py builds on this module
+        return LazyStorage(file_path, compact_threshold)
+    raise ValueError(f"Unknown storage backend: {kind}")
@@ -0,0 +1,236 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+import threading
+import time
+
+
+class _Flight:
+    # an upstream load in progress, which concurrent misses for the same key wait for
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """
+        In-process cache of upstream responses, bounded by size and by age.
+
+        Entries expire ttl seconds after they were loaded, and the least recently
+        used entries are evicted once more than max_entries are cached. Concurrent
+        misses for the same key are collapsed into a single load (single-flight):
+        the first caller loads, the others wait for and share its result.
+
+        Parameters:
+            max_entries (int): The maximum number of cached values.
+            ttl (float): How many seconds a value stays fresh.
+            clock (Callable[[], float]): The time source, monotonic seconds.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        # key -> (expiry time, value)
+        self.entries: OrderedDict = OrderedDict()
+        self.flights: Dict[Hashable, _Flight] = {}
+        self.counters = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0, 'expirations': 0}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """
+        Get the cached value for a key, loading it if it is missing or expired.
+
+        Parameters:
+            key (Hashable): Identifies the value, e.g. a recipe ID.
+            load (Callable[[], Any]): Fetches the value. A result of None (a failed
+                fetch) is passed on to the waiting callers but not cached.
+
+        Returns:
+            Any: The value, or None if the load failed.
+
+        Raises:
+            Exception: Whatever load raised, in the loading and in the waiting callers.
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self.entries.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return entry[1]
+                del self.entries[key]
+                self.counters['expirations'] += 1
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+                self.counters['misses'] += 1
+            else:
+                self.counters['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = load()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            self._land(key, flight)
+        return flight.value
+
+    def get_many(self, keys: Iterable[Hashable],
+                 load_many: Callable[[List[Hashable]], Dict[Hashable, Any]]) -> Dict[Hashable, Any]:
+        """
+        Get the cached values of many keys, loading all missing ones with a single call.
+
+        Keys that another caller is already loading are waited for instead of loaded again.
+
+        Parameters:
+            keys (Iterable[Hashable]): The keys.
+            load_many (Callable[[List[Hashable]], Dict[Hashable, Any]]): Fetches the
+                values of the given keys; keys it leaves out are not cached.
+
+        Returns:
+            Dict[Hashable, Any]: The values that were cached or could be loaded, by key.
+
+        Raises:
+            Exception: Whatever load_many raised.
+        """
+        values: Dict[Hashable, Any] = {}
+        leading: Dict[Hashable, _Flight] = {}
+        waiting: Dict[Hashable, _Flight] = {}
+        with self._lock:
+            now = self.clock()
+            for key in dict.fromkeys(keys):
+                entry = self.entries.get(key)
+                if entry is not None:
+                    if entry[0] > now:
+                        self.entries.move_to_end(key)
+                        self.counters['hits'] += 1
+                        values[key] = entry[1]
+                        continue
+                    del self.entries[key]
+                    self.counters['expirations'] += 1
+                if key in self.flights:
+                    waiting[key] = self.flights[key]
+                    self.counters['coalesced'] += 1
+                else:
+                    leading[key] = self.flights[key] = _Flight()
+                    self.counters['misses'] += 1
+
+        if leading:
+            error = None
+            loaded: Dict[Hashable, Any] = {}
+            try:
+                loaded = load_many(list(leading)) or {}
+            except BaseException as load_error:
+                error = load_error
+                raise
+            finally:
+                for key, flight in leading.items():
+                    flight.error = error
+                    flight.value = loaded.get(key)
+                    self._land(key, flight)
+            values.update((key, value) for key, value in loaded.items() if key in leading and value is not None)
+
+        for key, flight in waiting.items():
+            flight.done.wait()
+            if flight.error is None and flight.value is not None:
+                values[key] = flight.value
+        return values
+
+    def peek(self, key: Hashable) -> Any:
+        """
+        Get the cached value for a key without loading it, e.g. for callers that load asynchronously.
+
+        Parameters:
+            key (Hashable): Identifies the value.
+
+        Returns:
+            Any: The value, or None if it is missing or expired (counted as a miss).
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self.entries.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return entry[1]
+                del self.entries[key]
+                self.counters['expirations'] += 1
+            self.counters['misses'] += 1
+            return None
+
+    def peek_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """
+        Get the cached values of many keys without loading the missing ones, under a single lock.
+
+        Parameters:
+            keys (Iterable[Hashable]): The keys.
+
+        Returns:
+            Dict[Hashable, Any]: The values that are cached and fresh, by key; the others count as misses.
+        """
+        values: Dict[Hashable, Any] = {}
+        with self._lock:
+            now = self.clock()
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    if entry[0] > now:
+                        self.entries.move_to_end(key)
+                        self.counters['hits'] += 1
+                        values[key] = entry[1]
+                        continue
+                    del self.entries[key]
+                    self.counters['expirations'] += 1
+                self.counters['misses'] += 1
+        return values
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Cache a value that was loaded outside of get.
+
+        Parameters:
+            key (Hashable): Identifies the value.
+            value (Any): The value.
+            ttl (Optional[float]): How many seconds it stays fresh, the cache's ttl if None.
+        """
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _land(self, key: Hashable, flight: _Flight) -> None:
+        # cache the result of a finished load and wake up the callers waiting for it
+        with self._lock:
+            if flight.error is None and flight.value is not None:
+                self._store(key, flight.value)
+            del self.flights[key]
+        flight.done.set()
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self.entries[key] = (self.clock() + (self.ttl if ttl is None else ttl), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the hit, miss and eviction counters.
+
+        Returns:
+            Dict[str, int]: The counters and the number of cached values. Coalesced
+                lookups are misses that waited for another caller's load.
+        """
+        with self._lock:
+            return {**self.counters, 'size': len(self.entries)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
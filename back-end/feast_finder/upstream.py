@@ -0,0 +1,137 @@
+from typing import Any, Dict, List, Optional, Tuple, Union
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from .quota import QUOTA_STATUSES, QuotaScheduler
+
+# (connect, read) timeout in seconds of calls that do not pass their own
+DEFAULT_TIMEOUT = (3.05, 10.0)
+# upstream answers that are worth another try: rate limited, bad gateway, unavailable, gateway timeout
+RETRY_STATUSES = frozenset((429, 502, 503, 504))
+
+
+class UpstreamClient:
+    """
+        Shared HTTP client for the Spoonacular API.
+
+        All calls go through one requests.Session, so connections are kept alive
+        and reused from a bounded pool instead of paying a TCP and TLS handshake
+        per request. Every call has a connect and read timeout, and failed calls
+        are retried a bounded number of times with jittered exponential backoff;
+        only GET is offered, so retrying is always safe. With a scheduler, every
+        attempt first takes a token of the API quota, and answers that say the quota
+        is used up raise QuotaExceeded.
+
+        Parameters:
+            pool_connections (int): The number of hosts whose pools are kept.
+            pool_maxsize (int): The maximum number of kept-alive connections per host.
+            timeout (Tuple[float, float]): The default (connect, read) timeout in seconds.
+            retries (int): How many times a failed call is retried.
+            backoff (float): The base delay in seconds before the first retry.
+            max_backoff (float): The longest delay in seconds before a retry.
+            scheduler (Optional[QuotaScheduler]): The quota scheduler in front of every call, none if None.
+    """
+
+    def __init__(self, pool_connections: int = 4, pool_maxsize: int = 20,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT, retries: int = 2,
+                 backoff: float = 0.1, max_backoff: float = 2.0, scheduler: Optional[QuotaScheduler] = None):
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.counters = {'requests': 0, 'retries': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: Optional[Dict] = None,
+            timeout: Optional[Union[float, Tuple[float, float]]] = None, stream: bool = False,
+            priority: str = 'interactive') -> requests.Response:
+        """
+        Send a GET request, retrying connection errors, timeouts and retryable statuses.
+
+        Parameters:
+            url (str): The URL.
+            params (Optional[Dict]): The query parameters.
+            timeout (Optional[Union[float, Tuple[float, float]]]): The (connect, read)
+                timeout in seconds, the client's default if None.
+            stream (bool): Whether the body is read lazily, e.g. with iter_content;
+                the caller then has to close the response.
+            priority (str): The priority class of the call in the quota scheduler.
+
+        Returns:
+            requests.Response: The last response, which may still have a retryable status.
+
+        Raises:
+            requests.RequestException: If the last attempt failed without a response.
+            QuotaExceeded: If the quota does not allow the call.
+        """
+        timeout = timeout or self.timeout
+        for attempt in range(self.retries + 1):
+            if self.scheduler is not None:
+                time.sleep(self.scheduler.reserve(priority))
+            self._count('requests' if attempt == 0 else 'retries')
+            try:
+                response = self.session.get(url, params=params, timeout=timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    self._count('errors')
+                    raise
+                time.sleep(self._delay(attempt))
+                continue
+            if self.scheduler is not None:
+                self.scheduler.observe(response.status_code, response.headers)
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                response.close()  # <- hands the connection back to the pool
+                time.sleep(self._delay(attempt, response.headers.get('Retry-After')))
+                continue
+            if self.scheduler is not None and response.status_code in QUOTA_STATUSES:
+                response.close()
+                raise self.scheduler.exceeded(priority)
+            return response
+
+    def _delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        # "full jitter": a random delay up to the exponential backoff, so retries do not arrive in waves
+        if retry_after is not None and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the call counters and the state of the connection pool of every host.
+
+        Returns:
+            Dict[str, Any]: The counters, and per host the pool size, the connections
+                in use and idle, and how many connections and requests it served.
+        """
+        pools: List[Dict[str, Any]] = []
+        pool_manager = self.adapter.poolmanager
+        for key in pool_manager.pools.keys():
+            pool = pool_manager.pools.get(key)
+            if pool is None or pool.pool is None:
+                continue
+            # the queue of a pool holds its idle connections, padded with None up to maxsize
+            queued = list(pool.pool.queue)
+            pools.append({
+                'host': f"{pool.scheme}://{pool.host}:{pool.port}",
+                'maxsize': pool.pool.maxsize,
+                'in_use': pool.pool.maxsize - len(queued),
+                'idle': sum(1 for connection in queued if connection is not None),
+                'connections_created': pool.num_connections,
+                'requests': pool.num_requests,
+            })
+        with self._lock:
+            counters = dict(self.counters)
+        return {**counters, 'pools': pools}
+
+    def close(self) -> None:
+        self.session.close()
@@ -1,4 +1,6 @@
 from typing import Dict, Tuple, List
+import base64
+import json
 
 def check_recipe_fields(json_data: Dict) -> Tuple[bool, str]:
     messages: List[str] = [] 
@@ -9,4 +11,39 @@ def check_recipe_fields(json_data: Dict) -> Tuple[bool, str]:
     if 'ingredients' not in json_data:
         messages.append("ingredients is required")
     
-    return (True, messages) if len(messages) == 0 else (False, messages)
\ No newline at end of file
+    return (True, messages) if len(messages) == 0 else (False, messages)
+
+
+def encode_cursor(key: List) -> str:
+    """
+    Encode the sort key of the last item of a page as an opaque cursor.
+
+    Parameters:
+        key (List): JSON-serializable sort key, e.g. [recipe_id].
+
+    Returns:
+        str: The cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> List:
+    """
+    Decode a cursor created by encode_cursor.
+
+    Parameters:
+        cursor (str): The cursor.
+
+    Returns:
+        List: The sort key.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError) as error:
+        raise ValueError(f"Invalid cursor: {cursor}") from error
+    if not isinstance(key, list):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return key
@@ -0,0 +1,376 @@
+"""
+Local stand-in for the Spoonacular API, to run and load test the back end offline.
+
+It replays recorded answers of every endpoint the proxy routes call: complexSearch,
+information, informationBulk, random and the HTML and PNG price breakdown widgets.
+A request without an exact recording gets a recording of the same endpoint, with
+the recipe ID filled in, so benchmarks can ask for any recipe. Latency, slow tail
+answers, errors and a daily quota can be injected, reproducibly with --seed.
+
+The bundled recordings in recordings/ are small samples in the shape of
+Spoonacular's answers. To record real ones, run in record mode with a valid key in
+the back end: requests are forwarded to Spoonacular and their answers saved.
+
+Usage:
+    python spoonacular_stub.py [--port N] [--latency S] [--jitter S] [--slow-rate P] [--slow-latency S]
+                               [--error-rate P] [--error-status N] [--quota N] [--seed N]
+                               [--recordings DIR] [--record [--upstream URL]]
+    SPOONACULAR_API=http://127.0.0.1:5050 python app.py
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+from pathlib import Path
+from urllib.parse import urlencode
+import argparse
+import asyncio
+import base64
+import json
+import random
+import re
+import threading
+from aiohttp import ClientSession, web
+from feast_finder.searchcache import calories
+
+RECORDINGS_DIR = Path(__file__).parent / "recordings"
+UPSTREAM = "https://api.spoonacular.com"
+# added to the ID of a random recipe each time a batch repeats it
+REPEAT_ID_STRIDE = 10 ** 7
+# requests per endpoint and injected errors, and the client session of record mode
+STATS = web.AppKey('stats', dict)
+SESSION = web.AppKey('session', ClientSession)
+
+# the endpoints the stand-in answers, by path; the group is the recipe ID
+ENDPOINTS: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r'/recipes/complexSearch'), 'complexSearch'),
+    (re.compile(r'/recipes/informationBulk'), 'informationBulk'),
+    (re.compile(r'/recipes/random'), 'random'),
+    (re.compile(r'/recipes/(\d+)/information'), 'information'),
+    (re.compile(r'/recipes/(\d+)/priceBreakdownWidget\.png'), 'priceBreakdownWidget.png'),
+    (re.compile(r'/recipes/(\d+)/priceBreakdownWidget'), 'priceBreakdownWidget'),
+]
+
+
+def endpoint(path: str) -> Tuple[Optional[str], Optional[int]]:
+    """
+    Find the endpoint of a request path.
+
+    Parameters:
+        path (str): The path of the request.
+
+    Returns:
+        Tuple[Optional[str], Optional[int]]: The endpoint and the recipe ID in the path, None if there is none.
+    """
+    for pattern, name in ENDPOINTS:
+        match = pattern.fullmatch(path)
+        if match:
+            return name, int(match.group(1)) if match.groups() else None
+    return None, None
+
+
+def recording_key(path: str, query: Dict[str, str]) -> str:
+    # the path and the sorted query without the API key, so recordings are shared by all keys
+    params = sorted((name, value) for name, value in query.items() if name != 'apiKey')
+    return f"{path}?{urlencode(params)}" if params else path
+
+
+class Recordings:
+    """
+        Recorded answers, one JSON file per endpoint mapping recording keys to answers.
+
+        An answer is {"status": ..., "content_type": ..., "body": ...}, with "body_base64"
+        instead of "body" for images.
+
+        Parameters:
+            directory (Path): The directory of the recording files.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.answers: Dict[str, Dict[str, dict]] = {}
+        for path in sorted(self.directory.glob('*.json')):
+            with open(path, 'r', encoding='utf-8') as file:
+                self.answers[path.stem] = json.load(file)
+
+    def find(self, name: str, key: str) -> Tuple[Optional[dict], bool]:
+        """
+        Get the recorded answer of a request.
+
+        Parameters:
+            name (str): The endpoint.
+            key (str): The recording key of the request.
+
+        Returns:
+            Tuple[Optional[dict], bool]: The answer, the first recording of the endpoint if
+                there is no exact one, or None if there is none at all; and whether it is exact.
+        """
+        answers = self.answers.get(name, {})
+        if key in answers:
+            return answers[key], True
+        return next(iter(answers.values()), None), False
+
+    def add(self, name: str, key: str, answer: dict) -> None:
+        """
+        Record an answer and write the recordings of its endpoint.
+
+        Parameters:
+            name (str): The endpoint.
+            key (str): The recording key of the request.
+            answer (dict): The answer.
+        """
+        self.answers.setdefault(name, {})[key] = answer
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / f"{name}.json", 'w', encoding='utf-8') as file:
+            json.dump(self.answers[name], file, indent=2)
+            file.write('\n')
+
+
+def body_of(answer: dict) -> bytes:
+    if 'body_base64' in answer:
+        return base64.b64decode(answer['body_base64'])
+    return answer['body'].encode('utf-8')
+
+
+def with_id(recipe: dict, recipe_id: int) -> dict:
+    return {**recipe, 'id': recipe_id}
+
+
+class Injection:
+    """
+        Latency, errors and quota injected into the answers of the stand-in.
+
+        Parameters:
+            latency (float): The base delay of every answer in seconds.
+            jitter (float): A random extra delay of up to this many seconds.
+            slow_rate (float): The share of answers delayed by slow_latency instead, the tail.
+            slow_latency (float): The delay of slow answers in seconds.
+            error_rate (float): The share of requests answered with error_status.
+            error_status (int): The status of injected errors; 429 comes with Retry-After.
+            quota (Optional[float]): The daily quota points, one per request; unlimited if None.
+            seed (Optional[int]): Seeds the random choices, so runs can be repeated.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, slow_rate: float = 0.0, slow_latency: float = 1.0,
+                 error_rate: float = 0.0, error_status: int = 503, quota: Optional[float] = None,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.quota = quota
+        self.quota_used = 0.0
+        self.random = random.Random(seed)
+
+    def delay(self) -> float:
+        if self.random.random() < self.slow_rate:
+            return self.slow_latency
+        return self.latency + self.random.uniform(0, self.jitter)
+
+    def error(self) -> Optional[web.Response]:
+        # an injected error or an exhausted quota, None to answer normally
+        if self.quota is not None and self.quota_used >= self.quota:
+            return failure(402, "Your daily points limit has been reached.", self.quota_headers())
+        if self.random.random() < self.error_rate:
+            headers = {'Retry-After': '1'} if self.error_status == 429 else {}
+            return failure(self.error_status, "Injected error.", headers)
+        return None
+
+    def charge(self) -> Dict[str, str]:
+        self.quota_used += 1
+        return self.quota_headers()
+
+    def quota_headers(self) -> Dict[str, str]:
+        if self.quota is None:
+            return {}
+        return {'X-API-Quota-Request': '1', 'X-API-Quota-Used': f"{self.quota_used:g}",
+                'X-API-Quota-Left': f"{max(0.0, self.quota - self.quota_used):g}"}
+
+
+def failure(status: int, message: str, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    return web.json_response({'status': 'failure', 'code': status, 'message': message}, status=status, headers=headers)
+
+
+def replay(recordings: Recordings, name: str, recipe_id: Optional[int], key: str, query: Dict[str, str],
+           rng: random.Random) -> web.Response:
+    """
+    Build the answer of a request from the recordings.
+
+    Parameters:
+        recordings (Recordings): The recordings.
+        name (str): The endpoint.
+        recipe_id (Optional[int]): The recipe ID in the path.
+        key (str): The recording key of the request.
+        query (Dict[str, str]): The query parameters.
+        rng (random.Random): Picks the random recipes.
+
+    Returns:
+        web.Response: The answer, 404 if the endpoint has no recordings.
+    """
+    if name == 'informationBulk':
+        # assembled from the information recordings, each recipe answered like its own information request
+        recipes = []
+        for meal_id in (int(value) for value in query.get('ids', '').split(',') if value.strip().isdigit()):
+            answer, _ = recordings.find('information', f'/recipes/{meal_id}/information')
+            if answer is not None:
+                recipes.append(with_id(json.loads(body_of(answer)), meal_id))
+        return web.json_response(recipes)
+
+    answer, exact = recordings.find(name, key)
+    if answer is None:
+        return failure(404, f"No recordings of {name}.")
+    body = body_of(answer)
+    if not exact and name == 'information':
+        body = json.dumps(with_id(json.loads(body), recipe_id)).encode('utf-8')
+    elif not exact and name == 'complexSearch':
+        # the recorded results within the calorie range that was asked for
+        data = json.loads(body)
+        low, high = float(query.get('minCalories', 0)), float(query.get('maxCalories', 'inf'))
+        results = [result for result in data['results'] if low <= calories(result) <= high]
+        data.update(results=results[:int(query.get('number', 10))], totalResults=len(results))
+        body = json.dumps(data).encode('utf-8')
+    elif name == 'random':
+        # as many recipes as were asked for, from a random start; repeated recipes get their own IDs
+        recipes = json.loads(body)['recipes']
+        start = rng.randrange(len(recipes))
+        batch = []
+        for index in range(start, start + int(query.get('number', 1))):
+            recipe = recipes[index % len(recipes)]
+            batch.append(with_id(recipe, recipe['id'] + index // len(recipes) * REPEAT_ID_STRIDE))
+        body = json.dumps({'recipes': batch}).encode('utf-8')
+    return web.Response(body=body, status=answer['status'], content_type=answer['content_type'])
+
+
+async def forward(request: web.Request, upstream: str, recordings: Recordings, name: str, key: str) -> web.Response:
+    """
+    Forward a request to the real API and record a successful answer.
+
+    Parameters:
+        request (web.Request): The request.
+        upstream (str): The base URL of the real API.
+        recordings (Recordings): Where the answer is recorded.
+        name (str): The endpoint of the request.
+        key (str): The recording key of the request.
+
+    Returns:
+        web.Response: The answer of the real API.
+    """
+    async with request.app[SESSION].get(f"{upstream}{request.path}", params=request.query) as response:
+        body = await response.read()
+        content_type = response.content_type
+        if response.status == 200:
+            answer = {'status': 200, 'content_type': content_type}
+            if content_type.startswith('image/'):
+                answer['body_base64'] = base64.b64encode(body).decode('ascii')
+            else:
+                answer['body'] = body.decode('utf-8')
+            recordings.add(name, key, answer)
+        return web.Response(body=body, status=response.status, content_type=content_type)
+
+
+def make_app(recordings_dir: Path = RECORDINGS_DIR, injection: Optional[Injection] = None,
+             record: bool = False, upstream: str = UPSTREAM) -> web.Application:
+    """
+    Create the stand-in application.
+
+    Parameters:
+        recordings_dir (Path): The directory of the recordings.
+        injection (Optional[Injection]): The latency, errors and quota to inject, none if None.
+        record (bool): Whether to forward requests to upstream and record the answers instead of replaying.
+        upstream (str): The base URL of the real API in record mode.
+
+    Returns:
+        web.Application: The application; its STATS count the requests per endpoint and the injected errors.
+    """
+    recordings = Recordings(recordings_dir)
+    injection = injection or Injection()
+    stand_in = web.Application()
+    stand_in[STATS] = {'requests': 0, 'errors': 0, 'endpoints': {}}
+
+    async def handle(request: web.Request) -> web.Response:
+        stats = request.app[STATS]
+        stats['requests'] += 1
+        name, recipe_id = endpoint(request.path)
+        if name is None:
+            return failure(404, f"Unknown endpoint {request.path}.")
+        stats['endpoints'][name] = stats['endpoints'].get(name, 0) + 1
+
+        await asyncio.sleep(injection.delay())
+        error = injection.error()
+        if error is not None:
+            stats['errors'] += 1
+            return error
+
+        query = dict(request.query)
+        key = recording_key(request.path, query)
+        if record:
+            response = await forward(request, upstream, recordings, name, key)
+        else:
+            response = replay(recordings, name, recipe_id, key, query, injection.random)
+        response.headers.update(injection.charge())
+        return response
+
+    async def session(app: web.Application):
+        app[SESSION] = ClientSession()
+        yield
+        await app[SESSION].close()
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(request.app[STATS])
+
+    if record:
+        stand_in.cleanup_ctx.append(session)
+    stand_in.router.add_get('/_stub/stats', get_stats)
+    stand_in.router.add_get('/{path:.*}', handle)
+    return stand_in
+
+
+def serve_in_thread(stand_in: web.Application, port: int = 0) -> Tuple[str, Callable[[], None]]:
+    """
+    Serve the stand-in on its own event loop thread, e.g. from tests and benchmarks.
+
+    Parameters:
+        stand_in (web.Application): The application, see make_app.
+        port (int): The port, any free one if 0.
+
+    Returns:
+        Tuple[str, Callable[[], None]]: The base URL and a function that stops the server.
+    """
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(stand_in, access_log=None)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port, backlog=1024).start())
+    thread = threading.Thread(target=loop.run_forever, name='spoonacular-stub', daemon=True)
+    thread.start()
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    return f"http://127.0.0.1:{runner.addresses[0][1]}", stop
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=5050, help="port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="base delay of every answer in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra delay of up to this many seconds")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="share of answers delayed by --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="delay of slow answers in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503, help="status of injected errors")
+    parser.add_argument("--quota", type=float, default=None, help="daily quota points, one per request")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the injected delays and errors")
+    parser.add_argument("--recordings", type=Path, default=RECORDINGS_DIR, help="directory of the recordings")
+    parser.add_argument("--record", action="store_true", help="forward requests to --upstream and record the answers")
+    parser.add_argument("--upstream", default=UPSTREAM, help="base URL of the real API in record mode")
+    args = parser.parse_args()
+
+    injection = Injection(args.latency, args.jitter, args.slow_rate, args.slow_latency,
+                          args.error_rate, args.error_status, args.quota, args.seed)
+    web.run_app(make_app(args.recordings, injection, args.record, args.upstream), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import pytest
+import asyncio
+import json
+import time
+from context import app
+import asgi
+from feast_finder import Histogram, SearchCache, TTLCache
+from feast_finder.async_upstream import UpstreamResponse
+
+"""
+Test suite for the ASGI entry point: the async Spoonacular proxy routes and the
+fallback to the Flask app.
+"""
+
+
+async def call(path: str, query: str = "") -> tuple:
+    """
+    Send one GET request through the ASGI application and collect the response.
+    """
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+             "headers": [], "http_version": "1.1", "scheme": "http", "root_path": "",
+             "server": ("testserver", 80), "client": ("127.0.0.1", 1234)}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi.application(scope, receive, send)
+    status = messages[0]["status"]
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return status, body
+
+
+@pytest.fixture
+def upstream_calls(monkeypatch) -> list:
+    """
+    Replace the async upstream client with a stub that answers after 0.2 s and records its calls.
+    """
+    calls = []
+
+    async def get(url, params=None, timeout=None, priority=None):
+        calls.append((url, params))
+        await asyncio.sleep(0.2)
+        if url.endswith("/information"):
+            meal_id = int(url.split("/")[-2])
+            return UpstreamResponse(200, {}, json.dumps({"id": meal_id, "title": f"Recipe {meal_id}"}).encode())
+        if url.endswith("/complexSearch"):
+            return UpstreamResponse(200, {}, json.dumps({"results": [], "totalResults": 0}).encode())
+        return UpstreamResponse(500, {}, b"")
+
+    monkeypatch.setattr(asgi.upstream, "get", get)
+    monkeypatch.setattr(app, "recipe_info_cache", TTLCache())
+    monkeypatch.setattr(app, "search_cache", SearchCache())
+    monkeypatch.setattr(app, "price_breakdown_cache", TTLCache())
+    return calls
+
+
+def test_async_routes_run_concurrently(upstream_calls: list) -> None:
+    """
+    Test that many proxy requests wait for Spoonacular side by side on one event loop.
+    """
+    async def run():
+        return await asyncio.gather(*(call(f"/api/recipe/info/{meal_id}") for meal_id in range(100)))
+
+    start = time.perf_counter()
+    responses = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert [status for status, _ in responses] == [200] * 100
+    assert json.loads(responses[7][1]) == {"id": 7, "title": "Recipe 7"}
+    assert len(upstream_calls) == 100
+    assert elapsed < 1.5
+
+
+def test_async_routes_share_cache_and_collapse_misses(upstream_calls: list) -> None:
+    """
+    Test that concurrent requests for one recipe make one upstream call, whose result the
+    Flask routes then serve from the shared cache.
+    """
+    async def run():
+        return await asyncio.gather(call("/api/recipe/5"), call("/api/recipe/info/5"), call("/api/recipe/card/5"))
+
+    responses = asyncio.run(run())
+
+    assert [status for status, _ in responses] == [200, 200, 200]
+    assert json.loads(responses[2][1]) == {"information": {"id": 5, "title": "Recipe 5"}, "price_breakdown": None}
+    assert [url for url, _ in upstream_calls].count("https://api.spoonacular.com/recipes/5/information") == 1
+    assert app.test_client().get("/api/recipe/info/5").get_json()["title"] == "Recipe 5"
+
+
+def test_async_meals_route_passes_parameters(upstream_calls: list) -> None:
+    """
+    Test that the async meals route forwards the query like the Flask route does.
+    """
+    status, body = asyncio.run(call("/api/meals", "query=pasta&minCalories=100&maxCalories=abc"))
+
+    assert status == 200
+    url, params = upstream_calls[0]
+    assert url == "https://api.spoonacular.com/recipes/complexSearch"
+    assert params["query"] == "pasta" and params["minCalories"] == 100
+    assert "maxCalories" not in params
+
+
+def test_async_route_reports_upstream_errors(upstream_calls: list) -> None:
+    """
+    Test that failed upstream calls give the same error responses as the Flask routes.
+    """
+    status, body = asyncio.run(call("/api/price_breakdown/9"))
+
+    assert status == 500
+    assert json.loads(body) == {"error": "Failed to fetch price breakdown widget"}
+
+
+def test_other_routes_fall_back_to_flask() -> None:
+    """
+    Test that routes without an async handler are served by the Flask app.
+    """
+    status, body = asyncio.run(call("/health"))
+
+    assert status == 200
+    assert body == b"OK"
+
+
+def test_async_routes_are_timed_like_flask_routes(upstream_calls: list, monkeypatch) -> None:
+    """
+    Test that async proxy requests are recorded under the rules of the Flask routes, with their upstream time,
+    and that /metrics lists the async client.
+    """
+    for name in ("request_seconds", "request_upstream_seconds", "request_local_seconds", "upstream_seconds"):
+        old = getattr(app, name)
+        monkeypatch.setattr(app, name, Histogram(old.name, old.documentation, old.labelnames, old.buckets))
+
+    async def run():
+        return await asyncio.gather(call("/api/recipe/info/5"), call("/api/recipe/card/6"), call("/api/price_breakdown/7"))
+
+    asyncio.run(run())
+
+    assert app.request_seconds.snapshot("/api/recipe/info/<int:meal_id>", "GET", "200")[0][-1] == 1
+    assert app.request_seconds.snapshot("/api/price_breakdown/<int:meal_id>", "GET", "500")[0][-1] == 1
+    assert app.request_upstream_seconds.snapshot("/api/recipe/card/<int:meal_id>")[1] >= 0.35  # <- two 0.2 s calls
+    assert app.upstream_seconds.snapshot("recipe_info")[0][-1] == 2
+    assert app.upstream_seconds.snapshot("price_breakdown")[0][-1] == 2
+    text = app.test_client().get("/metrics").get_data(as_text=True)
+    assert ('feastfinder_request_duration_seconds_count'
+            '{route="/api/recipe/card/<int:meal_id>",method="GET",status="200"} 1') in text
+    assert 'feastfinder_upstream_calls_total{client="async",outcome="requests"}' in text
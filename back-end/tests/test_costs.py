@@ -0,0 +1,208 @@
+import math
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from context import app
+from feast_finder import PriceBreakdown, QuotaScheduler, TTLCache, summarize_costs
+from feast_finder.pricebreakdown import parse_cost
+
+"""
+Test suite for the cost analytics over price breakdowns: parsing the displayed
+prices, the vectorized summary and the /api/costs endpoint.
+"""
+
+
+def widget(rows: dict, per_serving: str = None) -> str:
+    ingredients = "".join(f"<div>{ingredient}</div>" for ingredient in rows)
+    prices = "".join(f"<div>{price}</div>" for price in rows.values())
+    html = (f'<div id="spoonacularPriceBreakdownTable"><div style="float:left;max-width:80%">{ingredients}</div>'
+            f'<div style="text-align:right;display:inline-block;float:left;padding-left:1em">{prices}</div></div>')
+    return html + (f"<div>Cost per Serving: {per_serving}</div>" if per_serving else "")
+
+
+def breakdown(rows: dict, per_serving: str = None) -> PriceBreakdown:
+    return PriceBreakdown.from_html(widget(rows, per_serving))
+
+
+def make_response(status_code: int, text: str = "") -> MagicMock:
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {}
+    response.text = text
+    return response
+
+
+def test_parse_cost() -> None:
+    """
+    Test that displayed prices are read as dollars and anything else as NaN.
+    """
+    assert parse_cost("$1.23") == 1.23
+    assert parse_cost(" $1,234.50 ") == 1234.5
+    assert math.isnan(parse_cost("n/a"))
+
+
+def test_breakdown_costs_are_aligned_with_ingredients() -> None:
+    """
+    Test that total rows and unreadable prices get NaN costs and are left out of the total.
+    """
+    parsed = breakdown({"Pasta": "$1.20", "Basil": "?", "Total": "$9.99"}, per_serving="$0.60")
+
+    assert parsed.costs.tolist()[0] == 1.2
+    assert math.isnan(parsed.costs[1]) and math.isnan(parsed.costs[2])
+    assert parsed.total == 1.2
+    assert parsed.to_table() == [["Pasta", "Basil", "Total"], ["$1.20", "?", "$9.99"]]
+    assert parsed.to_dict() == {"ingredients": ["Pasta", "Basil", "Total"], "prices": ["$1.20", "?", "$9.99"],
+                                "costs": [1.2, None, None], "total": 1.2, "per_serving": 0.6}
+
+
+def test_summarize_costs() -> None:
+    """
+    Test the totals, servings and cheapest and most expensive ingredients per recipe and over all recipes.
+    """
+    breakdowns = {
+        1: breakdown({"Pasta": "$1.00", "Cheese": "$3.00", "Salt": "$0.05"}, per_serving="$1.01"),
+        2: breakdown({"Rice": "$0.80", "Beans": "$1.20"}, per_serving="$1.00"),
+        3: breakdown({"Water": "free"}),
+    }
+
+    summary = summarize_costs(breakdowns, top=2)
+
+    assert summary["meals"][1] == {"total": 4.05, "per_serving": 1.01, "servings": 4,
+                                   "cheapest": {"meal_id": 1, "ingredient": "Salt", "cost": 0.05},
+                                   "most_expensive": {"meal_id": 1, "ingredient": "Cheese", "cost": 3.0}}
+    assert summary["meals"][2]["servings"] == 2
+    assert summary["meals"][2]["cheapest"]["ingredient"] == "Rice"
+    assert summary["meals"][3] == {"total": None, "per_serving": None, "servings": None,
+                                   "cheapest": None, "most_expensive": None}
+    assert list(summary["meals"]) == [1, 2, 3]
+    assert summary["total"] == 6.05
+    assert summary["average_per_serving"] == 1.0  # <- of the recipes that show one
+    assert [row["ingredient"] for row in summary["cheapest"]] == ["Salt", "Rice"]
+    assert [row["ingredient"] for row in summary["most_expensive"]] == ["Cheese", "Beans"]
+
+
+def test_summarize_no_costs() -> None:
+    """
+    Test that an empty list gives an empty summary instead of failing.
+    """
+    assert summarize_costs({}) == {"meals": {}, "total": None, "average_per_serving": None,
+                                   "cheapest": [], "most_expensive": []}
+
+
+@pytest.fixture
+def costs_client(monkeypatch):
+    monkeypatch.setattr(app.upstream, "scheduler", QuotaScheduler())
+    monkeypatch.setattr(app, "price_breakdown_cache", TTLCache())
+    return app.test_client()
+
+
+@patch('requests.Session.get')
+def test_costs_route_uses_cached_breakdowns(mock_get, costs_client) -> None:
+    """
+    Test that /api/costs fetches the breakdowns it does not have at background priority, once,
+    and lists the recipes without one as missing.
+    """
+    def get(url, **kwargs):
+        meal_id = int(url.split("/")[-2])
+        if meal_id == 3:
+            return make_response(404)
+        return make_response(200, widget({f"Ingredient {meal_id}": f"${meal_id}.00"}, per_serving=f"${meal_id}.00"))
+
+    mock_get.side_effect = get
+
+    first = costs_client.get("/api/costs?ids=1,2,3,2&top=1").get_json()
+    second = costs_client.get("/api/costs?ids=2,1").get_json()
+
+    assert first["total"] == 3.0 and first["missing"] == [3]
+    assert first["meals"]["2"]["most_expensive"] == {"meal_id": 2, "ingredient": "Ingredient 2", "cost": 2.0}
+    assert first["most_expensive"] == [{"meal_id": 2, "ingredient": "Ingredient 2", "cost": 2.0}]
+    assert set(second["meals"]) == {"1", "2"} and second["missing"] == []
+    assert mock_get.call_count == 3  # <- 1 and 2 were cached by the first request
+    assert app.upstream.scheduler.stats()["priorities"]["background"]["granted"] == 3
+
+
+@patch('requests.Session.get')
+def test_costs_route_defaults_to_favorites(mock_get, costs_client, monkeypatch) -> None:
+    """
+    Test that without ids the Spoonacular recipes among the favorites are costed.
+    """
+    mock_get.return_value = make_response(200, widget({"Pasta": "$2.50"}))
+    monkeypatch.setattr(app.feast_finder, "get_favorite_recipes", lambda: {"716429": None, "_42": None})
+
+    data = costs_client.get("/api/costs").get_json()
+
+    assert list(data["meals"]) == ["716429"]
+    assert data["total"] == 2.5
+    mock_get.assert_called_once()
+
+
+@patch('requests.Session.get')
+def test_costs_route_accepts_favorites_with_int_ids(mock_get, costs_client, monkeypatch) -> None:
+    """
+    Test that favorites keyed by int, as imported files may hold them, are costed instead of failing.
+    """
+    mock_get.return_value = make_response(200, widget({"Pasta": "$2.50"}))
+    monkeypatch.setattr(app.feast_finder, "get_favorite_recipes", lambda: {716429: None, "715538": None, "_42": None})
+
+    response = costs_client.get("/api/costs")
+
+    assert response.status_code == 200
+    assert set(response.get_json()["meals"]) == {"716429", "715538"}
+
+
+@pytest.mark.parametrize("query", ["ids=1,x", "ids=" + ",".join(map(str, range(1001))), "top=100"])
+def test_costs_route_rejects_bad_requests(query: str, costs_client) -> None:
+    """
+    Test that malformed or too large cost requests are rejected before any upstream call.
+    """
+    response = costs_client.get(f"/api/costs?{query}")
+
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@patch('requests.Session.get')
+def test_price_breakdown_costs_format(mock_get, costs_client) -> None:
+    """
+    Test that format=costs adds the numbers to a price breakdown and the default stays the displayed table.
+    """
+    mock_get.return_value = make_response(200, widget({"Pasta": "$1.20", "Basil": "$0.30"}, per_serving="$0.75"))
+
+    assert costs_client.get("/api/price_breakdown/5").get_json() == [["Pasta", "Basil"], ["$1.20", "$0.30"]]
+    assert costs_client.get("/api/price_breakdown/5?format=costs").get_json() == {
+        "ingredients": ["Pasta", "Basil"], "prices": ["$1.20", "$0.30"], "costs": [1.2, 0.3],
+        "total": 1.5, "per_serving": 0.75}
+    assert costs_client.get("/api/price_breakdown/5?format=xml").status_code == 400
+    mock_get.assert_called_once()
+
+
+@patch('requests.Session.get')
+def test_cold_costs_request_does_not_hold_up_recipe_cards(mock_get, costs_client, monkeypatch) -> None:
+    """
+    Test that the widget fetches of a cold /api/costs call run on their own pool, so a recipe card
+    requested at the same time is answered without waiting for them.
+    """
+    release = threading.Event()
+
+    def get(url, **kwargs):
+        if int(url.split("/")[-2]) >= 1000:
+            release.wait(5)  # <- the widgets of the cost analysis are slow
+        response = make_response(200, widget({"Pasta": "$1.00"}))
+        response.json.return_value = {"id": 7, "title": "Pasta"}
+        return response
+
+    mock_get.side_effect = get
+    monkeypatch.setattr(app.upstream, "scheduler", QuotaScheduler(rate=1000, burst=1000))
+    monkeypatch.setattr(app, "recipe_info_cache", TTLCache())
+    costs = threading.Thread(target=lambda: costs_client.get("/api/costs?ids=" + ",".join(map(str, range(1000, 1100)))))
+    costs.start()
+    try:
+        time.sleep(0.1)
+        start = time.monotonic()
+        card = app.test_client().get("/api/recipe/card/7")
+        assert card.status_code == 200 and card.get_json()["price_breakdown"] == [["Pasta"], ["$1.00"]]
+        assert time.monotonic() - start < 1
+    finally:
+        release.set()
+        costs.join()
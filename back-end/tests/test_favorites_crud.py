@@ -1,9 +1,12 @@
 import pytest
+import io
 import os
 import json
 from pathlib import Path
 from typing import Any, Dict
 from context import app, Feast_Finder, Recipe, check_recipe_fields
+from feast_finder import SearchCache, TTLCache, iter_json_array
+from feast_finder import bulk
 from flask.testing import FlaskClient
 from unittest.mock import patch, MagicMock
 
@@ -21,20 +24,29 @@ Test suite for verifying custom recipe creation and modification functionalities
 #                                                                             #
 ###############################################################################
 
-@pytest.fixture
-def client_fixture():
+TEST_FILES = ("test_favrecipes.json", "test_favrecipes.json.log",
+              "test_favrecipes.sqlite3", "test_favrecipes.sqlite3-wal", "test_favrecipes.sqlite3-shm",
+              "test_favrecipes.data", "test_favrecipes.idx")
+
+
+@pytest.fixture(params=["json", "sqlite", "lazy"])
+def client_fixture(request):
     """
-    Set up testing mode for the Flask app.
+    Set up testing mode for the Flask app, once for every storage backend.
     """
     # prepare a temporary test file and a fresh instance of FavRecipes before each test
     test_file = "test_favrecipes.json"
 
-    # remove any pre-existing test file so we start with a clean slate
-    if os.path.exists(test_file):
-        os.remove(test_file)
+    # remove any pre-existing test files so we start with a clean slate
+    for path in TEST_FILES:
+        if os.path.exists(path):
+            os.remove(path)
 
     # override the app's FavRecipes instance to use our test file
-    app.feast_finder = Feast_Finder(test_file)
+    app.feast_finder = Feast_Finder(test_file, storage=request.param)
+    # and start with no cached Spoonacular searches
+    app.search_cache = SearchCache()
+    app.price_breakdown_cache = TTLCache()
 
     # init the testing client
     app.config['TESTING'] = True
@@ -42,9 +54,11 @@ def client_fixture():
 
     yield client
 
-    # clean up the temporary test file after each test
-    if os.path.exists(test_file):
-        os.remove(test_file)
+    # clean up the temporary test files after each test
+    app.feast_finder.close()
+    for path in TEST_FILES:
+        if os.path.exists(path):
+            os.remove(path)
 
 
 ###############################################################################
@@ -70,7 +84,7 @@ def test_create_recipe_success(client_fixture):
     # send a request to create the new recipe
     response = client_fixture.post(
         "/feastFinder/recipe/", 
-        json=recipe.__dict__,
+        json=recipe.to_dict(),
         headers={'Content-Type': 'application/json'}
     )
     assert response.status_code == 201  # <- created
@@ -99,7 +113,7 @@ def test_create_recipe_with_existing_list(client_fixture):
 
     # write the pre-existing recipe to the file
     with open("test_favrecipes.json", "w") as file:
-        json.dump({recipe.recipe_id : recipe.__dict__}, file, indent=4)
+        json.dump({recipe.recipe_id: recipe.to_dict()}, file, indent=4)
     
     # reload the recipes from the file
     app.feast_finder.load_recipes()
@@ -112,9 +126,9 @@ def test_create_recipe_with_existing_list(client_fixture):
 
     new_recipe = Recipe("Vegan Salad", "Mix all greens and add dressing", "Lettuce, Spinach, Cucumber, Dressing", "http://example.com/vegansalad.jpg", id="9876")
     # send create request for the new recipe
-    response = client_fixture.post(CREATE_RECIPE_ENDPOINT, 
-                                json=new_recipe.__dict__, 
-                                headers={'Content-Type': 'application/json'})
+    response = client_fixture.post(CREATE_RECIPE_ENDPOINT,
+                                   json=new_recipe.to_dict(),
+                                   headers={'Content-Type': 'application/json'})
     
     assert response.status_code == 201  # <- created
 
@@ -138,7 +152,7 @@ def test_create_duplicate_recipe(client_fixture: FlaskClient) -> None:
     recipe = Recipe("Tiramisu", "Mix ingredients, layer, chill", "Coffee, Mascarpone, Ladyfingers", "http://example.com/image.jpg", id="7777")
     response = client_fixture.post(
         CREATE_RECIPE_ENDPOINT,
-        json=recipe.__dict__,
+        json=recipe.to_dict(),
         headers={'Content-Type': 'application/json'}
     )
     assert response.status_code == 201  # created
@@ -147,7 +161,7 @@ def test_create_duplicate_recipe(client_fixture: FlaskClient) -> None:
     duplicate_recipe = Recipe("Different Recipe", "Different instructions", "Different ingredients", "http://example.com/diff.jpg", id="7777")
     response_duplicate = client_fixture.post(
         CREATE_RECIPE_ENDPOINT,
-        json=duplicate_recipe.__dict__,
+        json=duplicate_recipe.to_dict(),
         headers={'Content-Type': 'application/json'}
     )
     
@@ -178,7 +192,7 @@ def test_update_recipe_success(client_fixture: FlaskClient) -> None:
     recipe = Recipe("Pancakes", "Mix flour, eggs, milk", "Flour, Eggs, Milk", "http://example.com/pancakes.jpg", id="8888")
     response = client_fixture.post(
         CREATE_RECIPE_ENDPOINT,
-        json=recipe.__dict__,
+        json=recipe.to_dict(),
         headers={'Content-Type': 'application/json'}
     )
     assert response.status_code == 201  # created
@@ -238,7 +252,7 @@ def test_delete_recipe(client_fixture: FlaskClient) -> None:
 
     response = client_fixture.post(
         CREATE_RECIPE_ENDPOINT,
-        json=recipe.__dict__,
+        json=recipe.to_dict(),
         headers={'Content-Type': 'application/json'}
     )
     assert response.status_code == 201  # created
@@ -269,6 +283,237 @@ def test_delete_nonexistent_recipe(client_fixture: FlaskClient) -> None:
     assert del_response.get_json().get("error") == "Recipe with this title does not exist"
 
 
+###############################################################################
+#                                                                             #
+#                   BULK IMPORT AND EXPORT TESTS                              #
+#                                                                             #
+###############################################################################
+
+
+def test_bulk_import_json_array(client_fixture: FlaskClient) -> None:
+    """
+    Test importing a JSON array: valid recipes are added (duplicate IDs get a new one),
+    invalid items are reported by position.
+
+    Args:
+        client_fixture: Flask test client
+    """
+
+    items = [
+        Recipe("Waffles", "Mix and bake", "Flour, Eggs", "", id="2001").to_dict(),
+        {"title": "No Ingredients", "instructions": "Nothing"},
+        Recipe("Other Waffles", "Mix and bake again", "Flour, Milk", "", id="2001").to_dict(),
+        "not a recipe",
+    ]
+    response = client_fixture.post("/feastFinder/recipes/favorites/import", json=items)
+    assert response.status_code == 200  # ok
+    data = response.get_json()
+    assert data["imported"] == 2
+    assert data["errors"] == [
+        {"index": 1, "error": ["ingredients is required"]},
+        {"index": 3, "error": ["item must be a JSON object"]},
+    ]
+
+    recipes = client_fixture.get(FAVORITE_RECIPES_ENDPOINT).get_json()
+    assert len(recipes) == 2
+    assert recipes["2001"]["title"] == "Waffles"
+
+
+@pytest.mark.parametrize("body, message", [
+    (b"[1 2, 3]", "expected ',' or ']' after element 0"),
+    (b"[1, 2,, 3]", "expected element 2 of the JSON array, found ,"),
+    (b"[1, 2, 3,]", "expected element 3 of the JSON array, found ]"),
+    (b"[1, {broken}, 3]", "invalid JSON in element 1"),
+    (b"[1, 2", "expected ',' or ']' after element 1 of the JSON array, found the end"),
+    (b'{"title": "Soup"}', "expected a JSON array"),
+])
+def test_json_array_parser_rejects_malformed_arrays(body: bytes, message: str) -> None:
+    """
+    Test that the array parser stops at the first malformed separator or element and names its position.
+    """
+    parsed = []
+    with pytest.raises(ValueError, match=message):
+        for value in iter_json_array(io.BytesIO(body)):
+            parsed.append(value)
+    assert parsed == [1, 2, 3][:len(parsed)]
+
+
+def test_json_array_parser_reads_across_chunks(monkeypatch) -> None:
+    """
+    Test that numbers and strings split by a chunk boundary are read whole, and a syntax error
+    is found without reading the rest of the stream.
+    """
+    monkeypatch.setattr(bulk, "CHUNK_SIZE", 4)
+    body = b'[ 12.5e1 , "' + b"x" * 10 + b'", [], {"a": true} ]'
+    assert list(iter_json_array(io.BytesIO(body))) == [125.0, "x" * 10, [], {"a": True}]
+
+    stream = io.BytesIO(b"[1, {broken}, " + b"2, " * 1000 + b"3]")
+    with pytest.raises(ValueError, match="element 1"):
+        list(iter_json_array(stream))
+    assert stream.tell() < 40
+
+
+def test_bulk_import_reports_malformed_array(client_fixture: FlaskClient) -> None:
+    """
+    Test that a malformed JSON array is reported at the element where it broke, keeping the recipes before it.
+
+    Args:
+        client_fixture: Flask test client
+    """
+
+    recipe = json.dumps(Recipe("Waffles", "Mix and bake", "Flour, Eggs", "", id="2001").to_dict())
+    response = client_fixture.post("/feastFinder/recipes/favorites/import", data=f"[{recipe} {recipe}]",
+                                   content_type="application/json")
+    data = response.get_json()
+    assert data["imported"] == 1
+    assert data["errors"] == [{"index": 1, "error": ["expected ',' or ']' after element 0 of the JSON array, found {"]}]
+    assert list(client_fixture.get(FAVORITE_RECIPES_ENDPOINT).get_json()) == ["2001"]
+
+
+def test_bulk_import_ndjson_and_export(client_fixture: FlaskClient) -> None:
+    """
+    Test importing NDJSON and exporting the favorites as NDJSON and as a JSON array.
+
+    Args:
+        client_fixture: Flask test client
+    """
+
+    lines = [json.dumps(Recipe(f"Recipe {i}", "Cook", "Salt", "", id=f"30{i}").to_dict()) for i in range(3)]
+    body = "\n".join(lines[:2] + ["{broken"] + lines[2:]) + "\n"
+    response = client_fixture.post("/feastFinder/recipes/favorites/import", data=body,
+                                   content_type="application/x-ndjson")
+    data = response.get_json()
+    assert data["imported"] == 3
+    assert [error["index"] for error in data["errors"]] == [2]
+
+    response = client_fixture.get("/feastFinder/recipes/favorites/export")
+    assert response.mimetype == "application/x-ndjson"
+    assert [json.loads(line)["recipe_id"] for line in response.data.decode().splitlines()] == ["300", "301", "302"]
+
+    response = client_fixture.get("/feastFinder/recipes/favorites/export?format=json")
+    assert [recipe["recipe_id"] for recipe in response.get_json()] == ["300", "301", "302"]
+
+
+###############################################################################
+#                                                                             #
+#                   FAVORITES PAGINATION AND STREAMING TESTS                  #
+#                                                                             #
+###############################################################################
+
+
+def test_favorites_pagination_is_stable_under_writes(client_fixture: FlaskClient) -> None:
+    """
+    Test that following the cursors of the favorites listing visits every recipe once,
+    even when recipes are added and deleted between pages.
+
+    Args:
+        client_fixture: Flask test client
+    """
+
+    for rid in ("1", "2", "3", "4", "5"):
+        client_fixture.post(CREATE_RECIPE_ENDPOINT, json=Recipe(f"Recipe {rid}", "Cook", "Salt", "", id=rid).to_dict())
+
+    response = client_fixture.get(f"{FAVORITE_RECIPES_ENDPOINT}?limit=2")
+    assert response.status_code == 200  # ok
+    page = response.get_json()
+    seen = list(page["recipes"])
+    assert seen == ["1", "2"]
+
+    # writes before and after the cursor do not shift the following pages
+    client_fixture.delete(FAVORITE_RECIPES_ENDPOINT, json={"recipe_id": "1"})
+    client_fixture.post(CREATE_RECIPE_ENDPOINT, json=Recipe("Recipe 0", "Cook", "Salt", "", id="0").to_dict())
+
+    while page["next_cursor"]:
+        page = client_fixture.get(f"{FAVORITE_RECIPES_ENDPOINT}?limit=2&cursor={page['next_cursor']}").get_json()
+        seen.extend(page["recipes"])
+    assert seen == ["1", "2", "3", "4", "5"]
+
+    response = client_fixture.get(f"{FAVORITE_RECIPES_ENDPOINT}?limit=2&cursor=bogus")
+    assert response.status_code == 400  # bad request
+
+
+def test_favorites_ndjson_stream(client_fixture: FlaskClient) -> None:
+    """
+    Test that format=ndjson streams one recipe per line.
+
+    Args:
+        client_fixture: Flask test client
+    """
+
+    make_sample_recipes(client_fixture)
+
+    response = client_fixture.get(f"{FAVORITE_RECIPES_ENDPOINT}?format=ndjson")
+    assert response.status_code == 200  # ok
+    assert response.mimetype == "application/x-ndjson"
+
+    lines = response.data.decode().splitlines()
+    recipes = [json.loads(line) for line in lines]
+    assert [recipe["recipe_id"] for recipe in recipes] == ["1001", "1002", "1003", "1004"]
+    assert recipes[3]["title"] == "Chocolate Cake"
+
+
+###############################################################################
+#                                                                             #
+#                   CONDITIONAL GET TESTS                                     #
+#                                                                             #
+###############################################################################
+
+
+def test_favorites_etag_and_not_modified(client_fixture: FlaskClient) -> None:
+    """
+    Test that the favorites list and single recipes carry an ETag, answer a matching
+    If-None-Match with 304, and get a new ETag once the data changes.
+
+    Args:
+        client_fixture: Flask test client
+    """
+
+    recipe = Recipe("Omelette", "Whisk eggs, fry", "Eggs, Butter", "http://example.com/omelette.jpg", id="5555")
+    client_fixture.post(CREATE_RECIPE_ENDPOINT, json=recipe.to_dict())
+
+    for url in (FAVORITE_RECIPES_ENDPOINT, f"{FAVORITE_RECIPES_ENDPOINT}5555"):
+        response = client_fixture.get(url)
+        assert response.status_code == 200  # ok
+        etag = response.headers["ETag"]
+        assert "5555" in response.get_json()
+
+        response = client_fixture.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 304  # not modified
+        assert response.data == b""
+
+        client_fixture.put(FAVORITE_RECIPES_ENDPOINT, json={"recipe_id": "5555", "instructions": f"Fry {url}"})
+
+        response = client_fixture.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200  # ok
+        assert response.headers["ETag"] != etag
+        assert response.get_json()["5555"]["instructions"] == f"Fry {url}"
+
+
+def test_recipe_payload_is_not_stale_after_concurrent_update(client_fixture: FlaskClient, monkeypatch) -> None:
+    """
+    Test that an update landing while a single recipe is read does not leave the old body cached
+    under the new version.
+
+    Args:
+        client_fixture: Flask test client
+    """
+
+    recipe = Recipe("Omelette", "Whisk eggs, fry", "Eggs, Butter", "http://example.com/omelette.jpg", id="5555")
+    client_fixture.post(CREATE_RECIPE_ENDPOINT, json=recipe.to_dict())
+    get_recipe = app.feast_finder.get_recipe
+
+    def get_recipe_then_update(recipe_id: str) -> Recipe:
+        found = get_recipe(recipe_id)
+        monkeypatch.setattr(app.feast_finder, "get_recipe", get_recipe)  # <- only the first read races
+        app.feast_finder.update_recipe(recipe_id, "Fry slowly")
+        return found
+
+    monkeypatch.setattr(app.feast_finder, "get_recipe", get_recipe_then_update)
+
+    assert client_fixture.get(f"{FAVORITE_RECIPES_ENDPOINT}5555").status_code == 200  # <- either body, as they raced
+    assert client_fixture.get(f"{FAVORITE_RECIPES_ENDPOINT}5555").get_json()["5555"]["instructions"] == "Fry slowly"
+
+
 ###############################################################################
 #                                                                             #
 #                   MANDATORY FAVORITES RECIPE FIELDS TESTS                   #
@@ -376,18 +621,18 @@ def make_sample_recipes(client_fixture: FlaskClient) -> None:
     for recipe in recipes:
         client_fixture.post(
             "/feastFinder/recipe/",
-            json=recipe.__dict__,
+            json=recipe.to_dict(),
             headers={'Content-Type': 'application/json'}
         )
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_get_meals_search(mock_get, client_fixture: FlaskClient) -> None:
     """
     Test the general search endpoint with mocked Spoonacular API response.
     
     Args:
-        mock_get: Mocked requests.get function
+        mock_get: Mocked requests.Session.get function
         client_fixture: Flask test client
     """
 
@@ -439,13 +684,13 @@ def test_get_meals_search(mock_get, client_fixture: FlaskClient) -> None:
     assert "apiKey" in params and params["apiKey"]  
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_get_meals_search_api_error(mock_get, client_fixture: FlaskClient) -> None:
     """
     Test the search endpoint handling API errors.
     
     Args:
-        mock_get: Mocked requests.get function
+        mock_get: Mocked requests.Session.get function
         client_fixture: Flask test client
     """
 
@@ -517,6 +762,73 @@ def test_search_favorite_recipes(client_fixture: FlaskClient) -> None:
     assert len(data) == 0
 
 
+def test_search_favorite_recipes_ranked(client_fixture: FlaskClient) -> None:
+    """
+    Test the ranked, paginated mode of the favorites search.
+
+    Args:
+        client_fixture: Flask test client
+    """
+
+    make_sample_recipes(client_fixture)
+
+    # title matches come first, and one result per page
+    response = client_fixture.get('/feastFinder/recipes/favorites/search?query=pasta&limit=1')
+    assert response.status_code == 200  # ok
+    data = response.get_json()
+    assert len(data["results"]) == 1
+    assert data["results"][0]["recipe"]["title"] in ("Pasta Carbonara", "Chicken Pasta")
+    assert data["next_cursor"]
+
+    response = client_fixture.get(f'/feastFinder/recipes/favorites/search?query=pasta&limit=1&cursor={data["next_cursor"]}')
+    second_page = response.get_json()
+    assert len(second_page["results"]) == 1
+    assert second_page["results"][0]["recipe"]["title"] != data["results"][0]["recipe"]["title"]
+
+    # typo tolerant
+    response = client_fixture.get('/feastFinder/recipes/favorites/search?query=chocolat&limit=5')
+    assert [r["recipe"]["title"] for r in response.get_json()["results"]] == ["Chocolate Cake"]
+
+    # bounded page size and invalid cursors
+    response = client_fixture.get('/feastFinder/recipes/favorites/search?query=pasta&limit=1000')
+    assert response.status_code == 400  # bad request
+    response = client_fixture.get('/feastFinder/recipes/favorites/search?query=pasta&cursor=bogus')
+    assert response.status_code == 400  # bad request
+
+
+def test_cookable_favorite_recipes(client_fixture: FlaskClient) -> None:
+    """
+    Test that favorites are ranked by the ingredients missing from those on hand, and follow later changes.
+
+    Args:
+        client_fixture: Flask test client
+    """
+
+    make_sample_recipes(client_fixture)
+
+    response = client_fixture.get('/feastFinder/recipes/favorites/cookable?have=pasta,2 eggs,parmesan cheese')
+    assert response.status_code == 200  # ok
+    data = response.get_json()
+    assert [(r["recipe"]["title"], r["missing"]) for r in data["results"]] == [
+        ("Pasta Carbonara", ["bacon", "cheese"]),  # <- "cheese" does not cover "parmesan cheese"
+        ("Chicken Pasta", ["chicken", "sauce"]),
+        ("Chocolate Cake", ["cocoa", "flour", "sugar"]),
+    ]
+    assert data["results"][0]["ingredients"] == 4 and data["results"][0]["on_hand"] == 2
+    assert data["by_missing"] == {"2": 2, "3": 1}
+
+    # the index follows new and deleted favorites
+    client_fixture.post("/feastFinder/recipe/", json={"title": "Egg Pasta", "instructions": "Boil",
+                                                      "ingredients": "pasta\neggs\nsalt", "recipe_id": "1005"})
+    client_fixture.delete("/feastFinder/recipes/favorites/", json={"recipe_id": "1001"})
+    response = client_fixture.get('/feastFinder/recipes/favorites/cookable?have=pasta,eggs&max_missing=0')
+    assert [r["recipe"]["title"] for r in response.get_json()["results"]] == ["Egg Pasta"]
+    response = client_fixture.get('/feastFinder/recipes/favorites/cookable?have=pasta,eggs&max_missing=0&staples=false')
+    assert response.get_json()["results"] == []
+
+    response = client_fixture.get('/feastFinder/recipes/favorites/cookable?have=pasta&limit=0')
+    assert response.status_code == 400  # bad request
+
 
 ###############################################################################
 #                                                                             #
@@ -525,13 +837,13 @@ def test_search_favorite_recipes(client_fixture: FlaskClient) -> None:
 ###############################################################################
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_get_price_breakdown(mock_get, client_fixture: FlaskClient) -> None:
     """
     Test the price breakdown endpoint with a mocked Spoonacular API response.
     
     Args:
-        mock_get: Mocked requests.get function
+        mock_get: Mocked requests.Session.get function
         client_fixture: Flask test client
     """
 
@@ -584,13 +896,13 @@ def test_get_price_breakdown(mock_get, client_fixture: FlaskClient) -> None:
     assert '123456/priceBreakdownWidget' in call_args
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_get_price_breakdown_api_error(mock_get, client_fixture: FlaskClient) -> None:
     """
     Test the price breakdown endpoint handling API errors.
     
     Args:
-        mock_get: Mocked requests.get function
+        mock_get: Mocked requests.Session.get function
         client_fixture: Flask test client
     """
 
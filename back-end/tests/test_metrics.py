@@ -0,0 +1,181 @@
+import json
+import os
+import pstats
+import re
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from context import app, Feast_Finder, Recipe
+from feast_finder import Histogram, QuotaScheduler, RequestProfiler, TTLCache
+from feast_finder.metrics import cache_metrics, render_metric
+
+"""
+Test suite for the latency histograms, the Prometheus /metrics endpoint and the
+opt-in request profiler.
+"""
+
+
+def make_response(status_code: int, payload: dict = None) -> MagicMock:
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {}
+    response.json.return_value = payload
+    response.text = ""
+    return response
+
+
+def sample(text: str, name: str, **labels: str) -> float:
+    # the value of one series in the text exposition format
+    wanted = ",".join(f'{label}="{value}"' for label, value in labels.items())
+    pattern = "^" + re.escape(name + ("{" + wanted + "}" if wanted else "")) + r" (\S+)$"
+    match = re.search(pattern, text, re.MULTILINE)
+    assert match is not None, f"no sample {name} {labels}"
+    return float(match.group(1))
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    """
+    Test that bucket bounds are inclusive, counts cumulative and series kept per label values.
+    """
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(seconds, "/a")
+    histogram.observe(0.2, 'say "hi"\n')
+
+    assert histogram.snapshot("/a") == ([2, 3, 4], 3.65)
+    assert histogram.snapshot("/b") is None
+    lines = histogram.render()
+    assert lines[:2] == ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{route="/a"} 4' in lines
+    assert 'latency_seconds_sum{route="say \\"hi\\"\\n"} 0.2' in lines
+
+
+def test_cache_metrics() -> None:
+    """
+    Test that subsumed searches count as hits and coalesced lookups as misses, and an unused cache has ratio 0.
+    """
+    lines = cache_metrics({"search": {"hits": 1, "subsumed": 2, "misses": 1},
+                           "recipe_info": {"hits": 0, "misses": 1, "coalesced": 1}, "widget": {"bytes": 0}})
+    text = "\n".join(lines)
+
+    assert sample(text, "feastfinder_cache_hits_total", cache="search") == 3
+    assert sample(text, "feastfinder_cache_hit_ratio", cache="search") == 0.75
+    assert sample(text, "feastfinder_cache_misses_total", cache="recipe_info") == 2
+    assert sample(text, "feastfinder_cache_hit_ratio", cache="widget") == 0
+    assert render_metric("up", "gauge", "Up.", [({}, 1)]) == ["# HELP up Up.", "# TYPE up gauge", "up 1"]
+
+
+@pytest.fixture
+def metrics_client(monkeypatch, tmp_path):
+    monkeypatch.setattr(app.upstream, "scheduler", QuotaScheduler())
+    monkeypatch.setattr(app, "recipe_info_cache", TTLCache())
+    monkeypatch.setattr(app, "price_breakdown_cache", TTLCache())
+    for name in ("request_seconds", "request_upstream_seconds", "request_local_seconds", "upstream_seconds"):
+        old = getattr(app, name)
+        monkeypatch.setattr(app, name, Histogram(old.name, old.documentation, old.labelnames, old.buckets))
+    feast_finder = Feast_Finder(str(tmp_path / "favrecipes.json"))
+    monkeypatch.setattr(app, "feast_finder", feast_finder)
+    yield app.test_client()
+    feast_finder.close()
+
+
+@patch('requests.Session.get')
+def test_requests_are_timed_by_route(mock_get, metrics_client) -> None:
+    """
+    Test that requests are timed by route rule and status, with the time in Spoonacular calls split off,
+    including the calls fanned out to other threads.
+    """
+    mock_get.return_value = make_response(200, {"id": 1, "title": "Soup"})
+
+    metrics_client.get("/api/recipe/info/1")
+    metrics_client.get("/api/recipe/info/2")
+    metrics_client.get("/api/recipe/card/3")  # <- information and price breakdown are fetched on the fanout pool
+    metrics_client.get("/health")
+
+    assert app.request_seconds.snapshot("/api/recipe/info/<int:meal_id>", "GET", "200")[0][-1] == 2
+    assert app.request_seconds.snapshot("/health", "GET", "200")[0][-1] == 1
+    assert app.upstream_seconds.snapshot("recipe_info")[0][-1] == 3
+    assert app.request_upstream_seconds.snapshot("/api/recipe/card/<int:meal_id>")[1] > 0
+    assert app.request_upstream_seconds.snapshot("/health")[1] == 0.0
+    assert app.request_local_seconds.snapshot("/health")[0][-1] == 1
+
+
+def test_metrics_endpoint(metrics_client) -> None:
+    """
+    Test that /metrics serves the histograms, the persistence timings and the counters in the text format.
+    """
+    app.feast_finder.add_recipe(Recipe("Soup", "Boil", "Water", "", id="1"))
+    app.feast_finder.delete_recipe("1")
+    app.feast_finder.add_recipe(Recipe("Stew", "Simmer", "Beef", "", id="2"))
+    metrics_client.get("/feastFinder/recipes/favorites/")
+    metrics_client.get("/no/such/page")
+
+    response = metrics_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.get_data(as_text=True)
+    assert sample(text, "feastfinder_request_duration_seconds_count",
+                  route="/feastFinder/recipes/favorites/", method="GET", status="200") == 1
+    assert sample(text, "feastfinder_request_duration_seconds_count", route="unmatched", method="GET", status="404") == 1
+    assert sample(text, "feastfinder_persistence_duration_seconds_count", operation="add") == 2
+    assert sample(text, "feastfinder_persistence_duration_seconds_count", operation="flush") == 3
+    assert sample(text, "feastfinder_persistence_duration_seconds_count", operation="delete") == 1
+    assert sample(text, "feastfinder_favorites") == 1
+    assert "# TYPE feastfinder_cache_hit_ratio gauge" in text
+    assert sample(text, "feastfinder_upstream_calls_total", client="threaded", outcome="requests") >= 0
+    for line in text.splitlines():
+        assert line.startswith("#") or re.match(r'^[a-z_]+(\{[^}]*\})? \S+$', line), line
+
+
+def test_profiler_keeps_slow_profiles_and_rotates(tmp_path) -> None:
+    """
+    Test that only sampled, slow requests leave a profile with its tags, and that the oldest profiles are deleted.
+    """
+    draws = iter([0.9] + [0.1] * 5)
+    profiler = RequestProfiler(str(tmp_path), sample_rate=0.5, threshold=0.01, max_profiles=2,
+                               sample=lambda: next(draws))
+
+    assert profiler.start() is None  # <- not sampled
+    profile = profiler.start()
+    assert profiler.start() is None  # <- one request is profiled at a time
+    assert profiler.finish(profile, 0.001, {"route": "/fast"}) is None
+
+    paths = []
+    for number in range(3):
+        profile = profiler.start()
+        time.sleep(0.001)
+        paths.append(profiler.finish(profile, 0.5, {"route": "/api/recipe/<int:meal_id>", "upstream": 0.25}))
+
+    assert profiler.profiles() == paths[1:]
+    assert os.path.basename(paths[0]).replace(".prof", ".json") not in os.listdir(tmp_path)
+    with open(paths[-1][:-len(".prof")] + ".json") as file:
+        assert json.load(file)["upstream"] == 0.25
+    assert "api_recipe_int_meal_id" in paths[-1] and paths[-1].endswith("-500ms.prof")
+    pstats.Stats(paths[-1])  # <- a readable pstats file
+    assert profiler.stats() == {"sample_rate": 0.5, "threshold": 0.01, "profiled": 4, "busy": 1,
+                                "written": 3, "deleted": 1}
+
+
+def test_slow_requests_are_profiled(metrics_client, monkeypatch, tmp_path) -> None:
+    """
+    Test that a profiled request is tagged with its route, the number of favorites and its upstream time,
+    and that profiling stays off by default.
+    """
+    assert not app.profiler.enabled
+    monkeypatch.setattr(app, "profiler", RequestProfiler(str(tmp_path / "profiles"), sample_rate=1.0, threshold=0))
+    app.feast_finder.add_recipe(Recipe("Soup", "Boil", "Water", "", id="1"))
+
+    metrics_client.get("/feastFinder/recipes/favorites/1")
+
+    [path] = app.profiler.profiles()
+    with open(path[:-len(".prof")] + ".json") as file:
+        tags = json.load(file)
+    assert tags["route"] == "/feastFinder/recipes/favorites/<recipe_id>"
+    assert tags["path"] == "/feastFinder/recipes/favorites/1" and tags["status"] == 200
+    assert tags["favorites"] == 1 and tags["upstream"] == 0
+    assert any("get_favorite_recipe_by_id" in function for _, _, function in pstats.Stats(path).stats)
+    assert sample(metrics_client.get("/metrics").get_data(as_text=True), "feastfinder_profiles_total",
+                  outcome="written") == 1  # <- /metrics itself is written after its body
@@ -0,0 +1,359 @@
+import pytest
+import json
+import os
+import time
+from pathlib import Path
+from context import Feast_Finder, Recipe
+from feast_finder.recipe import recipes_to_json
+
+"""
+Test suite for the storage backends of Feast_Finder: the append-only operation log
+with snapshot compaction of the JSON store, the SQLite store and the lazily loaded,
+offset-indexed store.
+"""
+
+
+@pytest.fixture
+def store_path(tmp_path: Path) -> str:
+    """
+    Path of a fresh favorites file inside a temporary directory.
+    """
+    return str(tmp_path / "favrecipes.json")
+
+
+def make_recipe(recipe_id: str) -> Recipe:
+    return Recipe(f"Recipe {recipe_id}", "Cook it", "Salt, Pepper", "http://example.com/img.jpg", id=recipe_id)
+
+
+def test_mutations_are_appended_to_log(store_path: str) -> None:
+    """
+    Test that add, update and delete each append one record and do not rewrite the snapshot.
+    """
+    feast_finder = Feast_Finder(store_path)
+    feast_finder.add_recipe(make_recipe("1"))
+    feast_finder.add_recipe(make_recipe("2"))
+    feast_finder.update_recipe("1", "Cook it slowly")
+    feast_finder.delete_recipe("2")
+
+    assert not Path(store_path).exists()
+    with open(f"{store_path}.log") as file:
+        ops = [json.loads(line)["op"] for line in file]
+    assert ops == ["add", "add", "update", "delete"]
+
+
+def test_load_replays_snapshot_and_log(store_path: str) -> None:
+    """
+    Test that a fresh instance sees the snapshot plus every logged mutation.
+    """
+    feast_finder = Feast_Finder(store_path)
+    feast_finder.add_recipe(make_recipe("1"))
+    feast_finder.save_recipe()
+    feast_finder.add_recipe(make_recipe("2"))
+    feast_finder.update_recipe("1", "Cook it slowly")
+    feast_finder.delete_recipe("2")
+    feast_finder.close()
+
+    reloaded = Feast_Finder(store_path)
+    reloaded.load_recipes()
+    recipes = reloaded.get_favorite_recipes()
+
+    assert list(recipes) == ["1"]
+    assert recipes["1"].instructions == "Cook it slowly"
+
+
+def test_load_ignores_torn_last_record(store_path: str) -> None:
+    """
+    Test that a partially written trailing record is skipped on replay and cut off before the next append.
+    """
+    feast_finder = Feast_Finder(store_path)
+    feast_finder.add_recipe(make_recipe("1"))
+    feast_finder.close()
+    with open(f"{store_path}.log", "a") as file:
+        file.write('{"op": "delete", "recipe_')
+
+    reloaded = Feast_Finder(store_path)
+    reloaded.load_recipes()
+    assert "1" in reloaded.get_favorite_recipes()
+
+    # later writes must not be glued to the torn record
+    reloaded.add_recipe(make_recipe("2"))
+    reloaded.add_recipe(make_recipe("3"))
+    reloaded.close()
+    again = Feast_Finder(store_path)
+    again.load_recipes()
+    assert sorted(again.get_favorite_recipes()) == ["1", "2", "3"]
+    again.close()
+
+
+def test_log_is_compacted_into_snapshot(store_path: str) -> None:
+    """
+    Test that reaching the compaction threshold folds the log into the snapshot.
+    """
+    feast_finder = Feast_Finder(store_path, compact_threshold=3)
+    for rid in ("1", "2", "3"):
+        feast_finder.add_recipe(make_recipe(rid))
+
+    assert Path(f"{store_path}.log").read_text() == ""
+    with open(store_path) as file:
+        assert sorted(json.load(file)) == ["1", "2", "3"]
+
+
+def test_snapshot_is_synced_before_log_is_emptied(store_path: str, monkeypatch) -> None:
+    """
+    Test that compaction syncs the new snapshot and its directory before the log is truncated.
+    """
+    events = []
+    fsync, replace = os.fsync, os.replace
+    monkeypatch.setattr(os, "fsync", lambda fd: (events.append("fsync"), fsync(fd)))
+    monkeypatch.setattr(os, "replace", lambda source, target: (events.append("replace"), replace(source, target)))
+    feast_finder = Feast_Finder(store_path, compact_threshold=2)
+    feast_finder.add_recipe(make_recipe("1"))
+    events.clear()
+    monkeypatch.setattr(feast_finder.storage.oplog, "truncate", lambda: events.append("truncate"))
+
+    feast_finder.add_recipe(make_recipe("2"))
+
+    assert events[-4:] == ["fsync", "replace", "fsync", "truncate"]  # <- the snapshot, then its directory
+    feast_finder.close()
+
+
+def test_recipe_serialization_matches_json_dumps() -> None:
+    """
+    Test that the hand-rolled serializers produce the same JSON as json.dumps of to_dict().
+    """
+    recipes = [make_recipe("1"),
+               Recipe('Cr\u00e8me "br\u00fbl\u00e9e"', "Line 1\nLine 2\t\\", "\u2603, \U0001F600", None, id=2)]
+
+    for recipe in recipes:
+        assert recipe.to_json() == json.dumps(recipe.to_dict())
+        assert list(recipe.to_dict()) == ["title", "recipe_id", "instructions", "ingredients", "image"]
+    assert not hasattr(recipes[0], "__dict__")
+
+    assert json.loads(recipes_to_json(recipes)) == {str(r.recipe_id): r.to_dict() for r in recipes}
+    assert json.loads(recipes_to_json([])) == {}
+
+
+def test_sqlite_storage_persists_across_instances(store_path: str) -> None:
+    """
+    Test that the SQLite backend keeps recipes, updates and deletes after reopening.
+    """
+    feast_finder = Feast_Finder(store_path, storage="sqlite")
+    feast_finder.load_recipes()
+    feast_finder.add_recipe(make_recipe("1"))
+    feast_finder.add_recipe(make_recipe("2"))
+    assert not feast_finder.add_recipe(make_recipe("2"))
+    feast_finder.update_recipe("1", "Cook it slowly")
+    feast_finder.delete_recipe("2")
+    feast_finder.close()
+
+    reloaded = Feast_Finder(store_path, storage="sqlite")
+    reloaded.load_recipes()
+    recipes = reloaded.get_favorite_recipes()
+
+    assert len(recipes) == 1
+    assert list(recipes) == ["1"]
+    assert recipes["1"].instructions == "Cook it slowly"
+    assert "2" not in recipes
+    reloaded.close()
+
+
+def test_sqlite_storage_imports_json_favorites(store_path: str) -> None:
+    """
+    Test that an empty SQLite store is seeded from an existing JSON favorites file.
+    """
+    with open(store_path, "w") as file:
+        json.dump({"7": make_recipe("7").to_dict()}, file)
+
+    feast_finder = Feast_Finder(store_path, storage="sqlite")
+    feast_finder.load_recipes()
+
+    assert feast_finder.get_recipe("7").title == "Recipe 7"
+    feast_finder.close()
+
+
+def test_sqlite_storage_imports_uncompacted_json_log(store_path: str) -> None:
+    """
+    Test that switching to SQLite also carries over the JSON favorites that are still only in the log.
+    """
+    feast_finder = Feast_Finder(store_path)
+    feast_finder.add_recipe(make_recipe("1"))
+    feast_finder.save_recipe()
+    feast_finder.add_recipe(make_recipe("2"))
+    feast_finder.update_recipe("1", "Cook it slowly")
+    feast_finder.close()
+    assert Path(f"{store_path}.log").read_text() != ""
+
+    migrated = Feast_Finder(store_path, storage="sqlite")
+    migrated.load_recipes()
+
+    assert sorted(migrated.get_favorite_recipes()) == ["1", "2"]
+    assert migrated.get_recipe("1").instructions == "Cook it slowly"
+    migrated.close()
+
+
+def test_lazy_storage_persists_across_instances(store_path: str) -> None:
+    """
+    Test that the lazy store keeps recipes, updates and deletes after reopening, in ID order.
+    """
+    feast_finder = Feast_Finder(store_path, storage="lazy")
+    feast_finder.load_recipes()
+    for rid in ("3", "1", "2"):
+        feast_finder.add_recipe(make_recipe(rid))
+    feast_finder.update_recipe("1", "Cook it slowly")
+    feast_finder.delete_recipe("2")
+    feast_finder.close()
+
+    reloaded = Feast_Finder(store_path, storage="lazy")
+    reloaded.load_recipes()
+    recipes = reloaded.get_favorite_recipes()
+
+    assert len(recipes) == 2
+    assert list(recipes) == ["1", "3"]
+    assert recipes["1"].instructions == "Cook it slowly"
+    assert "2" not in recipes
+    # nothing is materialized until it is asked for
+    reloaded.close()
+    reloaded.load_recipes()
+    assert not reloaded.storage.cache
+    assert reloaded.get_recipe("3").title == "Recipe 3"
+    assert list(reloaded.storage.cache) == ["3"]
+    reloaded.close()
+
+
+def test_lazy_storage_imports_json_favorites(store_path: str) -> None:
+    """
+    Test that a new lazy store is seeded from an existing JSON favorites file and indexed.
+    """
+    with open(store_path, "w") as file:
+        json.dump({"7": make_recipe("7").to_dict(), "8": make_recipe("8").to_dict()}, file)
+
+    feast_finder = Feast_Finder(store_path, storage="lazy")
+    feast_finder.load_recipes()
+
+    assert feast_finder.get_recipe("7").title == "Recipe 7"
+    assert feast_finder.storage.index.count == 2
+    assert list(feast_finder.search_recipes("recipe 8")) == ["8"]
+    feast_finder.close()
+
+
+def test_lazy_storage_imports_uncompacted_json_log(store_path: str) -> None:
+    """
+    Test that switching to the lazy store also carries over the JSON favorites that are still only in the log.
+    """
+    feast_finder = Feast_Finder(store_path)
+    feast_finder.add_recipe(make_recipe("1"))
+    feast_finder.close()
+    assert not Path(store_path).exists()  # <- only in the log
+
+    migrated = Feast_Finder(store_path, storage="lazy")
+    migrated.load_recipes()
+
+    assert list(migrated.get_favorite_recipes()) == ["1"]
+    assert migrated.get_recipe("1").title == "Recipe 1"
+    migrated.close()
+
+
+def test_lazy_storage_compacts_and_recovers(store_path: str) -> None:
+    """
+    Test that the lazy store compacts its data file and drops a torn last record.
+    """
+    feast_finder = Feast_Finder(store_path, compact_threshold=3, storage="lazy")
+    feast_finder.load_recipes()
+    for rid in ("1", "2", "3"):
+        feast_finder.add_recipe(make_recipe(rid))
+
+    # the third record triggered a compaction: everything is covered by the index again
+    assert feast_finder.storage.index.count == 3
+    assert not feast_finder.storage.overlay
+
+    feast_finder.delete_recipe("3")
+    feast_finder.close()
+    data_path = str(Path(store_path).with_suffix(".data"))
+    with open(data_path, "ab") as file:
+        file.write(b'{"recipe_id": "4", "tit')
+
+    reloaded = Feast_Finder(store_path, storage="lazy")
+    reloaded.load_recipes()
+    assert sorted(reloaded.get_favorite_recipes()) == ["1", "2"]
+    reloaded.add_recipe(make_recipe("5"))
+    reloaded.close()
+
+    reloaded.load_recipes()
+    assert sorted(reloaded.get_favorite_recipes()) == ["1", "2", "5"]
+    reloaded.close()
+
+
+def test_lazy_storage_rebuilds_stale_index(store_path: str) -> None:
+    """
+    Test that an index that does not belong to the data file is rebuilt from the data file.
+    """
+    feast_finder = Feast_Finder(store_path, storage="lazy")
+    feast_finder.load_recipes()
+    feast_finder.add_recipe(make_recipe("1"))
+    feast_finder.add_recipe(make_recipe("2"))
+    feast_finder.delete_recipe("1")
+    feast_finder.close()
+    Path(store_path).with_suffix(".idx").unlink()
+
+    reloaded = Feast_Finder(store_path, storage="lazy")
+    reloaded.load_recipes()
+    assert list(reloaded.get_favorite_recipes()) == ["2"]
+    assert reloaded.storage.index.count == 1
+    reloaded.close()
+
+
+@pytest.mark.parametrize("durability", ["batch", "interval"])
+def test_write_behind_flushes_on_close(store_path: str, durability: str) -> None:
+    """
+    Test that write-behind modes coalesce writes and flush everything on shutdown.
+    """
+    feast_finder = Feast_Finder(store_path, durability=durability, max_delay=60, max_pending=1000)
+    for rid in ("1", "2", "3"):
+        feast_finder.add_recipe(make_recipe(rid))
+
+    # acknowledged in memory, not yet on disk
+    assert len(feast_finder.get_favorite_recipes()) == 3
+    assert not Path(f"{store_path}.log").exists()
+
+    feast_finder.close()
+
+    reloaded = Feast_Finder(store_path)
+    reloaded.load_recipes()
+    assert sorted(reloaded.get_favorite_recipes()) == ["1", "2", "3"]
+
+
+def test_batch_flushes_single_write_within_max_delay(store_path: str) -> None:
+    """
+    Test that a lone write in batch mode reaches the disk within max_delay, without close().
+    """
+    feast_finder = Feast_Finder(store_path, durability="batch", max_delay=0.05, max_pending=1000)
+    feast_finder.add_recipe(make_recipe("1"))
+
+    for _ in range(100):
+        if feast_finder.flusher.flushes:
+            break
+        time.sleep(0.01)
+
+    assert feast_finder.flusher.flushes == 1
+    reloaded = Feast_Finder(store_path)
+    reloaded.load_recipes()
+    assert list(reloaded.get_favorite_recipes()) == ["1"]
+    feast_finder.close()
+
+
+def test_write_behind_flushes_at_max_pending(store_path: str) -> None:
+    """
+    Test that reaching max_pending unflushed writes triggers a single flush.
+    """
+    feast_finder = Feast_Finder(store_path, durability="batch", max_delay=60, max_pending=2)
+    feast_finder.add_recipe(make_recipe("1"))
+    feast_finder.add_recipe(make_recipe("2"))
+
+    for _ in range(100):
+        if feast_finder.flusher.flushes:
+            break
+        time.sleep(0.01)
+
+    assert feast_finder.flusher.flushes == 1
+    assert len(Path(f"{store_path}.log").read_text().splitlines()) == 2
+    feast_finder.close()
@@ -0,0 +1,180 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from context import app
+from feast_finder import QuotaExceeded, QuotaScheduler, SearchCache, TTLCache
+
+"""
+Test suite for the quota scheduler in front of the Spoonacular calls: the token
+bucket, the priority classes, the daily quota and the 503 answers of the proxy routes.
+"""
+
+# 2024-05-01 23:00:00 UTC, an hour before the daily quota resets
+LATE_EVENING = 1714604400.0
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_response(status_code: int, headers: dict = None) -> MagicMock:
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+def test_bucket_books_tokens_ahead_and_refills() -> None:
+    """
+    Test that a burst is granted at once, later calls wait for their token and the bucket refills.
+    """
+    clock = FakeClock()
+    scheduler = QuotaScheduler(rate=2, burst=3, clock=clock)
+
+    assert [scheduler.reserve() for _ in range(3)] == [0, 0, 0]
+    assert scheduler.reserve() == pytest.approx(0.5)
+    assert scheduler.reserve() == pytest.approx(1.0)  # <- queued behind the previous call
+
+    clock.now = 10
+    assert scheduler.reserve() == 0
+    assert scheduler.stats()["tokens"] == 2
+    assert scheduler.stats()["priorities"]["interactive"] == {"granted": 6, "queued": 2, "rejected": 0}
+
+
+def test_lower_priorities_leave_tokens_to_higher() -> None:
+    """
+    Test that prefetches stop short of the reserved tokens while detail views can still use them.
+    """
+    clock = FakeClock()
+    scheduler = QuotaScheduler(rate=1, burst=6, clock=clock)
+
+    assert scheduler.reserve("background") == 0  # <- 5 tokens left, all reserved for the classes above
+    assert scheduler.reserve("background") == pytest.approx(1.0)
+    with pytest.raises(QuotaExceeded) as error:
+        scheduler.reserve("background")
+    assert error.value.retry_after == pytest.approx(2.0)
+
+    assert scheduler.reserve("search") == 0
+    assert [scheduler.reserve("interactive") for _ in range(3)] == [0, 0, 0]
+    assert scheduler.stats()["priorities"]["background"]["rejected"] == 1
+
+
+def test_fails_fast_when_wait_exceeds_class_limit() -> None:
+    """
+    Test that a call whose token is further away than its class may wait is rejected without booking it.
+    """
+    scheduler = QuotaScheduler(rate=1, burst=1, clock=FakeClock())
+    scheduler.reserve()
+    for _ in range(5):
+        scheduler.reserve()  # <- books the next 5 seconds
+
+    with pytest.raises(QuotaExceeded) as error:
+        scheduler.reserve()
+
+    assert error.value.retry_after == pytest.approx(6.0)
+    assert error.value.reason == "rate limit"
+    assert scheduler.exceeded().retry_after == pytest.approx(6.0)  # <- the rejected call took no token
+
+
+def test_daily_quota_is_tracked_from_headers() -> None:
+    """
+    Test that the points left reported by Spoonacular hold back prefetches first and all calls once they run out.
+    """
+    wall_clock = FakeClock(LATE_EVENING)
+    scheduler = QuotaScheduler(clock=FakeClock(), wall_clock=wall_clock)
+
+    scheduler.observe(200, {"X-API-Quota-Used": "140", "X-API-Quota-Left": "10"})
+    assert scheduler.reserve("interactive") == 0
+    with pytest.raises(QuotaExceeded) as error:
+        scheduler.reserve("background")  # <- less than 10% of the daily quota left
+    assert error.value.reason == "daily quota"
+    assert error.value.retry_after == pytest.approx(3600)
+
+    scheduler.observe(200, {"x-api-quota-used": "150", "x-api-quota-left": "0"})
+    with pytest.raises(QuotaExceeded):
+        scheduler.reserve("interactive")
+    assert scheduler.stats()["exhausted_for"] == 3600
+
+    wall_clock.now += 3600  # <- midnight UTC
+    assert scheduler.reserve("background") == 0
+    assert scheduler.stats()["quota_left"] is None
+
+
+def test_rate_limited_answer_empties_bucket() -> None:
+    """
+    Test that a 429 keeps every class from calling for its Retry-After.
+    """
+    clock = FakeClock()
+    scheduler = QuotaScheduler(rate=1, burst=20, clock=clock)
+
+    scheduler.observe(429, {"Retry-After": "3"})
+
+    assert scheduler.reserve() == pytest.approx(4.0)
+    with pytest.raises(QuotaExceeded):
+        scheduler.reserve("search")
+    clock.now = 30
+    assert scheduler.reserve("search") == 0
+
+
+@patch('requests.Session.get')
+def test_route_answers_503_when_daily_quota_is_used_up(mock_get, monkeypatch) -> None:
+    """
+    Test that a 402 from Spoonacular turns into 503 with Retry-After and later calls are not sent at all.
+    """
+    mock_get.return_value = make_response(402)
+    monkeypatch.setattr(app.upstream, "scheduler", QuotaScheduler())
+    monkeypatch.setattr(app, "recipe_info_cache", TTLCache())
+    monkeypatch.setattr(app, "search_cache", SearchCache())
+    client = app.test_client()
+
+    first = client.get("/api/recipe/info/1")
+    second = client.get("/api/meals?query=pasta")
+
+    for response in (first, second):
+        assert response.status_code == 503
+        assert response.get_json() == {"error": "Spoonacular daily quota exhausted, try again later"}
+        assert 1 <= int(response.headers["Retry-After"]) <= 24 * 60 * 60
+    mock_get.assert_called_once()
+
+
+@patch('requests.Session.get')
+def test_route_fails_fast_when_rate_budget_is_exhausted(mock_get, monkeypatch) -> None:
+    """
+    Test that a proxy route answers 503 at once instead of queueing longer than its class may wait.
+    """
+    mock_get.return_value = make_response(200)
+    mock_get.return_value.json.return_value = {"id": 1, "title": "Pasta"}
+    monkeypatch.setattr(app.upstream, "scheduler", QuotaScheduler(rate=0.1, burst=1))
+    monkeypatch.setattr(app, "recipe_info_cache", TTLCache())
+    client = app.test_client()
+
+    assert client.get("/api/recipe/info/1").status_code == 200
+    response = client.get("/api/recipe/info/2")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "10"
+    mock_get.assert_called_once()
+
+
+@patch('requests.Session.get')
+def test_random_pool_refill_yields_to_searches(mock_get, monkeypatch) -> None:
+    """
+    Test that a refill of the random recipe pool is a prefetch: turned away when the quota is low
+    while a search can still use the tokens kept for it.
+    """
+    from app import fetch_random_recipes
+    mock_get.return_value = make_response(200)
+    mock_get.return_value.json.return_value = {"results": [], "totalResults": 0}
+    monkeypatch.setattr(app.upstream, "scheduler", QuotaScheduler(rate=0.01, burst=3))
+    monkeypatch.setattr(app, "search_cache", SearchCache())
+
+    with pytest.raises(QuotaExceeded):
+        fetch_random_recipes(5)
+    assert app.test_client().get("/api/meals?query=pasta").status_code == 200
+
+    mock_get.assert_called_once()
+    priorities = app.upstream.scheduler.stats()["priorities"]
+    assert priorities["background"]["rejected"] == 1 and priorities["search"]["granted"] == 1
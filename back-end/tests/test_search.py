@@ -0,0 +1,221 @@
+import pytest
+import threading
+from pathlib import Path
+from typing import List
+from context import Feast_Finder, Recipe
+from feast_finder.ingredients import normalize_ingredient, parse_ingredients
+
+"""
+Test suite for the favorites search and ingredient indexes of Feast_Finder.
+"""
+
+
+@pytest.fixture
+def feast_finder(tmp_path: Path) -> Feast_Finder:
+    """
+    A Feast_Finder with a few sample recipes in a temporary directory.
+    """
+    feast_finder = Feast_Finder(str(tmp_path / "favrecipes.json"))
+    for recipe in [
+        Recipe("Pasta Carbonara", "Cook pasta, mix with eggs and cheese", "Pasta, Eggs, Cheese, Bacon", "", id="1001"),
+        Recipe("Chicken Pasta", "Cook chicken and pasta, mix together", "Chicken, Pasta, Sauce", "", id="1002"),
+        Recipe("Vegetable Soup", "Chop vegetables, add to pot with broth", "Carrots, Celery, Onion, Broth", "", id="1003"),
+        Recipe("Chocolate Cake", "Mix ingredients, bake at 350F", "Flour, Sugar, Cocoa, Eggs", "", id="1004"),
+    ]:
+        feast_finder.add_recipe(recipe)
+    yield feast_finder
+    feast_finder.close()
+
+
+def linear_search(feast_finder: Feast_Finder, query: str) -> List[str]:
+    query = query.lower()
+    return sorted(
+        rid for rid, recipe in feast_finder.get_favorite_recipes().items()
+        if query in recipe.title.lower() or query in recipe.instructions.lower() or query in recipe.ingredients.lower()
+    )
+
+
+@pytest.mark.parametrize("query", [
+    "pasta", "PASTA", "ast", "eggs", "gg", "350f", "chicken pasta", "pasta, mix", "ta, mi",
+    "bake at 3", ", ", "!", "burger", "cake soup",
+])
+def test_index_matches_linear_scan(feast_finder: Feast_Finder, query: str) -> None:
+    """
+    Test that the index returns exactly the recipes a substring scan would find.
+    """
+    assert sorted(feast_finder.search_recipes(query)) == linear_search(feast_finder, query)
+
+
+def test_index_follows_updates_and_deletes(feast_finder: Feast_Finder) -> None:
+    """
+    Test that the index is kept up to date by update_recipe and delete_recipe.
+    """
+    assert sorted(feast_finder.search_recipes("pasta")) == ["1001", "1002"]
+
+    feast_finder.update_recipe("1003", "Serve with pasta")
+    assert sorted(feast_finder.search_recipes("pasta")) == ["1001", "1002", "1003"]
+    assert feast_finder.search_recipes("chop") == {}
+
+    feast_finder.delete_recipe("1001")
+    assert sorted(feast_finder.search_recipes("pasta")) == ["1002", "1003"]
+    assert feast_finder.search_recipes("carbonara") == {}
+    assert "carbonara" not in feast_finder.index.postings
+
+
+def test_index_is_built_on_load(feast_finder: Feast_Finder) -> None:
+    """
+    Test that load_recipes rebuilds the index from the stored favorites.
+    """
+    feast_finder.close()
+    reloaded = Feast_Finder(feast_finder.storage_path)
+    reloaded.load_recipes()
+
+    assert sorted(reloaded.search_recipes("eggs")) == ["1001", "1004"]
+
+
+def test_ranking_weights_title_above_other_fields(feast_finder: Feast_Finder) -> None:
+    """
+    Test that a recipe matching in the title ranks above one matching in the instructions only.
+    """
+    feast_finder.add_recipe(Recipe("Broth", "Simmer chicken bones", "Bones, Water", "", id="1005"))
+
+    results, next_cursor = feast_finder.rank_recipes("chicken", limit=10)
+
+    assert [recipe.recipe_id for recipe, _ in results] == ["1002", "1005"]
+    assert results[0][1] > results[1][1]
+    assert next_cursor is None
+
+
+def test_ranking_prefix_and_fuzzy_matches(feast_finder: Feast_Finder) -> None:
+    """
+    Test that query words match as prefixes and with typos, and that both can be switched off.
+    """
+    results, _ = feast_finder.rank_recipes("choco", limit=10)
+    assert [recipe.recipe_id for recipe, _ in results] == ["1004"]
+
+    results, _ = feast_finder.rank_recipes("carbonra", limit=10)
+    assert [recipe.recipe_id for recipe, _ in results] == ["1001"]
+
+    assert feast_finder.rank_recipes("choco", limit=10, prefix=False, fuzzy=False)[0] == []
+    assert feast_finder.rank_recipes("carbonra", limit=10, fuzzy=False)[0] == []
+
+
+def test_ranking_pages_through_all_results(feast_finder: Feast_Finder) -> None:
+    """
+    Test that following the cursors yields every result exactly once, best first.
+    """
+    everything, _ = feast_finder.rank_recipes("pasta eggs chicken soup", limit=10)
+
+    paged, cursor = [], None
+    while True:
+        page, cursor = feast_finder.rank_recipes("pasta eggs chicken soup", limit=1, cursor=cursor)
+        paged.extend(page)
+        if cursor is None:
+            break
+
+    assert [recipe.recipe_id for recipe, _ in paged] == [recipe.recipe_id for recipe, _ in everything]
+    assert [score for _, score in paged] == sorted((score for _, score in paged), reverse=True)
+
+    with pytest.raises(ValueError):
+        feast_finder.rank_recipes("pasta", limit=1, cursor="not-a-cursor")
+
+
+@pytest.mark.parametrize("line, name", [
+    ("3 tablespoons (45 g) unsalted butter softened to room temperature", "butter"),
+    ("1 (15 oz.) black beans, drained, rinsed", "black bean"),
+    ("2 mediums onions -- chopped", "onion"),
+    ("1/4 teaspoon cayenne pepper or to taste", "cayenne pepper"),
+    ("Salt to Taste", "salt"),
+    ("2 cups fresh blueberries", "blueberry"),
+    ("3 ripe tomatoes", "ripe tomato"),
+    ("1/2 cup", None),
+])
+def test_normalize_ingredient(line: str, name: str) -> None:
+    """
+    Test that quantities, units, preparations and notes are dropped from ingredient lines.
+    """
+    assert normalize_ingredient(line) == name
+
+
+def test_parse_ingredients_lines_or_commas() -> None:
+    """
+    Test that ingredients are read one per line, or comma-separated when they are on one line.
+    """
+    assert parse_ingredients("2 eggs\r\n1 cup sugar, divided\r\n") == {"egg", "sugar"}
+    assert parse_ingredients("Pasta, Eggs, Cheese") == {"pasta", "egg", "cheese"}
+
+
+def test_ingredient_index_matches_brute_force(tmp_path: Path) -> None:
+    """
+    Test that the bit matrix ranks like a set comparison per recipe, while it grows and recipes change.
+    """
+    feast_finder = Feast_Finder(str(tmp_path / "favrecipes.json"))
+    # one-word names like "herbbc" for 12, since numbers are not part of an ingredient name
+    pantry = ["herb" + "".join(chr(ord("a") + int(digit)) for digit in str(number)) for number in range(120)]
+    for number in range(40):
+        ingredients = "\n".join(pantry[(number * 7 + step * 11) % 120] for step in range(1 + number % 6))
+        feast_finder.add_recipe(Recipe(f"Recipe {number}", "Cook", ingredients, "", id=f"{number:03d}"))
+        if number == 20:
+            feast_finder.cookable_recipes(pantry[:1])  # <- builds the index halfway through
+    feast_finder.delete_recipe("007")
+    feast_finder.add_recipe(Recipe("Late", "Cook", f"{pantry[5]}\n{pantry[119]}", "", id="999"))
+
+    have = pantry[::3]
+    results, counts = feast_finder.cookable_recipes(have, staples=False)
+
+    on_hand = set(have)
+    expected = []
+    for recipe_id, recipe in feast_finder.get_favorite_recipes().items():
+        needed = parse_ingredients(recipe.ingredients)
+        missing = sorted(needed - on_hand)
+        if len(missing) < len(needed):
+            expected.append((len(missing), -(len(needed) - len(missing)) / len(needed), recipe_id, missing))
+    expected.sort()
+    assert [(recipe.recipe_id, missing) for recipe, missing, _, _ in results] == \
+        [(recipe_id, missing) for _, _, recipe_id, missing in expected]
+    assert sum(counts.values()) == len(expected)
+    assert "007" not in feast_finder.ingredient_matrix.rows
+    feast_finder.close()
+
+
+def test_ingredient_index_skips_recipes_without_ingredients(tmp_path: Path) -> None:
+    """
+    Test that a favorite with an empty ingredients text is no match, instead of ranking first with nothing missing.
+    """
+    feast_finder = Feast_Finder(str(tmp_path / "favrecipes.json"))
+    feast_finder.add_recipe(Recipe("Water", "Pour", "", "", id="1"))
+    feast_finder.add_recipe(Recipe("Omelette", "Fry", "Eggs\nButter", "", id="2"))
+
+    results, counts = feast_finder.cookable_recipes(["eggs"], staples=False)
+
+    assert [(recipe.recipe_id, missing) for recipe, missing, _, _ in results] == [("2", ["butter"])]
+    assert counts == {1: 1}
+    assert feast_finder.cookable_recipes([], staples=False) == ([], {})
+    feast_finder.close()
+
+
+@pytest.mark.parametrize("index, build", [("index", "search_index"), ("ingredient_matrix", "ingredient_index")])
+def test_index_build_sees_concurrent_writes(feast_finder: Feast_Finder, monkeypatch, index: str, build: str) -> None:
+    """
+    Test that a recipe added while an index is first built ends up in it, instead of breaking the build.
+    """
+    added = threading.Event()
+    add = feast_finder.storage.add
+    monkeypatch.setattr(feast_finder.storage, "add", lambda recipe: (add(recipe), added.set()))
+    writer = threading.Thread(target=feast_finder.add_recipe,
+                              args=(Recipe("Burger", "Grill", "Beef, Buns", "", id="1005"),))
+    index_build = getattr(feast_finder, index).build
+
+    def build_while_writing(recipes):
+        recipes = iter(recipes)
+        first = next(recipes)
+        writer.start()
+        added.wait(5)  # <- the writer now waits for the index lock
+        index_build([first, *recipes])
+
+    monkeypatch.setattr(getattr(feast_finder, index), "build", build_while_writing)
+    getattr(feast_finder, build)()
+    writer.join()
+
+    assert list(feast_finder.search_recipes("burger")) == ["1005"]
+    assert [recipe.recipe_id for recipe, _, _, _ in feast_finder.cookable_recipes(["beef"], staples=False)[0]] == ["1005"]
@@ -0,0 +1,90 @@
+import pytest
+import requests
+from context import app
+from feast_finder import DiskCache, QuotaScheduler, RecipePool, SearchCache, TTLCache
+from spoonacular_stub import Injection, make_app, serve_in_thread
+
+"""
+Test suite for the local Spoonacular stand-in: the proxy routes against replayed
+recordings, and the injected errors and quota.
+"""
+
+
+@pytest.fixture
+def stand_in(monkeypatch, tmp_path):
+    """
+    Point the back end at a stand-in server with fresh caches; yields a function that starts it.
+    """
+    from app import fetch_random_recipes
+    stops = []
+
+    def start(injection: Injection = None) -> str:
+        url, stop = serve_in_thread(make_app(injection=injection))
+        stops.append(stop)
+        monkeypatch.setattr("app.SPOONACULAR_API", url)
+        return url
+
+    monkeypatch.setattr(app.upstream, "scheduler", QuotaScheduler())
+    monkeypatch.setattr(app.upstream, "backoff", 0)
+    monkeypatch.setattr(app, "recipe_info_cache", TTLCache())
+    monkeypatch.setattr(app, "search_cache", SearchCache())
+    monkeypatch.setattr(app, "price_breakdown_cache", TTLCache())
+    monkeypatch.setattr(app, "widget_cache", DiskCache(tmp_path))
+    monkeypatch.setattr(app, "random_pool", RecipePool(fetch_random_recipes, low=1, high=4))
+    yield start
+
+    app.random_pool.stop()
+    for stop in stops:
+        stop()
+
+
+def test_proxy_routes_replay_recordings(stand_in) -> None:
+    """
+    Test that every proxy route works offline against the recorded answers, for recorded and other recipe IDs.
+    """
+    url = stand_in()
+    client = app.test_client()
+
+    meals = client.get("/api/meals?query=pasta&maxCalories=400").get_json()
+    assert meals["totalResults"] == 4
+    assert client.get("/api/recipe/info/654959").get_json()["title"] == "Pasta With Tuna"
+    assert client.get("/api/recipe/123").get_json()["id"] == 123  # <- no recording, filled in from another one
+    assert set(client.get("/api/recipes/info?ids=654959,7").get_json()) == {"654959", "7"}
+    ingredients, prices = client.get("/api/price_breakdown/716429").get_json()
+    assert len(ingredients) == len(prices) == 7
+    assert client.get("/api/price_breakdown_widget/716429").data.startswith(b"\x89PNG")
+    random_ids = {client.get("/api/random").get_json()["id"] for _ in range(3)}
+    assert len(random_ids) == 3
+
+    stats = requests.get(f"{url}/_stub/stats").json()
+    assert stats["endpoints"]["random"] == 1  # <- one batch for the whole pool
+    assert stats["errors"] == 0
+
+
+def test_stand_in_injects_errors(stand_in) -> None:
+    """
+    Test that injected errors reach the proxy routes like real upstream failures.
+    """
+    stand_in(Injection(error_rate=1.0, error_status=500, seed=1))
+
+    response = app.test_client().get("/api/recipe/info/654959")
+
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Failed to fetch recipe"}
+
+
+def test_stand_in_enforces_daily_quota(stand_in) -> None:
+    """
+    Test that the stand-in's quota headers and 402 answers drive the quota scheduler of the back end.
+    """
+    stand_in(Injection(quota=2))
+    client = app.test_client()
+
+    assert client.get("/api/recipe/info/1").status_code == 200
+    assert app.upstream.scheduler.stats()["quota_left"] == 1
+    assert client.get("/api/recipe/info/2").status_code == 200
+    response = client.get("/api/recipe/info/3")
+
+    assert response.status_code == 503
+    assert response.get_json() == {"error": "Spoonacular daily quota exhausted, try again later"}
+    assert int(response.headers["Retry-After"]) >= 1
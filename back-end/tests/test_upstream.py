@@ -0,0 +1,633 @@
+import pytest
+import requests
+import threading
+import time
+from unittest.mock import patch, MagicMock
+from context import app
+from app import PRICE_BREAKDOWN_MISSING_TTL
+from feast_finder import DiskCache, QuotaExceeded, RecipePool, SearchCache, TTLCache, UpstreamClient, extract_price_breakdown
+from feast_finder.pricebreakdown import INGREDIENTS_STYLE, PRICES_STYLE
+
+"""
+Test suite for the shared upstream HTTP client: timeouts, bounded retries and pool
+statistics, the in-memory and disk caches of upstream responses, and the price breakdown extractor.
+"""
+
+
+def make_response(status_code: int, headers: dict = None) -> MagicMock:
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+@patch('requests.Session.get')
+def test_retries_retryable_status(mock_get) -> None:
+    """
+    Test that a 503 answer is retried and the later successful response is returned.
+    """
+    mock_get.side_effect = [make_response(503), make_response(200)]
+    client = UpstreamClient(retries=2, backoff=0)
+
+    response = client.get("https://api.example.com/x", params={"a": 1}, timeout=(1, 2))
+
+    assert response.status_code == 200
+    assert mock_get.call_count == 2
+    assert mock_get.call_args.kwargs == {"params": {"a": 1}, "timeout": (1, 2), "stream": False}
+    assert client.stats()["requests"] == 1 and client.stats()["retries"] == 1
+
+
+@patch('requests.Session.get')
+def test_does_not_retry_client_and_server_errors(mock_get) -> None:
+    """
+    Test that statuses that will not change on a retry, like 404 and 500, are returned at once.
+    """
+    mock_get.side_effect = [make_response(404), make_response(500)]
+    client = UpstreamClient(retries=2, backoff=0)
+
+    assert client.get("https://api.example.com/x").status_code == 404
+    assert client.get("https://api.example.com/x").status_code == 500
+    assert mock_get.call_count == 2
+
+
+@patch('requests.Session.get')
+def test_retries_are_bounded(mock_get) -> None:
+    """
+    Test that timeouts are retried at most `retries` times before the error is raised.
+    """
+    mock_get.side_effect = requests.Timeout("read timed out")
+    client = UpstreamClient(retries=2, backoff=0)
+
+    with pytest.raises(requests.Timeout):
+        client.get("https://api.example.com/x")
+
+    assert mock_get.call_count == 3
+    assert client.stats()["errors"] == 1
+    # calls without their own timeout get the default one
+    assert mock_get.call_args.kwargs["timeout"] == client.timeout
+
+
+@patch('requests.Session.get')
+def test_proxy_route_handles_upstream_timeout(mock_get, monkeypatch) -> None:
+    """
+    Test that a proxy route answers with an error instead of hanging when Spoonacular times out.
+    """
+    mock_get.side_effect = requests.Timeout("read timed out")
+    monkeypatch.setattr(app.upstream, "backoff", 0)
+
+    response = app.test_client().get("/api/recipe/123456")
+
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Failed to fetch recipe"}
+    assert mock_get.call_args.kwargs["timeout"] == (3.05, 10)
+
+
+def test_upstream_stats_endpoint() -> None:
+    """
+    Test that the stats endpoint reports the counters and the pools of the shared client.
+    """
+    response = app.test_client().get("/api/upstream/stats")
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert {"requests", "retries", "errors", "pools"} <= set(data)
+
+
+def test_cache_expires_and_evicts() -> None:
+    """
+    Test that cached values expire after the TTL and that the least recently used one is evicted.
+    """
+    now = [0.0]
+    cache = TTLCache(max_entries=2, ttl=10, clock=lambda: now[0])
+
+    assert cache.get(1, lambda: "a") == "a"
+    assert cache.get(1, lambda: "changed") == "a"
+    now[0] = 11
+    assert cache.get(1, lambda: "b") == "b"
+
+    cache.get(2, lambda: "c")
+    cache.get(1, lambda: "unused")  # <- 1 is now more recently used than 2
+    cache.get(3, lambda: "d")
+    assert cache.get(2, lambda: "e") == "e"
+
+    assert cache.stats() == {"hits": 2, "misses": 5, "coalesced": 0, "evictions": 2, "expirations": 1, "size": 2}
+
+
+def test_cache_does_not_keep_failures() -> None:
+    """
+    Test that a failed load (None or an exception) is retried by the next lookup.
+    """
+    cache = TTLCache()
+    assert cache.get("x", lambda: None) is None
+    with pytest.raises(ValueError):
+        cache.get("x", lambda: int("not a number"))
+    assert cache.get("x", lambda: 42) == 42
+    assert cache.stats()["size"] == 1
+
+
+def test_cache_peek_many() -> None:
+    """
+    Test that many keys are looked up at once without loading the missing or expired ones.
+    """
+    now = [0.0]
+    cache = TTLCache(ttl=10, clock=lambda: now[0])
+    cache.put(1, "a")
+    now[0] = 5
+    cache.put(2, "b")
+    now[0] = 12
+
+    assert cache.peek_many([1, 2, 3]) == {2: "b"}
+    assert cache.stats() == {"hits": 1, "misses": 2, "coalesced": 0, "evictions": 0, "expirations": 1, "size": 1}
+
+
+def test_cache_collapses_concurrent_misses() -> None:
+    """
+    Test that concurrent misses for the same key share a single load.
+    """
+    cache = TTLCache()
+    loads = []
+
+    def load():
+        loads.append(1)
+        time.sleep(0.1)
+        return {"id": 7}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(7, load))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert results == [{"id": 7}] * 8
+    assert cache.stats()["coalesced"] == 7
+
+
+@patch('requests.Session.get')
+def test_recipe_routes_share_information_cache(mock_get, monkeypatch) -> None:
+    """
+    Test that /api/recipe and /api/recipe/info answer from one cached upstream call.
+    """
+    mock_response = make_response(200)
+    mock_response.json.return_value = {"id": 654321, "title": "Pasta Primavera"}
+    mock_get.return_value = mock_response
+    monkeypatch.setattr(app, "recipe_info_cache", TTLCache())
+    client = app.test_client()
+
+    assert client.get("/api/recipe/654321").get_json()["title"] == "Pasta Primavera"
+    assert client.get("/api/recipe/info/654321").get_json()["title"] == "Pasta Primavera"
+
+    mock_get.assert_called_once()
+    assert mock_get.call_args[0][0] == "https://api.spoonacular.com/recipes/654321/information"
+    stats = client.get("/api/upstream/stats").get_json()["recipe_info_cache"]
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_disk_cache_stores_complete_files_and_evicts(tmp_path) -> None:
+    """
+    Test that only fully passed-through files are cached, identical content is stored once
+    and the least recently used files are evicted beyond the size limit.
+    """
+    cache = DiskCache(str(tmp_path), max_bytes=10, suffix=".png")
+
+    # a consumer that stops early leaves nothing behind
+    partial = cache.store_stream("a", [b"1234", b"5678"])
+    assert next(partial) == b"1234"
+    partial.close()
+    assert cache.lookup("a") is None
+    assert list((tmp_path / "blobs").iterdir()) == []
+
+    assert b"".join(cache.store_stream("a", [b"1234", b"5678"])) == b"12345678"
+    assert b"".join(cache.store_stream("b", [b"12345678"])) == b"12345678"
+    path, digest = cache.lookup("a")
+    assert cache.lookup("b") == (path, digest)
+    assert open(path, "rb").read() == b"12345678"
+    assert cache.stats()["bytes"] == 8
+
+    list(cache.store_stream("c", [b"abcdef"]))
+    assert cache.lookup("a") is None and cache.lookup("b") is None
+    assert cache.lookup("c") is not None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] == 6
+
+
+@patch('requests.Session.get')
+def test_price_breakdown_widget_is_cached_on_disk(mock_get, tmp_path, monkeypatch) -> None:
+    """
+    Test that the widget image is streamed once from Spoonacular and then served from the
+    disk cache with an ETag, answering conditional requests with 304.
+    """
+    image = b"\x89PNG\r\n\x1a\n" + b"\x00" * 1000
+    mock_response = make_response(200, {"Content-Length": str(len(image))})
+    mock_response.iter_content.return_value = [image[:500], image[500:]]
+    mock_get.return_value = mock_response
+    monkeypatch.setattr(app, "widget_cache", DiskCache(str(tmp_path), suffix=".png"))
+    client = app.test_client()
+
+    response = client.get("/api/price_breakdown_widget/123456")
+    assert response.status_code == 200
+    assert response.content_type == "image/png"
+    assert response.data == image
+    assert mock_get.call_args.kwargs["stream"] is True
+    mock_response.close.assert_called()
+
+    response = client.get("/api/price_breakdown_widget/123456")
+    assert response.status_code == 200
+    assert response.data == image
+    etag = response.headers["ETag"]
+    response.close()
+
+    response = client.get("/api/price_breakdown_widget/123456", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    mock_get.assert_called_once()
+
+
+def test_cache_get_many_loads_only_missing_keys() -> None:
+    """
+    Test that get_many answers cached keys itself and loads the others in one call.
+    """
+    cache = TTLCache()
+    cache.get(1, lambda: "one")
+    calls = []
+
+    def load_many(keys):
+        calls.append(keys)
+        return {key: f"value {key}" for key in keys if key != 3}
+
+    assert cache.get_many([1, 2, 3, 2], load_many) == {1: "one", 2: "value 2"}
+    assert calls == [[2, 3]]
+    # 3 could not be loaded, so it is asked for again
+    assert cache.get_many([2, 3], load_many) == {2: "value 2"}
+    assert calls == [[2, 3], [3]]
+
+
+@patch('requests.Session.get')
+def test_batch_recipe_info_uses_cache_and_bulk_call(mock_get, monkeypatch) -> None:
+    """
+    Test that the batch endpoint serves cached recipes and fetches the rest with one bulk call.
+    """
+    single = make_response(200)
+    single.json.return_value = {"id": 1, "title": "One"}
+    bulk = make_response(200)
+    bulk.json.return_value = [{"id": 2, "title": "Two"}, {"id": 3, "title": "Three"}]
+    mock_get.side_effect = [single, bulk]
+    monkeypatch.setattr(app, "recipe_info_cache", TTLCache())
+    client = app.test_client()
+
+    client.get("/api/recipe/info/1")
+    response = client.get("/api/recipes/info?ids=3,1,2")
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert {key: value["title"] for key, value in data.items()} == {"1": "One", "2": "Two", "3": "Three"}
+    assert mock_get.call_count == 2
+    positional_args, keyword_args = mock_get.call_args
+    assert positional_args[0] == "https://api.spoonacular.com/recipes/informationBulk"
+    assert keyword_args["params"]["ids"] == "3,2"
+
+    # everything is cached now
+    assert client.get("/api/recipe/2").get_json()["title"] == "Two"
+    assert mock_get.call_count == 2
+
+
+@pytest.mark.parametrize("ids", ["", "1,abc", ",".join(str(i) for i in range(101))])
+def test_batch_recipe_info_rejects_bad_ids(ids: str) -> None:
+    """
+    Test that the batch endpoint rejects missing, malformed and too many IDs.
+    """
+    response = app.test_client().get(f"/api/recipes/info?ids={ids}")
+    assert response.status_code == 400
+
+
+PRICE_BREAKDOWN_HTML = """
+<div id="spoonacularPriceBreakdownTable">
+    <div style="float:left;max-width:80%"><span>Pasta</span></div>
+    <div style="text-align:right;display:inline-block;float:left;padding-left:1em"><span>$1.20</span></div>
+</div>
+"""
+
+
+@patch('requests.Session.get')
+def test_recipe_card_fetches_information_and_breakdown_concurrently(mock_get, monkeypatch) -> None:
+    """
+    Test that the card endpoint merges both upstream answers and waits for them side by side.
+    """
+    def slow_get(url, **kwargs):
+        time.sleep(0.3)
+        response = make_response(200)
+        response.json.return_value = {"id": 42, "title": "Pasta"}
+        response.text = PRICE_BREAKDOWN_HTML
+        return response
+
+    mock_get.side_effect = slow_get
+    monkeypatch.setattr(app, "recipe_info_cache", TTLCache())
+    monkeypatch.setattr(app, "price_breakdown_cache", TTLCache())
+
+    start = time.perf_counter()
+    response = app.test_client().get("/api/recipe/card/42")
+    elapsed = time.perf_counter() - start
+
+    assert response.status_code == 200
+    assert response.get_json() == {"information": {"id": 42, "title": "Pasta"},
+                                   "price_breakdown": [["Pasta"], ["$1.20"]]}
+    assert sorted(call[0][0] for call in mock_get.call_args_list) == [
+        "https://api.spoonacular.com/recipes/42/information",
+        "https://api.spoonacular.com/recipes/42/priceBreakdownWidget",
+    ]
+    assert elapsed < 0.55
+
+
+@patch('requests.Session.get')
+def test_recipe_card_without_breakdown(mock_get, monkeypatch) -> None:
+    """
+    Test that a failed price breakdown leaves the card with the information only.
+    """
+    def get(url, **kwargs):
+        response = make_response(500 if url.endswith("priceBreakdownWidget") else 200)
+        response.json.return_value = {"id": 43, "title": "Soup"}
+        return response
+
+    mock_get.side_effect = get
+    monkeypatch.setattr(app, "recipe_info_cache", TTLCache())
+    monkeypatch.setattr(app, "price_breakdown_cache", TTLCache())
+
+    response = app.test_client().get("/api/recipe/card/43")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"information": {"id": 43, "title": "Soup"}, "price_breakdown": None}
+
+
+WIDGET_HTML = """
+<style>#spoonacularPriceBreakdownTable div { color: #333 }</style>
+<script>var table = '<div id="spoonacularPriceBreakdownTable">';</script>
+<div style="font-family:sans-serif">
+<div id="spoonacularPriceBreakdownTable" style="width:100%">
+    <div style='float:left;max-width:80%'>
+        <div>1 cup Mac &amp; Cheese</div><!-- <div>comment</div> -->
+        <div><b>2</b> eggs<br/></div>
+        <div style="float:left;max-width:80%">nested</div>
+    </div>
+    <div style="text-align:right;display:inline-block;float:left;padding-left:1em">
+        <div>$1.20</div><div>
+            $0.45
+        </div><div>&#36;0.10</div>
+    </div>
+    <div style="clear:both"></div>
+</div>
+<div>Cost per Serving: $1.75</div>
+</div>
+"""
+
+
+@pytest.mark.parametrize("html", [PRICE_BREAKDOWN_HTML, WIDGET_HTML])
+def test_price_breakdown_extractor_matches_beautifulsoup(html: str) -> None:
+    """
+    Test that the single-pass extractor finds the same ingredients and prices as the BeautifulSoup version it replaced.
+    """
+    bs4 = pytest.importorskip("bs4")
+    table = bs4.BeautifulSoup(html, "html.parser").find("div", id="spoonacularPriceBreakdownTable")
+    expected = tuple(list(table.find("div", style=lambda value: value and marker in value).stripped_strings)
+                     for marker in (INGREDIENTS_STYLE, PRICES_STYLE))
+
+    assert extract_price_breakdown(html) == expected
+    assert extract_price_breakdown(WIDGET_HTML)[0] == ["1 cup Mac & Cheese", "2", "eggs", "nested"]
+
+
+def test_price_breakdown_extractor_without_table() -> None:
+    """
+    Test that widgets without a complete price table give None.
+    """
+    assert extract_price_breakdown("<div>No prices</div>") is None
+    assert extract_price_breakdown('<div id="spoonacularPriceBreakdownTable"><div style="float:left;max-width:80%">'
+                                   'Pasta</div></div>') is None
+
+
+@patch('requests.Session.get')
+def test_price_breakdown_is_cached_per_meal(mock_get, monkeypatch) -> None:
+    """
+    Test that the extracted breakdown of a meal is reused by later price breakdown and card requests,
+    and failures are not cached.
+    """
+    def get(url, **kwargs):
+        response = make_response(500 if "/7/" in url else 200)
+        response.json.return_value = {"id": 42, "title": "Pasta"}
+        response.text = PRICE_BREAKDOWN_HTML
+        return response
+
+    mock_get.side_effect = get
+    monkeypatch.setattr(app, "recipe_info_cache", TTLCache())
+    monkeypatch.setattr(app, "price_breakdown_cache", TTLCache())
+    client = app.test_client()
+
+    assert client.get("/api/price_breakdown/42").get_json() == [["Pasta"], ["$1.20"]]
+    assert client.get("/api/price_breakdown/42").get_json() == [["Pasta"], ["$1.20"]]
+    assert client.get("/api/recipe/card/42").get_json()["price_breakdown"] == [["Pasta"], ["$1.20"]]
+    assert client.get("/api/price_breakdown/7").status_code == 500
+    assert client.get("/api/price_breakdown/7").status_code == 500
+
+    widget_calls = [call for call in mock_get.call_args_list if call[0][0].endswith("priceBreakdownWidget")]
+    assert len(widget_calls) == 3  # <- once for meal 42, twice for the failing meal 7
+    stats = client.get("/api/upstream/stats").get_json()["price_breakdown_cache"]
+    assert (stats["hits"], stats["size"]) == (2, 1)
+
+
+@patch('requests.Session.get')
+def test_price_breakdown_without_table_is_cached_briefly(mock_get, monkeypatch) -> None:
+    """
+    Test that a widget page without a price table is fetched once and remembered for PRICE_BREAKDOWN_MISSING_TTL seconds.
+    """
+    now = [0.0]
+
+    def get(url, **kwargs):
+        response = make_response(200)
+        response.json.return_value = {"id": 9, "title": "Toast"}
+        response.text = "<html><body><div>No prices for this recipe</div></body></html>"
+        return response
+
+    mock_get.side_effect = get
+    monkeypatch.setattr(app, "recipe_info_cache", TTLCache())
+    monkeypatch.setattr(app, "price_breakdown_cache", TTLCache(ttl=3600, clock=lambda: now[0]))
+    client = app.test_client()
+
+    assert client.get("/api/price_breakdown/9").status_code == 500
+    assert client.get("/api/price_breakdown/9").status_code == 500
+    assert client.get("/api/recipe/card/9").get_json()["price_breakdown"] is None
+
+    now[0] += PRICE_BREAKDOWN_MISSING_TTL + 1
+    assert client.get("/api/price_breakdown/9").status_code == 500
+    widget_calls = [call for call in mock_get.call_args_list if call[0][0].endswith("priceBreakdownWidget")]
+    assert len(widget_calls) == 2
+
+
+def search_result(recipe_id: int, kcal: float) -> dict:
+    return {"id": recipe_id, "title": f"Recipe {recipe_id}",
+            "nutrition": {"nutrients": [{"name": "Calories", "amount": kcal, "unit": "kcal"}]}}
+
+
+def test_search_cache_answers_narrower_calorie_ranges() -> None:
+    """
+    Test that a cached search holding all its results answers narrower ranges of the same query by filtering.
+    """
+    cache = SearchCache()
+    results = [search_result(1, 150), search_result(2, 450), search_result(3, 800)]
+    cache.store(SearchCache.key("Pasta", None, 1000), results, 3)
+
+    assert cache.lookup(SearchCache.key("  pasta ", None, 1000)) == (results, 3)
+    assert cache.lookup(SearchCache.key("pasta", 100, 500)) == (results[:2], 2)
+    assert cache.lookup(SearchCache.key("pasta", 400, None)) is None  # <- wider than the cached range
+    assert cache.lookup(SearchCache.key("pizza", 100, 500)) is None
+
+    # a first page of a larger result set cannot answer other ranges
+    cache.store(SearchCache.key("soup", None, None), results, 40)
+    assert cache.lookup(SearchCache.key("soup", None, None)) == (results, 40)
+    assert cache.lookup(SearchCache.key("soup", 100, 500)) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["subsumed"], stats["misses"], stats["hit_rate"]) == (2, 1, 3, 0.5)
+
+
+def test_search_cache_expires_and_evicts() -> None:
+    """
+    Test that cached searches expire after the TTL, the least recently used is evicted, and neither answers narrower ranges.
+    """
+    now = [0.0]
+    cache = SearchCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    results = [search_result(1, 300)]
+
+    cache.store(SearchCache.key("pasta", None, None), results, 1)
+    cache.store(SearchCache.key("soup", None, None), results, 1)
+    cache.lookup(SearchCache.key("pasta", None, None))  # <- soup is now the least recently used
+    cache.store(SearchCache.key("salad", None, None), results, 1)
+    assert cache.lookup(SearchCache.key("soup", 0, 500)) is None
+
+    now[0] = 11
+    assert cache.lookup(SearchCache.key("pasta", 0, 500)) is None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["expirations"] == 1
+    assert cache.ranges == {"salad": {(-float("inf"), float("inf"))}}
+
+
+@patch('requests.Session.get')
+def test_meals_route_filters_cached_search_locally(mock_get, monkeypatch) -> None:
+    """
+    Test that narrowing the calorie range of a search is answered from the cache without an upstream call.
+    """
+    mock_get.return_value = make_response(200)
+    mock_get.return_value.json.return_value = {
+        "results": [search_result(recipe_id, 100 * recipe_id) for recipe_id in range(1, 9)],
+        "offset": 0, "number": 10, "totalResults": 8,
+    }
+    monkeypatch.setattr(app, "search_cache", SearchCache())
+    client = app.test_client()
+
+    wide = client.get("/api/meals?query=pasta&maxCalories=1500").get_json()
+    narrow = client.get("/api/meals?query=Pasta&minCalories=250&maxCalories=700").get_json()
+
+    assert [result["id"] for result in wide["results"]] == list(range(1, 9))
+    assert wide["totalResults"] == 8
+    assert [result["id"] for result in narrow["results"]] == [3, 4, 5, 6, 7]
+    assert narrow["totalResults"] == 5
+    mock_get.assert_called_once()
+    params = mock_get.call_args.kwargs["params"]
+    # only the bound the user gave is sent, with Spoonacular's default page size
+    assert {name: value for name, value in params.items() if name != "apiKey"} == {"query": "pasta", "maxCalories": 1500}
+    assert client.get("/api/upstream/stats").get_json()["search_cache"]["subsumed"] == 1
+
+
+@patch('requests.Session.get')
+def test_meals_route_sends_calorie_bounds_only_when_given(mock_get, monkeypatch) -> None:
+    """
+    Test that a search without calorie bounds is sent without them, and is not mixed up with a search from 0,
+    which Spoonacular answers without the recipes that lack nutrition data.
+    """
+    mock_get.return_value = make_response(200)
+    # without a calorie bound Spoonacular does not add the nutrition to the results
+    mock_get.return_value.json.return_value = {"results": [{"id": 1, "title": "Soup"}], "totalResults": 1}
+    monkeypatch.setattr(app, "search_cache", SearchCache())
+    client = app.test_client()
+
+    client.get("/api/meals?query=soup")
+    client.get("/api/meals?query=soup&minCalories=0")
+
+    assert [{name: value for name, value in call.kwargs["params"].items() if name != "apiKey"}
+            for call in mock_get.call_args_list] == [{"query": "soup"}, {"query": "soup", "minCalories": 0}]
+
+
+def wait_until(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_random_pool_refills_in_batches_below_low_watermark() -> None:
+    """
+    Test that the pool is filled up to the high mark with one fetch and refilled in the background below the low mark.
+    """
+    batches = []
+    ids = iter(range(1, 1000))
+
+    def fetch(number):
+        batches.append(number)
+        return [{"id": next(ids)} for _ in range(number)]
+
+    pool = RecipePool(fetch, low=3, high=6)
+    try:
+        assert pool.take() == {"id": 1}  # <- waits for the first batch
+        assert [pool.take()["id"] for _ in range(2)] == [2, 3]
+        assert batches == [6]
+
+        pool.take()  # <- leaves 2 recipes, below the low mark
+        assert wait_until(lambda: pool.stats()["size"] == 6)
+        assert batches == [6, 4]
+        assert [pool.take(block=False)["id"] for _ in range(6)] == [5, 6, 7, 8, 9, 10]
+        assert pool.stats()["waited"] == 1
+    finally:
+        pool.stop()
+
+
+def test_random_pool_reports_failed_refills() -> None:
+    """
+    Test that a caller waiting on an empty pool gets None or the refill's error, and the next take tries again.
+    """
+    outcomes = [None, QuotaExceeded(5), [{"id": 1}], [{"id": 2}]]
+
+    def fetch(number):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    pool = RecipePool(fetch, low=1, high=2)
+    try:
+        assert pool.take() is None
+        with pytest.raises(QuotaExceeded):
+            pool.take()
+        assert pool.take() == {"id": 1}
+        assert pool.stats()["failed_refills"] == 2
+    finally:
+        pool.stop()
+
+
+@patch('requests.Session.get')
+def test_random_route_serves_recipes_from_pool(mock_get, monkeypatch) -> None:
+    """
+    Test that /api/random serves every recipe of a fetched batch instead of one per upstream call.
+    """
+    from app import fetch_random_recipes
+    mock_get.return_value = make_response(200)
+    mock_get.return_value.json.return_value = {"recipes": [{"id": recipe_id} for recipe_id in range(5)]}
+    pool = RecipePool(fetch_random_recipes, low=1, high=5)
+    monkeypatch.setattr(app, "random_pool", pool)
+    client = app.test_client()
+
+    try:
+        served = [client.get("/api/random").get_json()["id"] for _ in range(4)]
+    finally:
+        pool.stop()
+
+    assert served == [0, 1, 2, 3]
+    mock_get.assert_called_once()
+    assert mock_get.call_args[0][0] == "https://api.spoonacular.com/recipes/random"
+    assert mock_get.call_args.kwargs["params"]["number"] == 5
@@ -5,6 +5,8 @@ document.addEventListener('DOMContentLoaded', () => {
   const FAVORITES_BASE    = '/feastFinder/recipes/favorites/';
   const ADD_FAVORITE_URL  = '/feastFinder/recipes/favorites/add_to_favorites';
   const CREATE_RECIPE_URL = '/feastFinder/recipe/';
+  const RECIPES_INFO_URL  = '/api/recipes/info';
+  const RECIPE_CARD_URL   = '/api/recipe/card/';
 
   /* ─────────────────────────────── DOM ELEMENTS ────────────────────────── */
   const searchForm           = document.getElementById('search-form');
@@ -58,6 +60,9 @@ document.addEventListener('DOMContentLoaded', () => {
 
   /* ────────────────────────────── STATE VARS ───────────────────────────── */
   let currentRecipe   = null;
+  let prefetchedDetails = {};  // recipe ID -> promise of its details, or of null
+  let visibleResults    = new Set();  // IDs of the search results on screen
+  let cardBreakdowns    = {};  // recipe ID -> price breakdown that came with its recipe card
   let timerInterval   = null;
   let totalSeconds    = 0;
   let isTimerRunning  = false;
@@ -115,9 +120,13 @@ document.addEventListener('DOMContentLoaded', () => {
 
   function displaySearchResults(results) {
     searchResults.innerHTML = '';
+    prefetchedDetails = {};
+    visibleResults.clear();
+    resultsObserver?.disconnect();
     results.forEach(r => {
       const card = document.createElement('div');
       card.className = 'recipe-card';
+      card.dataset.id = r.id;
       const imgUrl = r.image || DEFAULT_IMAGE;
       card.innerHTML = `
         <div class="recipe-image">
@@ -137,6 +146,7 @@ document.addEventListener('DOMContentLoaded', () => {
           </div>
         </div>`;
       searchResults.appendChild(card);
+      resultsObserver?.observe(card);
 
       // clickable image
       const imgEl = card.querySelector('.recipe-image img');
@@ -206,13 +216,44 @@ document.addEventListener('DOMContentLoaded', () => {
   }
 
   /* ───────────────────────── RECIPE DETAILS ──────────────────────────── */
+  // the search results on screen are tracked so only their details are prefetched
+  const resultsObserver = 'IntersectionObserver' in window
+    ? new IntersectionObserver(entries => entries.forEach(entry => {
+        const id = entry.target.dataset.id;
+        if (entry.isIntersecting) visibleResults.add(id); else visibleResults.delete(id);
+      }))
+    : null;
+
+  // nothing is prefetched until the user points at or tabs into the results, as every batch costs quota
+  searchResults.addEventListener('pointerover', prefetchVisibleDetails);
+  searchResults.addEventListener('focusin', prefetchVisibleDetails);
+
+  function prefetchVisibleDetails() {
+    const ids = [...visibleResults].filter(id => !(id in prefetchedDetails));
+    if (ids.length) prefetchRecipeDetails(ids);
+  }
+
+  // details of the visible search results come from one batch request
+  function prefetchRecipeDetails(ids) {
+    const request = fetch(`${RECIPES_INFO_URL}?ids=${ids.join(',')}`)
+      .then(r => r.ok ? r.json() : {})
+      .catch(() => ({}));
+    ids.forEach(id => { prefetchedDetails[id] = request.then(details => details[id] ?? null); });
+  }
+
   function fetchRecipeDetails(id) {
     recipeDetailContent.innerHTML = '<div class="loader"></div>';
     recipeModal.style.display = 'block';
     currentRecipe = null;
 
-    fetch(`/api/recipe/info/${id}`)
-      .then(r => r.ok ? r.json() : Promise.reject(r.status))
+    // without prefetched details, the card endpoint brings the price breakdown along
+    Promise.resolve(prefetchedDetails[id] ?? null)
+      .then(data => data ?? fetch(`${RECIPE_CARD_URL}${id}`)
+        .then(r => r.ok ? r.json() : Promise.reject(r.status))
+        .then(card => {
+          if (card.price_breakdown) cardBreakdowns[id] = card.price_breakdown;
+          return card.information;
+        }))
       .then(data => {
         currentRecipe = data;
         displayRecipeDetails(data);
@@ -281,8 +322,9 @@ document.addEventListener('DOMContentLoaded', () => {
     priceBreakdownImg.onload  = () => priceBreakdownImg.style.display = 'block';
     priceBreakdownImg.onerror = () => priceBreakdownImg.style.display = 'none';
 
-    fetch(`/api/price_breakdown/${id}`)
-      .then(r => r.ok ? r.json() : Promise.reject(r.status))
+    (cardBreakdowns[id]
+      ? Promise.resolve(cardBreakdowns[id])
+      : fetch(`/api/price_breakdown/${id}`).then(r => r.ok ? r.json() : Promise.reject(r.status)))
       .then(([ings, prices]) => {
         let html = '<dl class="price-breakdown-list">';
         ings.forEach((ing,i) => {